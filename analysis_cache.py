@@ -0,0 +1,113 @@
+"""
+Cache des analyses réglementaires, indexé par les seuls champs lus par les règles
+
+L'assistant relance l'analyse toutes les 2 secondes et à chaque frappe, alors que les
+règles ne lisent qu'une huitaine de champs (architect_rules.RULE_FIELDS). L'empreinte
+d'un projet est le tuple de ces valeurs brutes : une analyse répétée d'un projet dont
+ces champs n'ont pas changé se réduit à une recherche dans un dictionnaire.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional
+
+from architect_rules import RULE_FIELDS
+from config import Config
+from utils import freeze
+
+_MISSING = object()  # Champ absent (distinct de None : float(None) échoue, un champ absent vaut 0)
+_EMPTY: Dict[str, Any] = {}
+# RULE_FIELDS regroupés par section : une seule lecture de chaque section
+_FIELDS_BY_SECTION = tuple(
+    (section, tuple(field for field_section, field in RULE_FIELDS if field_section == section))
+    for section in dict.fromkeys(section for section, _ in RULE_FIELDS)
+)
+
+
+def analysis_key(donnees_projet: Dict[str, Any]) -> tuple:
+    """Empreinte d'un projet pour les règles : valeurs brutes des champs de RULE_FIELDS."""
+    key = []
+    for section, fields in _FIELDS_BY_SECTION:
+        values = donnees_projet.get(section, _EMPTY)
+        key += [values.get(field, _MISSING) for field in fields]
+    return tuple(key)
+
+
+class AnalysisCache:
+    """
+    Cache LRU borné des résultats de ArchitectBusinessLogic.analyser_projet.
+
+    Le résultat est figé (utils.freeze : MappingProxyType, tuples) et partagé entre les
+    appels ; utils.thaw en donne une copie modifiable.
+    Les analyses qui échouent ne sont pas mises en cache (l'exception est relancée à
+    chaque appel) ; un projet dont les champs ne sont pas hachables est analysé sans cache.
+    """
+
+    def __init__(self, logic=None, max_entries: Optional[int] = None):
+        if logic is None:
+            from architect_business_logic import ArchitectBusinessLogic
+            logic = ArchitectBusinessLogic()
+        self.logic = logic
+        self.max_entries = max_entries if max_entries is not None else Config.ANALYSIS_CACHE_MAX_ENTRIES
+        self._entries: "OrderedDict[tuple, Mapping[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.uncached = 0
+
+    def analyse(self, donnees_projet: Dict[str, Any]) -> Mapping[str, Any]:
+        """Analyse du projet, reprise du cache si les champs lus par les règles sont inchangés."""
+        try:
+            key = analysis_key(donnees_projet)
+            with self._lock:
+                result = self._entries.get(key)
+                if result is not None:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return result
+                self.misses += 1
+        except (AttributeError, TypeError):
+            # Section qui n'est pas un dictionnaire, valeur non hachable : mêmes résultat et exceptions
+            self.uncached += 1
+            return freeze(self.logic.analyser_projet(donnees_projet))
+
+        result = freeze(self.logic.analyser_projet(donnees_projet))
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'uncached': self.uncached,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+_analysis_cache: Optional[AnalysisCache] = None
+_analysis_cache_lock = threading.Lock()
+
+
+def get_analysis_cache() -> AnalysisCache:
+    """Retourne le cache d'analyses du processus."""
+    global _analysis_cache
+    if _analysis_cache is None:
+        with _analysis_cache_lock:
+            if _analysis_cache is None:
+                _analysis_cache = AnalysisCache()
+    return _analysis_cache
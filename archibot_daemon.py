@@ -0,0 +1,374 @@
+"""
+Service de génération local : modèles, plans de remplissage et profils architecte gardés en mémoire
+
+Les outils internes (scripts intranet, export comptable) envoient leurs demandes d'analyse
+et de remplissage sur un socket Unix. Ils évitent ainsi, à chaque appel, le démarrage de
+Python, l'import de PyMuPDF et la lecture des modèles : les workers du moteur de
+génération restent préchauffés entre deux requêtes.
+
+Protocole : une requête JSON par ligne, une réponse JSON par ligne ; "id" est renvoyé tel
+quel et les réponses d'une même connexion peuvent arriver dans le désordre.
+    {"id": 1, "op": "ping"}
+    {"id": 2, "op": "analyse", "project": {...}}
+    {"id": 3, "op": "fill", "cerfa_id": "13406-15", "project": {...}, "output_path": "..."}
+    {"id": 4, "op": "dossier", "cerfa_ids": [...], "project": {...}, "output_dir": "..."}
+    {"id": 5, "op": "dossier", "cerfa_ids": [...], "project": {...}, "output_path": "...", "merged": true}
+    {"id": 6, "op": "stats"}
+    {"id": 7, "op": "metrics"}   # Percentiles par modèle et par étape (fill_metrics)
+fill et dossier acceptent aussi "architect_profile", "save_profile", "appearance_mode"
+("immediate", "batched" ou "need_appearances") et "storage_mode" ("full" ou "delta",
+cf. pdf_storage ; pas de delta pour un dossier fusionné).
+Réponse : {"id": ..., "ok": true, "latency_ms": 12.3, ...}, ou {"id": ..., "ok": false, "error": "..."}
+avec "busy": true lorsque la file de génération est pleine (réessayer plus tard).
+
+Usage :
+    python archibot_daemon.py serve [--socket CHEMIN] [--workers N] [--max-pending N]
+    python archibot_daemon.py ping|stats|metrics [--socket CHEMIN]
+    kill -USR1 <pid>   # Écrit les mesures de remplissage dans Config.FILL_METRICS_PATH
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import contextmanager, suppress
+from dataclasses import asdict
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from analysis_cache import AnalysisCache
+from architect_business_logic import ArchitectBusinessLogic
+from config import Config
+from fill_metrics import get_fill_metrics
+from generation_engine import GenerationEngine
+from utils import percentile, thaw
+
+logger = logging.getLogger('ArchiBot.daemon')
+
+LATENCY_WINDOW = 1024  # Latences conservées par opération pour les percentiles
+
+
+class ServiceBusy(Exception):
+    """La file de génération est pleine."""
+
+
+class LatencyMetrics:
+    """Compteurs et latences récentes par opération (utilisé depuis la seule boucle asyncio)."""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self._latencies = defaultdict(lambda: deque(maxlen=window))
+        self._counts = defaultdict(Counter)
+
+    def record(self, op: str, seconds: float, response: Dict[str, Any]):
+        counts = self._counts[op]
+        counts['requests'] += 1
+        if response.get('busy'):
+            counts['rejected'] += 1
+            return  # Un refus immédiat fausserait les percentiles
+        if not response.get('ok'):
+            counts['errors'] += 1
+        self._latencies[op].append(seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        stats = {}
+        for op, counts in self._counts.items():
+            latencies = list(self._latencies[op])
+            stats[op] = {
+                'requests': counts['requests'],
+                'errors': counts['errors'],
+                'rejected': counts['rejected'],
+                **{f"p{int(q * 100)}_ms": round(percentile(latencies, q) * 1000, 3) for q in (0.5, 0.95, 0.99)},
+                'max_ms': round(max(latencies, default=0.0) * 1000, 3),
+            }
+        return stats
+
+
+def _require(request: Dict[str, Any], key: str, expected_type):
+    value = request.get(key)
+    if not isinstance(value, expected_type) or not value:
+        raise ValueError(f"paramètre '{key}' manquant ou invalide")
+    return value
+
+
+class GenerationDaemon:
+    """
+    Serveur asyncio du service de génération.
+
+    La boucle asyncio ne fait que lire les requêtes et répartir le travail : les
+    remplissages partent dans le pool de processus du GenerationEngine, dont le nombre
+    de tâches en cours ou en attente est borné par max_pending. Au-delà, le service
+    répond immédiatement "busy" plutôt que de laisser la file grossir sans limite.
+    """
+
+    def __init__(self, socket_path: Optional[Path] = None, workers: Optional[int] = None,
+                 max_pending: Optional[int] = None):
+        self.socket_path = Path(socket_path) if socket_path else Config.DAEMON_SOCKET_PATH
+        self.max_pending = max_pending or Config.DAEMON_MAX_PENDING
+        self.engine = GenerationEngine(workers)
+        self.business_logic = ArchitectBusinessLogic()
+        self.analysis_cache = AnalysisCache(self.business_logic)
+        self.metrics = LatencyMetrics()
+        self.pending = 0
+        self.started_at = time.time()
+        self._handlers = {
+            'ping': self._op_ping,
+            'analyse': self._op_analyse,
+            'fill': self._op_fill,
+            'dossier': self._op_dossier,
+            'stats': self._op_stats,
+            'metrics': self._op_metrics,
+        }
+
+    async def serve(self):
+        """Préchauffe les workers, écoute jusqu'à SIGINT/SIGTERM puis arrête le pool."""
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+        await loop.run_in_executor(None, self.engine.warm_up)
+        self._remove_stale_socket()
+        server = await asyncio.start_unix_server(self._handle_connection, path=str(self.socket_path),
+                                                 limit=Config.DAEMON_MAX_REQUEST_BYTES)
+        os.chmod(self.socket_path, 0o600)  # Service local : réservé à l'utilisateur courant
+        logger.info(f"Service prêt en {time.perf_counter() - start:.1f} s sur {self.socket_path} "
+                    f"({self.engine.max_workers} workers, {self.max_pending} générations en attente max)")
+
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(signum, stop.set)
+        loop.add_signal_handler(signal.SIGUSR1, get_fill_metrics().dump)
+        try:
+            async with server:
+                await stop.wait()
+        finally:
+            self.engine.shutdown(wait=False)
+            self.socket_path.unlink(missing_ok=True)
+            logger.info("Service arrêté")
+
+    def _remove_stale_socket(self):
+        """Supprime le socket laissé par un service arrêté brutalement ; refuse si un service répond."""
+        if not self.socket_path.exists():
+            return
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+            try:
+                probe.connect(str(self.socket_path))
+            except OSError:
+                self.socket_path.unlink()
+                return
+        raise RuntimeError(f"Un service écoute déjà sur {self.socket_path}")
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        write_lock = asyncio.Lock()
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:  # Ligne plus longue que DAEMON_MAX_REQUEST_BYTES
+                    await self._send(writer, write_lock, {'id': None, 'ok': False, 'error': "requête trop volumineuse"})
+                    break
+                if not line:
+                    break
+                if line.strip():
+                    task = asyncio.create_task(self._process(line, writer, write_lock))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+            with suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _process(self, line: bytes, writer: asyncio.StreamWriter, write_lock: asyncio.Lock):
+        start = time.perf_counter()
+        request_id, op = None, 'invalid'
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("objet JSON attendu")
+            request_id = request.get('id')
+            handler = self._handlers.get(request.get('op'))
+            if handler is None:
+                raise ValueError(f"opération inconnue : {request.get('op')!r}")
+            op = request['op']
+            response = {'ok': True, **await handler(request)}
+        except json.JSONDecodeError as e:
+            response = {'ok': False, 'error': f"JSON invalide : {e}"}
+        except ServiceBusy as e:
+            response = {'ok': False, 'error': str(e), 'busy': True}
+        except ValueError as e:
+            response = {'ok': False, 'error': str(e)}
+        except Exception as e:
+            logger.exception(f"Erreur pendant une requête {op}")
+            response = {'ok': False, 'error': f"erreur interne : {e}"}
+
+        latency = time.perf_counter() - start
+        self.metrics.record(op, latency, response)
+        await self._send(writer, write_lock, {'id': request_id, **response, 'latency_ms': round(latency * 1000, 3)})
+
+    @staticmethod
+    async def _send(writer: asyncio.StreamWriter, write_lock: asyncio.Lock, response: Dict[str, Any]):
+        data = json.dumps(response, ensure_ascii=False, default=str).encode('utf-8') + b'\n'
+        async with write_lock:
+            try:
+                writer.write(data)
+                await writer.drain()
+            except ConnectionError:
+                pass  # Client parti avant la réponse
+
+    @contextmanager
+    def _reserve(self, jobs: int):
+        """Réserve des places dans la file de génération (une demande plus grande que la file passe seule)."""
+        if self.pending and self.pending + jobs > self.max_pending:
+            raise ServiceBusy(f"file de génération pleine ({self.pending}/{self.max_pending}), réessayer plus tard")
+        self.pending += jobs
+        try:
+            yield
+        finally:
+            self.pending -= jobs
+
+    async def _collect(self, futures) -> List[Any]:
+        """Attend les tâches du pool sans bloquer la boucle ; les erreurs sont portées par les résultats."""
+        await asyncio.gather(*(asyncio.wrap_future(future) for future in futures), return_exceptions=True)
+        return [self.engine.collect(future)[1] for future in futures]
+
+    async def _op_ping(self, request):
+        return {'pid': os.getpid()}
+
+    async def _op_analyse(self, request):
+        project = _require(request, 'project', dict)
+        return {'analysis': thaw(self.analysis_cache.analyse(project))}  # Résultat figé -> JSON
+
+    async def _op_fill(self, request):
+        cerfa_id = _require(request, 'cerfa_id', str)
+        project = _require(request, 'project', dict)
+        options = (request.get('architect_profile'), request.get('save_profile'))
+        with self._reserve(1):
+            if request.get('output_path'):
+                Path(request['output_path']).parent.mkdir(parents=True, exist_ok=True)
+                futures = [self.engine.submit_form(cerfa_id, project, request['output_path'], None, *options,
+                                                   storage_mode=request.get('storage_mode'),
+                                                   appearance_mode=request.get('appearance_mode'))]
+            else:
+                futures = self.engine.submit_dossier([cerfa_id], project, Config.FILLED_PDFS_DIR, None, *options,
+                                                     storage_mode=request.get('storage_mode'),
+                                                     appearance_mode=request.get('appearance_mode'))
+            result, = await self._collect(futures)
+        return {'result': asdict(result)}
+
+    async def _op_dossier(self, request):
+        cerfa_ids = _require(request, 'cerfa_ids', list)
+        if not all(isinstance(cerfa_id, str) for cerfa_id in cerfa_ids):
+            raise ValueError("paramètre 'cerfa_ids' : liste d'identifiants attendue")
+        project = _require(request, 'project', dict)
+        options = (request.get('architect_profile'), request.get('save_profile'))
+        with self._reserve(len(cerfa_ids)):
+            if request.get('merged'):
+                if request.get('storage_mode', 'full') != 'full':
+                    raise ValueError("un dossier fusionné est toujours stocké en PDF complet")
+                output_path = _require(request, 'output_path', str)
+                futures = [self.engine.submit_merged_dossier(cerfa_ids, project, output_path, None, *options,
+                                                             appearance_mode=request.get('appearance_mode'))]
+                results, = await self._collect(futures)
+            else:
+                output_dir = request.get('output_dir') or Config.FILLED_PDFS_DIR
+                results = await self._collect(self.engine.submit_dossier(cerfa_ids, project, output_dir, None, *options,
+                                                                         storage_mode=request.get('storage_mode'),
+                                                                         appearance_mode=request.get('appearance_mode')))
+        return {'results': [asdict(result) for result in results]}
+
+    async def _op_stats(self, request):
+        return {'stats': {
+            'uptime_s': round(time.time() - self.started_at, 1),
+            'workers': self.engine.max_workers,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'ops': self.metrics.snapshot(),
+            'analysis_cache': self.analysis_cache.stats(),
+            'output_cache': get_fill_metrics().cache_stats(),  # Compté sur les résultats des workers
+        }}
+
+    async def _op_metrics(self, request):
+        return {'templates': get_fill_metrics().snapshot()}
+
+
+class DaemonClient:
+    """Client synchrone du service : une connexion, requêtes successives."""
+
+    def __init__(self, socket_path: Optional[Path] = None, timeout: Optional[float] = 120.0):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        try:
+            self._sock.connect(str(socket_path or Config.DAEMON_SOCKET_PATH))
+        except OSError:
+            self._sock.close()
+            raise
+        self._file = self._sock.makefile('rwb')
+        self._next_id = 0
+
+    def request(self, op: str, **params) -> Dict[str, Any]:
+        """Envoie une requête et retourne la réponse décodée."""
+        self._next_id += 1
+        payload = json.dumps({'id': self._next_id, 'op': op, **params}, ensure_ascii=False, default=str)
+        self._file.write(payload.encode('utf-8') + b'\n')
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("connexion fermée par le service")
+        return json.loads(line)
+
+    def close(self):
+        self._file.close()
+        self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def call(op: str, socket_path: Optional[Path] = None, timeout: Optional[float] = 120.0, **params) -> Dict[str, Any]:
+    """Requête unique : ouvre une connexion, envoie la requête, retourne la réponse."""
+    with DaemonClient(socket_path, timeout) as client:
+        return client.request(op, **params)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Service de génération ArchiBot (socket Unix)")
+    parser.add_argument('command', choices=('serve', 'ping', 'stats', 'metrics'))
+    parser.add_argument('--socket', type=Path, default=None, help=f"Chemin du socket (défaut : {Config.DAEMON_SOCKET_PATH})")
+    parser.add_argument('--workers', type=int, default=None, help="Workers de génération (défaut : un par cœur)")
+    parser.add_argument('--max-pending', type=int, default=None,
+                        help=f"Générations en attente au-delà desquelles le service répond 'busy' (défaut : {Config.DAEMON_MAX_PENDING})")
+    args = parser.parse_args(argv)
+
+    if not hasattr(socket, 'AF_UNIX'):
+        print("Erreur : les sockets Unix ne sont pas disponibles sur ce système", file=sys.stderr)
+        return 2
+
+    if args.command == 'serve':
+        Config.setup_logging()
+        try:
+            asyncio.run(GenerationDaemon(args.socket, args.workers, args.max_pending).serve())
+        except RuntimeError as e:
+            logger.error(str(e))
+            return 1
+        return 0
+
+    try:
+        response = call(args.command, args.socket)
+    except OSError as e:
+        print(f"Service injoignable : {e}", file=sys.stderr)
+        return 1
+    print(json.dumps(response, indent=2, ensure_ascii=False))
+    return 0 if response.get('ok') else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Cache des profils architecte (infos pré-remplies sur les CERFA)
+"""
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Mapping, Optional
+
+from cerfa_field_mappings import ARCHITECT_INTERNAL_MAP
+from config import Config
+from fill_plans import resolve_path
+
+logger = logging.getLogger('ArchiBot.architect_profiles')
+
+# Chemins pré-découpés, calculés une fois à l'import
+_ARCHITECT_PATHS = tuple((tuple(key.split('.')), cerfa_field) for key, cerfa_field in ARCHITECT_INTERNAL_MAP.items())
+
+
+def load_architect_fields(architect_info_path) -> Dict[str, Any]:
+    """Charge un fichier d'infos architecte et le convertit en champs CERFA."""
+    with open(architect_info_path, 'r', encoding='utf-8') as f:
+        architect_data = json.load(f)
+
+    architect_fields = {}
+    for path, cerfa_field in _ARCHITECT_PATHS:
+        value = resolve_path(architect_data, path)
+        if value:
+            architect_fields[cerfa_field] = value
+    return architect_fields
+
+
+@dataclass(frozen=True)
+class _CachedProfile:
+    path: Path
+    mtime_ns: int
+    size: int
+    fields: Mapping[str, Any]
+
+
+class ArchitectProfileCache:
+    """
+    Garde en mémoire les champs CERFA déjà calculés de chaque profil architecte.
+
+    Un profil n'est relu que si la date de modification ou la taille de son fichier
+    change. Plusieurs profils nommés peuvent coexister (une agence a souvent plusieurs
+    architectes signataires).
+    """
+
+    def __init__(self, profiles: Optional[Mapping[str, Path]] = None, profiles_dir: Optional[Path] = None):
+        self.profiles_dir = Path(profiles_dir) if profiles_dir else Config.ARCHITECT_PROFILES_DIR
+        self._paths: Dict[str, Path] = {
+            name: Path(path) for name, path in (profiles or Config.ARCHITECT_PROFILES).items()
+        }
+        self._entries: Dict[str, _CachedProfile] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+
+    def register(self, name: str, path):
+        """Déclare (ou redéfinit) un profil nommé."""
+        with self._lock:
+            self._paths[name] = Path(path)
+            self._entries.pop(name, None)
+
+    def profile_path(self, name: Optional[str] = None) -> Path:
+        """Chemin du fichier d'un profil : déclaré, sinon <profiles_dir>/<nom>.json."""
+        name = name or Config.DEFAULT_ARCHITECT_PROFILE
+        return self._paths.get(name) or self.profiles_dir / f"{name}.json"
+
+    def profile_names(self):
+        """Noms des profils disponibles (déclarés et présents dans le répertoire)."""
+        names = set(self._paths)
+        if self.profiles_dir.is_dir():
+            names.update(path.stem for path in self.profiles_dir.glob("*.json"))
+        return sorted(names)
+
+    def get_fields(self, name: Optional[str] = None) -> Mapping[str, Any]:
+        """
+        Retourne les champs CERFA (lecture seule) du profil demandé.
+
+        Lève FileNotFoundError si le fichier du profil n'existe pas, ValueError s'il
+        n'est pas un JSON valide.
+        """
+        name = name or Config.DEFAULT_ARCHITECT_PROFILE
+        path = self.profile_path(name)
+        stat = path.stat()
+
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry and entry.path == path and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                self.hits += 1
+                return entry.fields
+
+        fields = MappingProxyType(load_architect_fields(path))
+        with self._lock:
+            self._entries[name] = _CachedProfile(path, stat.st_mtime_ns, stat.st_size, fields)
+            self.reloads += 1
+        logger.debug(f"Profil architecte chargé : {name} ({path.name})")
+        return fields
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du cache."""
+        with self._lock:
+            return {'profiles': len(self._entries), 'hits': self.hits, 'reloads': self.reloads}
+
+
+_profile_cache: Optional[ArchitectProfileCache] = None
+
+
+def get_architect_profile_cache() -> ArchitectProfileCache:
+    """Retourne le cache de profils partagé par le processus."""
+    global _profile_cache
+    if _profile_cache is None:
+        _profile_cache = ArchitectProfileCache()
+    return _profile_cache
+
+
+def get_architect_fields(profile: Optional[str] = None) -> Mapping[str, Any]:
+    """Raccourci : champs CERFA du profil architecte demandé (profil par défaut si None)."""
+    return get_architect_profile_cache().get_fields(profile)
@@ -0,0 +1,320 @@
+"""
+Règles de sélection des CERFA, alertes et délais d'instruction, sous forme de données
+
+Les règles sont compilées une fois en tables de décision : pour chaque type de projet,
+les seuils de surface utiles sont triés et découpent l'axe des surfaces en segments
+(bisect), et chaque combinaison (attributs booléens, segment de surface, segment de
+terrain) est associée à son résultat précalculé. Une analyse se réduit alors à
+quelques recherches, au lieu de parcourir toutes les branches.
+"""
+
+import operator
+import threading
+from bisect import bisect_left
+from dataclasses import dataclass
+from itertools import product
+from typing import Any, Dict, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+# Attributs d'un projet sur lesquels portent les règles (voir ProjectCriteria)
+BOOLEAN_ATTRIBUTES = ('company', 'protected_zone', 'demolition', 'erp', 'subcontracting')
+NUMERIC_ATTRIBUTES = ('floor_area', 'land_area')
+
+OPERATORS = {'<': operator.lt, '<=': operator.le, '>': operator.gt, '>=': operator.ge}
+
+# Sélection des CERFA. Une décision s'applique aux types de projet de 'types' (à tous si
+# absent, sauf ceux de 'except_types') ; ses cas sont examinés dans l'ordre et le premier
+# cas satisfait ajoute ses CERFA ('cerfa' obligatoires, puis 'optional').
+# Conditions 'when' : attribut booléen -> valeur attendue, attribut numérique -> comparaisons
+# (opérateur, seuil) toutes vraies. Un cas sans 'when' est toujours satisfait.
+CERFA_RULES = (
+    {'types': ('construction_neuve',), 'cases': (
+        {'when': {'company': True}, 'cerfa': ('13409-15',)},
+        {'when': {'floor_area': (('<=', 150),)}, 'cerfa': ('13406-15',)},
+        {'cerfa': ('13409-15',)},
+    )},
+    {'types': ('extension',), 'cases': (
+        {'when': {'floor_area': (('>=', 0), ('<=', 20)), 'protected_zone': True}, 'cerfa': ('13703-12',)},
+        {'when': {'floor_area': (('>=', 21), ('<=', 40))}, 'cerfa': ('13703-12',)},
+        {'when': {'floor_area': (('>', 40),), 'company': True}, 'cerfa': ('13409-15',)},
+        {'when': {'floor_area': (('>', 40),)}, 'cerfa': ('13406-15',)},
+    )},
+    {'types': ('renovation',), 'cases': (
+        {'when': {'company': True}, 'cerfa': ('13404-12',)},
+        {'cerfa': ('13703-12',)},
+    )},
+    {'types': ('renovation',), 'cases': (
+        {'when': {'floor_area': (('>', 40),)}, 'cerfa': ('13409-15',)},
+    )},
+    {'types': ('amenagement',), 'cases': (
+        {'when': {'land_area': (('<=', 2500),)}, 'cerfa': ('13404-12',)},
+        {'cerfa': ('16297-03',)},
+    )},
+    {'types': ('modification',), 'cases': (
+        {'cerfa': ('16700-01',)},
+    )},
+    {'types': ('appel_offres_public',), 'cases': (
+        {'cerfa': ('DC1', 'DC2')},
+    )},
+    {'types': ('appel_offres_public',), 'cases': (
+        {'when': {'subcontracting': True}, 'cerfa': ('DC4',)},
+    )},
+    # Situations spéciales
+    {'cases': ({'when': {'demolition': True}, 'cerfa': ('13405-13',)},)},
+    {'cases': ({'when': {'erp': True}, 'cerfa': ('13824-04',)},)},
+    # Documents toujours générés (sauf cas spécifiques)
+    {'except_types': ('modification', 'appel_offres_public'), 'cases': (
+        {'cerfa': ('13407-10', '13408-12'), 'optional': ('13410-12',)},
+    )},
+)
+
+# Alertes de conformité : toutes les règles satisfaites, dans l'ordre
+ALERT_RULES = (
+    {'when': {'company': False, 'floor_area': (('>', 150),)},
+     'message': "Architecte obligatoire (surface > 150m² pour un particulier)."},
+    {'types': ('construction_neuve', 'extension'), 'when': {'company': True},
+     'message': "Architecte obligatoire pour une personne morale."},
+    {'when': {'floor_area': (('>', 50),)},  # RT2012/RE2020 s'applique aux extensions > 50m2
+     'message': "Étude thermique (RT2012/RE2020) probablement requise."},
+    {'when': {'land_area': (('>', 1000),)}, 'message': "Étude de sol recommandée."},
+    {'when': {'protected_zone': True}, 'message': "Avis de l'Architecte des Bâtiments de France (ABF) requis."},
+)
+
+# Délai d'instruction : le plus long des CERFA obligatoires, majoré par les règles satisfaites
+# (l'alerte reçoit le total majoré) ; aucune majoration sans CERFA obligatoire
+DELAY_RULES = (
+    {'when': {'protected_zone': True}, 'days': 15,
+     'message': "Délais d'instruction rallongés de 15 jours (total: {total} jours)."},
+)
+
+
+# Champs du projet lus par project_criteria (section, champ) : ce sont les seules entrées des règles
+RULE_FIELDS = (
+    ('projet', 'typeProjet'), ('projet', 'surfacePlancher'), ('projet', 'surfaceTerrain'),
+    ('client', 'numeroSiret'), ('technique', 'zoneProtegee'), ('technique', 'demolition'),
+    ('projet', 'destination'), ('technique', 'sousTraitance'),
+)
+
+
+class ProjectCriteria(NamedTuple):
+    """Valeurs d'un projet lues par les règles, extraites comme le faisait analyser_projet."""
+    project_type: Any
+    floor_area: float
+    land_area: float
+    company: bool
+    protected_zone: Any   # Valeurs brutes : seule leur valeur de vérité est évaluée
+    demolition: Any
+    erp: bool
+    subcontracting: Any
+
+
+def project_criteria(donnees_projet: Dict[str, Any]) -> ProjectCriteria:
+    """Extrait les critères des règles (lève les mêmes exceptions que l'analyse d'origine)."""
+    projet = donnees_projet.get('projet', {})
+    client = donnees_projet.get('client', {})
+    technique = donnees_projet.get('technique', {})
+    return ProjectCriteria(  # Arguments positionnels : chemin critique de chaque analyse
+        projet.get('typeProjet', ''),
+        float(projet.get('surfacePlancher', 0.0)),
+        float(projet.get('surfaceTerrain', 0.0)),
+        bool(client.get('numeroSiret')),
+        technique.get('zoneProtegee', False),
+        technique.get('demolition', False),
+        projet.get('destination') == 'erp',
+        technique.get('sousTraitance'),
+    )
+
+
+def segment(value: float, thresholds: Sequence[float]) -> int:
+    """
+    Segment de l'axe découpé par les seuils triés : 2i entre deux seuils, 2i+1 sur le seuil i.
+
+    NaN forme un segment à part (-1), pour lequel toute comparaison est fausse.
+    """
+    if value != value:
+        return -1
+    i = bisect_left(thresholds, value)
+    return 2 * i + 1 if i < len(thresholds) and thresholds[i] == value else 2 * i
+
+
+def _representative(index: int, thresholds: Sequence[float]) -> float:
+    """Valeur quelconque du segment : toutes ses valeurs se comparent de même aux seuils."""
+    if index == -1:
+        return float('nan')
+    i, on_threshold = divmod(index, 2)
+    if on_threshold:
+        return thresholds[i]
+    if not thresholds:
+        return 0.0
+    if i == 0:
+        return thresholds[0] - 1
+    if i == len(thresholds):
+        return thresholds[-1] + 1
+    return (thresholds[i - 1] + thresholds[i]) / 2
+
+
+def _applies(rule: Mapping[str, Any], project_type: Optional[str]) -> bool:
+    """La règle concerne-t-elle ce type de projet (None : type sans règle propre) ?"""
+    if 'types' in rule and project_type not in rule['types']:
+        return False
+    return project_type not in rule.get('except_types', ())
+
+
+def _matches(when: Mapping[str, Any], values: Mapping[str, Any]) -> bool:
+    for attribute, expected in when.items():
+        if attribute in NUMERIC_ATTRIBUTES:
+            if not all(OPERATORS[op](values[attribute], threshold) for op, threshold in expected):
+                return False
+        elif values[attribute] != expected:
+            return False
+    return True
+
+
+def _validate(cerfa_rules, alert_rules, delay_rules, cerfa_database: Mapping[str, Any]):
+    """Vérifie les attributs, opérateurs et CERFA des règles (ValueError sinon)."""
+    conditions = [case.get('when', {}) for rule in cerfa_rules for case in rule['cases']]
+    conditions += [rule.get('when', {}) for rule in (*alert_rules, *delay_rules)]
+    for when in conditions:
+        for attribute, expected in when.items():
+            if attribute in NUMERIC_ATTRIBUTES:
+                for op, _ in expected:
+                    if op not in OPERATORS:
+                        raise ValueError(f"Opérateur inconnu dans les règles : {op}")
+            elif attribute not in BOOLEAN_ATTRIBUTES:
+                raise ValueError(f"Attribut inconnu dans les règles : {attribute}")
+    for rule in cerfa_rules:
+        for case in rule['cases']:
+            for cerfa_id in (*case.get('cerfa', ()), *case.get('optional', ())):
+                if cerfa_id not in cerfa_database:
+                    raise ValueError(f"CERFA inconnu dans les règles : {cerfa_id}")
+
+
+class Outcome(NamedTuple):
+    """Résultat précalculé d'une entrée de table de décision (copié à chaque analyse)."""
+    authorizations: Tuple[Dict[str, Any], ...]   # Autorisations déjà formatées
+    alerts: Tuple[Dict[str, str], ...]           # {"message": ...}
+    delay: int
+
+
+@dataclass(frozen=True)
+class DecisionTable:
+    """Table de décision d'un type de projet : attributs et seuils utiles, résultats précalculés."""
+    booleans: Tuple[str, ...]
+    floor_thresholds: Tuple[float, ...]
+    land_thresholds: Tuple[float, ...]
+    outcomes: Dict[tuple, Outcome]
+
+    def __post_init__(self):
+        # Positions des attributs booléens utiles dans ProjectCriteria
+        object.__setattr__(self, '_indexes', tuple(ProjectCriteria._fields.index(name) for name in self.booleans))
+
+    def lookup(self, criteria: ProjectCriteria) -> Outcome:
+        key = [bool(criteria[index]) for index in self._indexes]
+        key.append(segment(criteria.floor_area, self.floor_thresholds))
+        key.append(segment(criteria.land_area, self.land_thresholds))
+        return self.outcomes[tuple(key)]
+
+
+def _compile_table(project_type: Optional[str], cerfa_rules, alert_rules, delay_rules,
+                   cerfa_database: Mapping[str, Any]) -> DecisionTable:
+    cerfa_rules = [rule for rule in cerfa_rules if _applies(rule, project_type)]
+    alert_rules = [rule for rule in alert_rules if _applies(rule, project_type)]
+    delay_rules = [rule for rule in delay_rules if _applies(rule, project_type)]
+
+    conditions = [case.get('when', {}) for rule in cerfa_rules for case in rule['cases']]
+    conditions += [rule.get('when', {}) for rule in (*alert_rules, *delay_rules)]
+    used = {attribute for when in conditions for attribute in when}
+    booleans = tuple(attribute for attribute in BOOLEAN_ATTRIBUTES if attribute in used)
+    thresholds = {
+        attribute: tuple(sorted({threshold for when in conditions
+                                 for _, threshold in when.get(attribute, ())}))
+        for attribute in NUMERIC_ATTRIBUTES
+    }
+
+    formatted = {
+        (cerfa_id, required): {
+            "type": f"CERFA {cerfa_id}",
+            "nom": cerfa_database[cerfa_id]["nom"],
+            "delai_instruction": cerfa_database[cerfa_id]["delai"],
+            "obligatoire": required,
+        }
+        for rule in cerfa_rules for case in rule['cases']
+        for cerfa_ids, required in ((case.get('cerfa', ()), True), (case.get('optional', ()), False))
+        for cerfa_id in cerfa_ids
+    }
+
+    segments = {attribute: [-1, *range(2 * len(values) + 1)] for attribute, values in thresholds.items()}
+    outcomes = {}
+    for flags in product((False, True), repeat=len(booleans)):
+        for floor_segment, land_segment in product(segments['floor_area'], segments['land_area']):
+            values = dict.fromkeys(BOOLEAN_ATTRIBUTES, False)
+            values.update(zip(booleans, flags))
+            values['floor_area'] = _representative(floor_segment, thresholds['floor_area'])
+            values['land_area'] = _representative(land_segment, thresholds['land_area'])
+
+            authorizations = []
+            for rule in cerfa_rules:
+                case = next((case for case in rule['cases'] if _matches(case.get('when', {}), values)), None)
+                if case:
+                    authorizations += [formatted[cerfa_id, True] for cerfa_id in case.get('cerfa', ())]
+                    authorizations += [formatted[cerfa_id, False] for cerfa_id in case.get('optional', ())]
+            alerts = [{"message": rule['message']} for rule in alert_rules if _matches(rule.get('when', {}), values)]
+
+            delays = [doc["delai_instruction"] for doc in authorizations if doc["obligatoire"]]
+            delay = max(delays) if delays else 0
+            if delays:
+                for rule in delay_rules:
+                    if _matches(rule.get('when', {}), values):
+                        delay += rule['days']
+                        alerts.append({"message": rule['message'].format(total=delay)})
+
+            outcomes[flags + (floor_segment, land_segment)] = Outcome(tuple(authorizations), tuple(alerts), delay)
+    return DecisionTable(booleans, thresholds['floor_area'], thresholds['land_area'], outcomes)
+
+
+class CompiledRules:
+    """Règles compilées : une table de décision par type de projet, plus une pour les autres types."""
+
+    def __init__(self, cerfa_database: Mapping[str, Any], cerfa_rules=CERFA_RULES,
+                 alert_rules=ALERT_RULES, delay_rules=DELAY_RULES):
+        _validate(cerfa_rules, alert_rules, delay_rules, cerfa_database)
+        rules = (cerfa_rules, alert_rules, delay_rules, cerfa_database)
+        project_types = {project_type for rule in (*cerfa_rules, *alert_rules, *delay_rules)
+                         for project_type in (*rule.get('types', ()), *rule.get('except_types', ()))}
+        self.tables = {project_type: _compile_table(project_type, *rules) for project_type in project_types}
+        self.default_table = _compile_table(None, *rules)
+
+    @property
+    def size(self) -> int:
+        """Nombre total d'entrées des tables de décision."""
+        return sum(len(table.outcomes) for table in (*self.tables.values(), self.default_table))
+
+    def lookup(self, criteria: ProjectCriteria) -> Outcome:
+        project_type = criteria.project_type
+        table = self.tables.get(project_type) if isinstance(project_type, str) else None
+        return (table or self.default_table).lookup(criteria)
+
+    def evaluate(self, donnees_projet: Dict[str, Any]) -> Dict[str, Any]:
+        """Résultat d'ArchitectBusinessLogic.analyser_projet (nouvelles listes et dictionnaires)."""
+        outcome = self.lookup(project_criteria(donnees_projet))
+        return {
+            "analyse_reglementaire": {
+                "autorisations_requises": list(map(dict.copy, outcome.authorizations)),
+                "alertes_conformite": list(map(dict.copy, outcome.alerts)),
+                "delai_instruction_estime_jours": outcome.delay,
+            }
+        }
+
+
+_compiled_rules: Optional[CompiledRules] = None
+_compiled_rules_lock = threading.Lock()
+
+
+def get_compiled_rules() -> CompiledRules:
+    """Retourne les règles compilées (compilées à la première demande)."""
+    global _compiled_rules
+    if _compiled_rules is None:
+        from architect_business_logic import CERFA_DATABASE
+        with _compiled_rules_lock:
+            if _compiled_rules is None:
+                _compiled_rules = CompiledRules(CERFA_DATABASE)
+    return _compiled_rules
@@ -0,0 +1,56 @@
+"""
+Cache des analyses : analyser_projet à chaque rafraîchissement vs reprise du cache
+
+Simule une session de l'assistant : saisie caractère par caractère d'un projet (une
+analyse par frappe) entrecoupée de rafraîchissements périodiques sans modification,
+et vérifie que chaque résultat du cache est identique à une analyse directe.
+
+Usage : python benchmarks/bench_analysis_cache.py [--refreshes N]
+"""
+
+import argparse
+import copy
+import sys
+
+from common import SAMPLE_PROJECT, best_of
+
+from analysis_cache import AnalysisCache
+from architect_business_logic import ArchitectBusinessLogic
+from utils import thaw
+
+
+def typing_session(project, refreshes):
+    """États successifs du projet : une frappe par état, `refreshes` rafraîchissements sans changement entre deux."""
+    states = []
+    current = {section: {} for section in project}
+    for section, fields in project.items():
+        for field, value in fields.items():
+            text = value if isinstance(value, str) else None
+            for end in range(1, len(text) + 1) if text else (None,):
+                current[section][field] = text[:end] if text else value
+                states.extend(copy.deepcopy(current) for _ in range(refreshes + 1))
+    return states
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--refreshes', type=int, default=3, help="Rafraîchissements sans changement après chaque frappe")
+    args = parser.parse_args()
+
+    logic = ArchitectBusinessLogic()
+    states = typing_session(SAMPLE_PROJECT, args.refreshes)
+    cache = AnalysisCache(logic)
+    mismatches = sum(thaw(cache.analyse(state)) != logic.analyser_projet(state) for state in states)
+    stats = cache.stats()
+    print(f"Session simulée : {len(states)} analyses, {stats['misses']} calculées, {stats['hits']} reprises "
+          f"du cache (taux {stats['hit_rate']:.0%}), {mismatches} différence(s)")
+
+    direct = best_of(lambda: [logic.analyser_projet(state) for state in states], repeat=5) / len(states)
+    cached = best_of(lambda: [cache.analyse(state) for state in states], repeat=5) / len(states)
+    print(f"analyser_projet direct : {direct * 1e6:.2f} µs/analyse")
+    print(f"cache (session rejouée) : {cached * 1e6:.2f} µs/analyse (x{direct / cached:.1f})")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+"""
+Benchmark des modes de génération des apparences : champs remplis par seconde, par modèle
+
+Deux jeux de données : le projet d'exemple, et tous les champs du modèle remplis
+(cas le plus défavorable pour le mode 'immediate').
+
+Usage : python benchmarks/bench_appearance_modes.py [--repeat N] [--save-profile NOM]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from common import SAMPLE_PROJECT
+
+import fitz
+from architect_profiles import get_architect_fields
+from config import Config
+from pdf_filler import _fill_document, build_form_data, get_save_options, FormFillResult
+from template_cache import get_template_cache
+from widget_index import get_widget_index_store
+
+
+def all_fields_data(widget_index):
+    """Une valeur pour chaque champ du modèle (cases cochées, texte ailleurs)."""
+    return {name: "On" if entries[0][3] is not None else f"Valeur {name[:8]}"
+            for name, entries in widget_index.items()}
+
+
+def measure(template, widget_index, final_data, mode, save_options):
+    """(champs remplis, durée du remplissage, durée de la sauvegarde) pour un mode."""
+    doc = fitz.open(stream=template.data, filetype="pdf")
+    result = FormFillResult(template.cerfa_id)
+    start = time.perf_counter()
+    _fill_document(doc, widget_index, final_data, result, mode)
+    fill_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc.tobytes(**save_options)
+    save_time = time.perf_counter() - start
+    doc.close()
+    return len(result.fields_filled), fill_time, save_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de mesures par cas (meilleur temps retenu)")
+    parser.add_argument('--save-profile', default='fast', choices=list(Config.PDF_SAVE_PROFILES))
+    args = parser.parse_args()
+    save_options = get_save_options(args.save_profile)
+    modes = Config.PDF_APPEARANCE_MODES
+
+    print(f"Profil de sauvegarde : {args.save_profile}")
+    print(f"{'CERFA':<10}{'données':<10}{'champs':>8}"
+          + "".join(f"{mode + ' champs/s':>26}{'+save (ms)':>12}" for mode in modes))
+
+    for template_path in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf")):
+        cerfa_id = template_path.stem[len("cerfa_"):]
+        template = get_template_cache().get(cerfa_id)
+        widget_index = get_widget_index_store().get(cerfa_id, template.sha256)
+        with contextlib.redirect_stdout(io.StringIO()):  # Avertissements des CERFA sans mappage
+            sample_data = build_form_data(cerfa_id, get_architect_fields(), SAMPLE_PROJECT)
+
+        for label, final_data in (('exemple', sample_data), ('complet', all_fields_data(widget_index))):
+            row, filled = "", 0
+            for mode in modes:
+                best_fill = best_save = float('inf')
+                for _ in range(args.repeat):
+                    filled, fill_time, save_time = measure(template, widget_index, final_data, mode, save_options)
+                    best_fill, best_save = min(best_fill, fill_time), min(best_save, save_time)
+                row += f"{filled / best_fill:>26.0f}{(best_fill + best_save) * 1000:>12.1f}"
+            print(f"{cerfa_id:<10}{label:<10}{filled:>8}" + row)
+
+
+if __name__ == '__main__':
+    main()
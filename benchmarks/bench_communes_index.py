@@ -0,0 +1,83 @@
+"""
+Index des communes : recherche par dichotomie dans le fichier projeté vs parcours d'une liste
+
+Construit dans un répertoire temporaire un index de communes SYNTHÉTIQUES (codes et
+populations aléatoires, de la taille du fichier de l'INSEE), vérifie chaque recherche
+contre un dictionnaire de référence, puis mesure le chargement, la recherche par code
+INSEE et par code postal, et un parcours linéaire des enregistrements.
+
+Usage : python benchmarks/bench_communes_index.py [--communes N] [--seed N]
+Le code de sortie vaut 1 si une recherche diffère de la référence.
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from common import best_of
+
+from communes_index import Commune, CommuneIndex, write_index
+
+
+def synthetic_communes(rng, count):
+    """Communes fictives : code INSEE -> (nom, population), couples (code postal, code INSEE)."""
+    communes, postal_codes = {}, []
+    while len(communes) < count:
+        insee = f"{rng.randrange(1, 96):02d}{rng.randrange(1, 1000):03d}"
+        if insee in communes:
+            continue
+        communes[insee] = (f"Commune {insee}", int(rng.lognormvariate(6.5, 1.5)))
+        postal = f"{insee[:2]}{rng.randrange(0, 1000, 10):03d}"  # Codes postaux partagés
+        postal_codes.append((postal, insee))
+    return communes, postal_codes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--communes', type=int, default=35_000)
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    communes, postal_codes = synthetic_communes(rng, args.communes)
+    reference = {insee: Commune(insee, name, population) for insee, (name, population) in communes.items()}
+    by_postal = {}
+    for postal, insee in sorted(postal_codes):
+        by_postal.setdefault(postal, []).append(reference[insee])
+    misses = [f"{rng.randrange(96, 100)}{rng.randrange(1000):03d}" for _ in range(1000)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory) / 'communes.idx'
+        write_index(path, communes, postal_codes)
+        index = CommuneIndex(path)
+        start = time.perf_counter()
+        index.by_insee('00000')
+        load = time.perf_counter() - start
+
+        mismatches = sum(index.by_insee(insee) != commune for insee, commune in reference.items())
+        mismatches += sum(index.by_postal_code(postal) != found for postal, found in by_postal.items())
+        mismatches += sum(index.by_insee(code) is not None for code in misses)
+        print(f"{len(reference)} communes synthétiques, {len(by_postal)} codes postaux, "
+              f"fichier de {path.stat().st_size / 1024:.0f} Ko : {mismatches} différence(s)")
+
+        sample = rng.sample(sorted(reference), 1000)
+        postal_sample = rng.sample(sorted(by_postal), 1000)
+        records = list(reference.values())
+        insee_lookup = best_of(lambda: [index.by_insee(code) for code in sample], repeat=5) / len(sample)
+        postal_lookup = best_of(lambda: [index.above_threshold(code) for code in postal_sample],
+                                repeat=5) / len(postal_sample)
+        scan = best_of(lambda: [next(c for c in records if c.insee == code) for code in sample[:50]],
+                       repeat=3) / 50
+
+    print(f"chargement (mmap, premier usage) : {load * 1e6:.0f} µs")
+    print(f"recherche par code INSEE         : {insee_lookup * 1e6:.2f} µs")
+    print(f"seuil par code postal            : {postal_lookup * 1e6:.2f} µs")
+    print(f"parcours linéaire (référence)    : {scan * 1e6:.0f} µs")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
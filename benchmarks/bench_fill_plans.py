@@ -0,0 +1,63 @@
+"""
+Micro-benchmark du coût de mappage par remplissage : mappage brut vs plans compilés
+
+Usage : python benchmarks/bench_fill_plans.py
+"""
+
+from common import SAMPLE_PROJECT, best_of
+
+from cerfa_field_mappings import CERFA_FIELD_MAPPINGS
+from fill_plans import get_fill_plan
+from pdf_filler import build_form_data, get_nested_value
+
+ARCHITECT_FIELDS = {'H1N_nom': 'Martin', 'H1P_prenom': 'Cécile'}
+
+
+def legacy_form_data(cerfa_id, project_data):
+    """Référence : boucle d'origine de fill_pdf sur le mappage brut."""
+    final_data = dict(ARCHITECT_FIELDS)
+    cerfa_mapping = CERFA_FIELD_MAPPINGS.get(cerfa_id)
+    for generic_key, cerfa_field in cerfa_mapping.items():
+        if not cerfa_field:
+            continue
+        value = get_nested_value(project_data, generic_key)
+        if value is None or value == "":
+            continue
+        if isinstance(cerfa_field, dict):
+            if value in cerfa_field and cerfa_field[value]:
+                final_data[cerfa_field[value]] = "On"
+        elif "date" in generic_key.lower() and isinstance(value, str) and '-' in value:
+            try:
+                parts = value.split('-')
+                if len(parts) == 3 and cerfa_mapping.get(f"{generic_key}.jour"):
+                    final_data[cerfa_mapping[f"{generic_key}.jour"]] = parts[2]
+                    final_data[cerfa_mapping[f"{generic_key}.mois"]] = parts[1]
+                    final_data[cerfa_mapping[f"{generic_key}.annee"]] = parts[0]
+                else:
+                    final_data[cerfa_field] = value
+            except Exception:
+                final_data[cerfa_field] = value
+        else:
+            final_data[cerfa_field] = value
+    return final_data
+
+
+def planned_form_data(cerfa_id, project_data):
+    """Plans compilés : chemins pré-découpés et opérations déjà déterminées."""
+    return build_form_data(cerfa_id, ARCHITECT_FIELDS, project_data)
+
+
+def main():
+    print(f"{'CERFA':<10} {'brut (µs)':>10} {'plan (µs)':>10} {'gain':>6}")
+    for cerfa_id in CERFA_FIELD_MAPPINGS:
+        get_fill_plan(cerfa_id)  # Compilation hors mesure, comme à l'import
+        expected = legacy_form_data(cerfa_id, SAMPLE_PROJECT)
+        assert planned_form_data(cerfa_id, SAMPLE_PROJECT) == expected, cerfa_id
+
+        legacy = best_of(lambda: legacy_form_data(cerfa_id, SAMPLE_PROJECT), number=2000)
+        planned = best_of(lambda: planned_form_data(cerfa_id, SAMPLE_PROJECT), number=2000)
+        print(f"{cerfa_id:<10} {legacy * 1e6:>10.1f} {planned * 1e6:>10.1f} {legacy / planned:>5.1f}x")
+
+
+if __name__ == '__main__':
+    main()
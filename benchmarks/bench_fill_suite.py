@@ -0,0 +1,182 @@
+"""
+Suite de benchmarks du remplissage : tous les modèles, trois densités de données, comparaison à une référence
+
+Chaque cas (modèle x densité) est mesuré dans un processus neuf : durée réelle et temps
+CPU par remplissage (médiane et meilleur temps, après un remplissage de chauffe non
+compté), pic de mémoire résidente et taille du PDF produit. Le cache de sortie est
+désactivé. Aucun accès réseau.
+
+Usage :
+    python benchmarks/bench_fill_suite.py [--repeat N] [--output resultats.json]
+    python benchmarks/bench_fill_suite.py --baseline reference.json [--threshold 0.20]
+Le code de sortie vaut 1 si un cas régresse au-delà du seuil par rapport à la référence,
+ou s'il échoue alors qu'il réussissait dans la référence.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+from common import BASE_DIR, DENSITIES, project_for_density
+
+from config import Config
+
+RESULTS_DIR = BASE_DIR / 'benchmarks' / 'results'
+RESULTS_FORMAT_VERSION = 1
+
+# Métriques comparées à la référence ; les durées ne régressent qu'au-delà de --min-delta-ms
+COMPARED_METRICS = ('wall_ms', 'cpu_ms', 'peak_rss_kb', 'output_bytes')
+TIME_METRICS = ('wall_ms', 'cpu_ms')
+
+
+def run_case(cerfa_id, density, repeat, save_profile, appearance_mode):
+    """Mesure un cas dans le processus courant (appelé par le processus enfant)."""
+    Config.USE_OUTPUT_CACHE = False  # Mesurer le remplissage, pas le cache
+    from pdf_filler import build_form_data, fill_pdf_to_bytes
+    from architect_profiles import get_architect_fields
+
+    project = project_for_density(density, cerfa_id)
+    with contextlib.redirect_stdout(io.StringIO()):  # Avertissements des CERFA sans mappage
+        fields = len(build_form_data(cerfa_id, get_architect_fields(), project))
+        rss_before_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        fill_pdf_to_bytes(cerfa_id, project, save_profile=save_profile, appearance_mode=appearance_mode)
+
+        wall, cpu = [], []
+        for _ in range(repeat):
+            wall_start, cpu_start = time.perf_counter(), time.process_time()
+            pdf_bytes = fill_pdf_to_bytes(cerfa_id, project, save_profile=save_profile,
+                                          appearance_mode=appearance_mode)
+            cpu.append(time.process_time() - cpu_start)
+            wall.append(time.perf_counter() - wall_start)
+
+    return {
+        'cerfa_id': cerfa_id,
+        'density': density,
+        'fields': fields,
+        'wall_ms': round(statistics.median(wall) * 1000, 3),
+        'wall_best_ms': round(min(wall) * 1000, 3),
+        'cpu_ms': round(statistics.median(cpu) * 1000, 3),
+        'cpu_best_ms': round(min(cpu) * 1000, 3),
+        'rss_before_kb': rss_before_kb,
+        'peak_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,  # Ko sous Linux
+        'output_bytes': len(pdf_bytes),
+    }
+
+
+def measure_in_subprocess(cerfa_id, density, args):
+    """Lance un processus neuf pour un cas et retourne ses mesures."""
+    command = [sys.executable, __file__, '--child', cerfa_id, density, '--repeat', str(args.repeat),
+               '--save-profile', args.save_profile, '--appearance-mode', args.appearance_mode]
+    completed = subprocess.run(command, capture_output=True, text=True)
+    if completed.returncode != 0:
+        last_lines = completed.stderr.strip().splitlines()[-1:]
+        return {'cerfa_id': cerfa_id, 'density': density, 'returncode': completed.returncode,
+                'error': last_lines[0] if last_lines else f"processus terminé avec le code {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """
+    Liste des régressions (cas, métrique, référence, mesure) au-delà du seuil relatif.
+
+    Un cas réussi dans la référence et en erreur maintenant est une régression de métrique 'error'.
+    """
+    reference = {(case['cerfa_id'], case['density']): case for case in baseline['cases'] if 'error' not in case}
+    regressions = []
+    for case in results['cases']:
+        previous = reference.get((case['cerfa_id'], case['density']))
+        if previous is None:
+            continue
+        if 'error' in case:
+            regressions.append((case['cerfa_id'], case['density'], 'error', None, case['error']))
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = previous.get(metric), case.get(metric)
+            if not old or new is None or new <= old * (1 + threshold):
+                continue
+            if metric in TIME_METRICS and new - old < min_delta_ms:
+                continue  # Écart relatif important mais négligeable en absolu (bruit de mesure)
+            regressions.append((case['cerfa_id'], case['density'], metric, old, new))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Remplissages mesurés par cas (médiane et meilleur temps)")
+    parser.add_argument('--densities', nargs='+', default=list(DENSITIES), choices=DENSITIES)
+    parser.add_argument('--templates', nargs='+', help="CERFA à mesurer (défaut : tous les modèles)")
+    parser.add_argument('--save-profile', default=Config.PDF_DEFAULT_SAVE_PROFILE, choices=list(Config.PDF_SAVE_PROFILES))
+    parser.add_argument('--appearance-mode', default=Config.PDF_DEFAULT_APPEARANCE_MODE, choices=Config.PDF_APPEARANCE_MODES)
+    parser.add_argument('--output', type=Path, help="Fichier JSON des résultats (défaut : benchmarks/results/fill_suite_<date>.json)")
+    parser.add_argument('--baseline', type=Path, help="Résultats de référence à comparer")
+    parser.add_argument('--threshold', type=float, default=0.20, help="Régression relative tolérée (0.20 = +20 %%)")
+    parser.add_argument('--min-delta-ms', type=float, default=2.0, help="Écart absolu minimal pour signaler une durée")
+    parser.add_argument('--child', nargs=2, metavar=('CERFA', 'DENSITE'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_case(*args.child, args.repeat, args.save_profile, args.appearance_mode)))
+        return 0
+
+    import fitz
+    cerfa_ids = args.templates or [path.stem[len("cerfa_"):]
+                                   for path in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf"))]
+    results = {
+        'version': RESULTS_FORMAT_VERSION,
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'pymupdf': fitz.VersionBind,
+            'machine': f"{platform.system()} {platform.machine()}",
+            'repeat': args.repeat,
+            'save_profile': args.save_profile,
+            'appearance_mode': args.appearance_mode,
+            'lite_templates': Config.USE_LITE_TEMPLATES,
+        },
+        'cases': [],
+    }
+
+    print(f"Profil de sauvegarde : {args.save_profile}, apparences : {args.appearance_mode}, {args.repeat} mesures par cas")
+    print(f"{'CERFA':<10}{'densité':<9}{'champs':>7}{'réel (ms)':>11}{'CPU (ms)':>10}{'RSS max (Mo)':>14}{'sortie (Ko)':>13}")
+    for cerfa_id in cerfa_ids:
+        for density in args.densities:
+            case = measure_in_subprocess(cerfa_id, density, args)
+            results['cases'].append(case)
+            if 'error' in case:
+                print(f"{cerfa_id:<10}{density:<9}  erreur (code {case['returncode']}) : {case['error']}")
+                continue
+            print(f"{cerfa_id:<10}{density:<9}{case['fields']:>7}{case['wall_ms']:>11.1f}{case['cpu_ms']:>10.1f}"
+                  f"{case['peak_rss_kb'] / 1024:>14.1f}{case['output_bytes'] / 1024:>13.0f}")
+
+    output = args.output or RESULTS_DIR / f"fill_suite_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2, ensure_ascii=False) + '\n', encoding='utf-8')
+    print(f"Résultats : {output}")
+
+    if not args.baseline:
+        return 0
+    baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+    for key in ('pymupdf', 'save_profile', 'appearance_mode'):
+        if baseline['meta'].get(key) != results['meta'][key]:
+            print(f"Attention : {key} diffère de la référence ({baseline['meta'].get(key)} -> {results['meta'][key]})")
+    regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+    for cerfa_id, density, metric, old, new in regressions:
+        if metric == 'error':
+            print(f"RÉGRESSION {cerfa_id} {density} : réussi dans la référence, en erreur maintenant ({new})")
+            continue
+        print(f"RÉGRESSION {cerfa_id} {density} {metric} : {old} -> {new} (+{(new / old - 1) * 100:.0f} %)")
+    print(f"{len(regressions)} régression(s) au-delà de +{args.threshold * 100:.0f} % par rapport à {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
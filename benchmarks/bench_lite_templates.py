@@ -0,0 +1,78 @@
+"""
+Benchmark des modèles allégés : ouverture, remplissage, sauvegarde et taille produite, original contre allégé
+
+Prérequis : python build_lite_templates.py
+Usage : python benchmarks/bench_lite_templates.py [--repeat N] [--save-profile NOM]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from common import SAMPLE_PROJECT
+
+import fitz
+from architect_profiles import get_architect_fields
+from config import Config
+from pdf_filler import _fill_document, build_form_data, get_save_options, FormFillResult
+from template_cache import TemplateCache
+from widget_index import extract_widget_index
+
+VARIANTS = {'original': TemplateCache(use_lite=False), 'lite': TemplateCache(use_lite=True)}
+
+
+def measure(template, final_data, save_options):
+    """Durées (ouverture, remplissage, sauvegarde) et taille produite pour un remplissage."""
+    start = time.perf_counter()
+    doc = fitz.open(stream=template.data, filetype="pdf")
+    open_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    _fill_document(doc, extract_widget_index(doc), final_data, FormFillResult(template.cerfa_id))
+    fill_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    size = len(doc.tobytes(**save_options))
+    save_time = time.perf_counter() - start
+    doc.close()
+    return open_time, fill_time, save_time, size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de mesures par cas (meilleur temps retenu)")
+    parser.add_argument('--save-profile', default=Config.PDF_DEFAULT_SAVE_PROFILE, choices=list(Config.PDF_SAVE_PROFILES))
+    args = parser.parse_args()
+    save_options = get_save_options(args.save_profile)
+
+    print(f"Profil de sauvegarde : {args.save_profile}")
+    print(f"{'CERFA':<10}{'modèle':<10}{'source (Ko)':>12}{'open (ms)':>11}{'fill (ms)':>11}{'save (ms)':>11}{'sortie (Ko)':>13}")
+
+    totals = {name: [0.0] * 5 for name in VARIANTS}
+    for template_path in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf")):
+        cerfa_id = template_path.stem[len("cerfa_"):]
+        with contextlib.redirect_stdout(io.StringIO()):  # Avertissements des CERFA sans mappage
+            final_data = build_form_data(cerfa_id, get_architect_fields(), SAMPLE_PROJECT)
+
+        for name, cache in VARIANTS.items():
+            template = cache.get(cerfa_id)
+            if name == 'lite' and not template.lite:
+                print(f"{cerfa_id:<10}{name:<10}  (pas de version allégée à jour)")
+                continue
+            best = [float('inf')] * 3
+            for _ in range(args.repeat):
+                *durations, size = measure(template, final_data, save_options)
+                best = [min(b, d) for b, d in zip(best, durations)]
+            for i, value in enumerate([len(template.data), *best, size]):
+                totals[name][i] += value
+            print(f"{cerfa_id:<10}{name:<10}{len(template.data) / 1024:>12.0f}"
+                  + "".join(f"{d * 1000:>11.1f}" for d in best) + f"{size / 1024:>13.0f}")
+
+    for name, (source, open_time, fill_time, save_time, size) in totals.items():
+        print(f"{'TOTAL':<10}{name:<10}{source / 1024:>12.0f}{open_time * 1000:>11.1f}"
+              f"{fill_time * 1000:>11.1f}{save_time * 1000:>11.1f}{size / 1024:>13.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Analyse d'un portefeuille : analyser_projet projet par projet vs analyse vectorisée (NumPy)
+
+Vérifie d'abord que l'analyse vectorisée, reconvertie au format de analyser_projet,
+est identique projet par projet (règles de l'application, puis règles dont le seuil
+de 150 m² est déplacé), puis mesure les deux approches.
+
+Usage : python benchmarks/bench_portfolio.py [--projects N] [--seed N]
+Le code de sortie vaut 1 si un projet diverge.
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from common import best_of
+
+from architect_business_logic import CERFA_DATABASE, ArchitectBusinessLogic
+from architect_rules import ALERT_RULES, CERFA_RULES, DELAY_RULES, CompiledRules
+from portfolio_analysis import PortfolioColumns, analyse_portfolio
+from tests.test_architect_rules import outcome, random_project
+
+
+def shift_threshold(rules, old, new):
+    """Copie des règles où toutes les comparaisons au seuil `old` portent sur `new`."""
+    def shift(value):
+        if isinstance(value, dict):
+            return {key: shift(item) for key, item in value.items()}
+        if isinstance(value, tuple) and len(value) == 2 and value[0] in ('<', '<=', '>', '>=') and value[1] == old:
+            return (value[0], new)
+        if isinstance(value, tuple):
+            return tuple(shift(item) for item in value)
+        return value
+    return shift(rules)
+
+
+def count_divergences(projects, expected, analysis):
+    divergences = 0
+    for index, (project, result) in enumerate(zip(projects, expected)):
+        if analysis.to_dict(index) != result:
+            divergences += 1
+            if divergences <= 5:
+                print(f"DIVERGENCE : {project!r}")
+    return divergences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--projects', type=int, default=100_000, help="Taille du portefeuille généré")
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    logic = ArchitectBusinessLogic()
+    projects = []
+    while len(projects) < args.projects:
+        project = random_project(rng)
+        if not isinstance(outcome(logic.analyser_projet, project), tuple):  # Projets analysables
+            projects.append(project)
+
+    columns = PortfolioColumns.from_projects(projects)
+    divergences = count_divergences(projects, [logic.analyser_projet(p) for p in projects],
+                                    analyse_portfolio(columns))
+    print(f"Règles de l'application : {len(projects)} projets, {divergences} divergence(s)")
+
+    shifted = [shift_threshold(rules, 150, 120) for rules in (CERFA_RULES, ALERT_RULES, DELAY_RULES)]
+    compiled = CompiledRules(CERFA_DATABASE, *shifted)
+    shifted_divergences = count_divergences(projects, [compiled.evaluate(p) for p in projects],
+                                            analyse_portfolio(columns, *shifted))
+    print(f"Seuil de 150 m² déplacé à 120 m² : {shifted_divergences} divergence(s)")
+
+    start = time.perf_counter()
+    for project in projects:
+        logic.analyser_projet(project)
+    per_project = time.perf_counter() - start
+    extraction = best_of(lambda: PortfolioColumns.from_projects(projects), repeat=3)
+    vectorized = best_of(lambda: analyse_portfolio(columns), repeat=5)
+    analysis = analyse_portfolio(columns)
+    conversion = best_of(lambda: analysis.to_dicts(range(1000)), repeat=3) / 1000
+
+    print(f"\n{'étape':<44}{'total (ms)':>12}{'µs/projet':>11}")
+    for label, seconds in (("analyser_projet, projet par projet", per_project),
+                           ("extraction des colonnes (from_projects)", extraction),
+                           ("analyse vectorisée (colonnes NumPy)", vectorized)):
+        print(f"{label:<44}{seconds * 1000:>12.1f}{seconds / len(projects) * 1e6:>11.2f}")
+    print(f"{'reconversion au format dict (à la demande)':<44}{'':>12}{conversion * 1e6:>11.2f}")
+    print(f"\nGain de l'analyse vectorisée sur colonnes : x{per_project / vectorized:.0f}")
+    print("CERFA obligatoires par nombre de projets : "
+          + ", ".join(f"{cerfa_id}={count}" for cerfa_id, count in analysis.cerfa_counts().items() if count))
+    return 1 if divergences or shifted_divergences else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,52 @@
+"""
+Analyse réglementaire : chaînes if/elif d'origine vs règles compilées en tables de décision
+
+Débit des deux moteurs, en analyses par seconde, sur des projets générés. L'implémentation
+d'origine et le générateur de projets sont ceux de la vérification différentielle
+(python -m pytest tests/test_architect_rules.py).
+
+Usage : python benchmarks/bench_rules.py [--projects N] [--seed N]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+from common import best_of
+
+from architect_business_logic import CERFA_DATABASE, ArchitectBusinessLogic
+from architect_rules import CERFA_RULES, CompiledRules
+from tests.test_architect_rules import legacy_analyser_projet, outcome, random_project
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--projects', type=int, default=2000, help="Projets générés")
+    parser.add_argument('--seed', type=int, default=2024)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    compiled = CompiledRules(CERFA_DATABASE)
+    print(f"Compilation : {(time.perf_counter() - start) * 1000:.1f} ms, "
+          f"{len(CERFA_RULES)} décisions -> {compiled.size} entrées de tables")
+
+    rng = random.Random(args.seed)
+    corpus = [random_project(rng) for _ in range(args.projects)]
+    logic = ArchitectBusinessLogic()
+    valid = [project for project in corpus if not isinstance(outcome(legacy_analyser_projet, project), tuple)]
+
+    def run(analyse):
+        for project in valid:
+            analyse(project)
+
+    legacy = best_of(lambda: run(legacy_analyser_projet), repeat=5) / len(valid)
+    rules = best_of(lambda: run(logic.analyser_projet), repeat=5) / len(valid)
+    print(f"{'moteur':<22}{'µs/analyse':>12}{'analyses/s':>14}")
+    print(f"{'if/elif (origine)':<22}{legacy * 1e6:>12.2f}{1 / legacy:>14,.0f}")
+    print(f"{'tables de décision':<22}{rules * 1e6:>12.2f}{1 / rules:>14,.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
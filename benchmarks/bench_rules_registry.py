@@ -0,0 +1,84 @@
+"""
+Registre de règles : coût d'accès aux règles partagées et rechargement à chaud
+
+Sur une copie du fichier de règles, vérifiée à chaque accès : un système déjà construit
+doit appliquer un seuil modifié dès l'appel suivant, et un fichier invalide doit laisser
+les règles précédentes en vigueur. Mesure ensuite la construction d'IntelligentFormSystem,
+l'accès aux règles et generer_formulaire_intelligent.
+
+Usage : python benchmarks/bench_rules_registry.py
+Le code de sortie vaut 1 si une vérification échoue.
+"""
+
+import json
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from common import SAMPLE_PROJECT, best_of
+
+from config import Config
+from intelligent_form_system import IntelligentFormSystem, generer_formulaire_intelligent
+from rules_registry import RuleRegistry
+
+
+def pcmi_required(system, surface):
+    """Type du premier CERFA proposé pour une construction neuve de `surface` m² (personne physique)."""
+    projet = {'typeProjet': 'construction_neuve', 'surfacePlancher': surface, 'empriseSol': surface,
+              'codePostalProjet': '34170'}
+    return system.analyser_projet({'client': {}, 'projet': projet, 'technique': {}})['autorisations_requises'][0]['type']
+
+
+def write_rules(path, data, text=None):
+    """Réécrit le fichier (taille différente ou date ultérieure : le registre le voit changer)."""
+    path.write_text(text if text is not None else json.dumps(data, ensure_ascii=False), encoding='utf-8')
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def check_hot_reload(directory):
+    data = json.loads(Config.REGULATORY_RULES_PATH.read_text(encoding='utf-8'))
+    path = Path(directory) / 'regles.json'
+    write_rules(path, data)
+    registry = RuleRegistry(path, check_interval=0)
+    system = IntelligentFormSystem(registry)
+    checks = [("règles initiales : 130 m² en PCMI", pcmi_required(system, 130) == 'CERFA 13406*15')]
+
+    data['regles_urbanisme']['seuils_permis_construire']['personne_physique']['surface_plancher'] = 120
+    write_rules(path, data)
+    checks.append(("seuil abaissé à 120 m² : 130 m² en PC", pcmi_required(system, 130) == 'CERFA 13409*15'))
+
+    write_rules(path, data, text='{"version": 1, "regles_urbanisme": ')
+    checks.append(("fichier invalide : règles précédentes conservées", pcmi_required(system, 130) == 'CERFA 13409*15'))
+    pcmi_required(system, 130)
+    checks.append(("fichier invalide signalé une seule fois", registry.errors == 1))
+
+    try:
+        system.regles_urbanisme['delais_instruction']['declaration_prealable'] = 0
+        checks.append(("règles en lecture seule", False))
+    except TypeError:
+        checks.append(("règles en lecture seule", True))
+
+    for label, ok in checks:
+        print(f"{'OK ' if ok else 'ÉCHEC'} {label}")
+    print(f"Registre : {registry.stats()}")
+    return all(ok for _, ok in checks)
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        ok = check_hot_reload(directory)
+
+    system = IntelligentFormSystem()
+    construction = best_of(IntelligentFormSystem, repeat=5, number=1000)
+    access = best_of(lambda: system.regles_urbanisme, repeat=5, number=1000)
+    form = best_of(lambda: generer_formulaire_intelligent(SAMPLE_PROJECT), repeat=5, number=200)
+    print(f"\nIntelligentFormSystem()        : {construction * 1e6:.2f} µs")
+    print(f"accès aux règles               : {access * 1e6:.2f} µs")
+    print(f"generer_formulaire_intelligent : {form * 1e6:.2f} µs/appel (système partagé)")
+    return 0 if ok else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,65 @@
+"""
+Benchmark des profils de sauvegarde PDF : temps de sauvegarde et taille produite par modèle
+
+Usage : python benchmarks/bench_save_profiles.py [--repeat N]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from common import SAMPLE_PROJECT
+
+import fitz
+from architect_profiles import get_architect_fields
+from config import Config
+from pdf_filler import _fill_document, build_form_data, FormFillResult
+from template_cache import get_template_cache
+from widget_index import get_widget_index_store
+
+
+def filled_document(cerfa_id):
+    """Ouvre le modèle et le remplit avec le projet d'exemple (sans sauvegarder)."""
+    template = get_template_cache().get(cerfa_id)
+    doc = fitz.open(stream=template.data, filetype="pdf")
+    widget_index = get_widget_index_store().get(cerfa_id, template.sha256, doc)
+    with contextlib.redirect_stdout(io.StringIO()):  # Avertissements des CERFA sans mappage
+        final_data = build_form_data(cerfa_id, get_architect_fields(), SAMPLE_PROJECT)
+    _fill_document(doc, widget_index, final_data, FormFillResult(cerfa_id))
+    return doc
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=3, help="Nombre de mesures par cas (meilleur temps retenu)")
+    args = parser.parse_args()
+
+    profiles = list(Config.PDF_SAVE_PROFILES)
+    header = f"{'CERFA':<10}" + "".join(f"{name + ' (ms)':>16}{name + ' (Ko)':>16}" for name in profiles)
+    print(header)
+
+    totals = {name: [0.0, 0] for name in profiles}
+    for template_path in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf")):
+        cerfa_id = template_path.stem[len("cerfa_"):]
+        row = f"{cerfa_id:<10}"
+        for name in profiles:
+            options = Config.PDF_SAVE_PROFILES[name]
+            best, size = float('inf'), 0
+            for _ in range(args.repeat):
+                # Document neuf à chaque mesure : la sauvegarde modifie la structure en mémoire
+                doc = filled_document(cerfa_id)
+                start = time.perf_counter()
+                size = len(doc.tobytes(**options))
+                best = min(best, time.perf_counter() - start)
+                doc.close()
+            totals[name][0] += best
+            totals[name][1] += size
+            row += f"{best * 1000:>16.1f}{size / 1024:>16.0f}"
+        print(row)
+
+    print(f"{'TOTAL':<10}" + "".join(f"{t * 1000:>16.1f}{s / 1024:>16.0f}" for t, s in totals.values()))
+
+
+if __name__ == '__main__':
+    main()
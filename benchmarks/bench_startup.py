@@ -0,0 +1,93 @@
+"""
+Benchmark du démarrage de l'assistant : temps d'import (python -X importtime) et temps jusqu'au premier affichage
+
+Chaque mesure est faite dans un nouvel interpréteur. Le premier affichage n'est mesuré
+que si un serveur graphique est disponible (DISPLAY, ou Windows/macOS).
+
+Usage : python benchmarks/bench_startup.py [--repeat N] [--top N] [--module NOM]
+"""
+
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+from common import BASE_DIR
+
+from intelligent_interface import EXIT_AFTER_FIRST_FRAME_ENV
+
+# Modules lourds qui ne doivent pas être importés avant le premier affichage
+HEAVY_MODULES = ('fitz', 'pymupdf', 'multiprocessing', 'cerfa_field_mappings',
+                 'architect_business_logic', 'fill_plans', 'pdf_filler')
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def import_profile(module):
+    """(durée cumulée du module en ms, {module: (self ms, cumulé ms)}) dans un nouvel interpréteur."""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                               cwd=BASE_DIR, capture_output=True, text=True, check=True)
+    modules = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, _, name = match.groups()
+            modules[name] = (int(self_us) / 1000, int(cumulative_us) / 1000)
+    return modules[module][1], modules
+
+
+def loaded_heavy_modules(module):
+    """Modules lourds présents dans sys.modules après l'import du module."""
+    code = f"import sys, {module}; print(' '.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    completed = subprocess.run([sys.executable, '-c', code], cwd=BASE_DIR,
+                               capture_output=True, text=True, check=True)
+    return completed.stdout.split()
+
+
+def has_display():
+    return sys.platform in ('win32', 'darwin') or bool(os.environ.get('DISPLAY'))
+
+
+def first_frame_ms():
+    """Temps jusqu'au premier affichage mesuré par l'assistant lui-même, en ms."""
+    env = dict(os.environ, **{EXIT_AFTER_FIRST_FRAME_ENV: '1'})
+    completed = subprocess.run([sys.executable, 'intelligent_interface.py'], cwd=BASE_DIR, env=env,
+                               capture_output=True, text=True, timeout=60, check=True)
+    match = re.search(r"first_frame_ms=([\d.]+)", completed.stdout)
+    if not match:
+        raise RuntimeError(f"Mesure absente de la sortie : {completed.stdout!r}")
+    return float(match.group(1))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="Nombre de mesures (médiane et minimum affichés)")
+    parser.add_argument('--top', type=int, default=10, help="Nombre de modules les plus coûteux affichés")
+    parser.add_argument('--module', default='intelligent_interface', help="Module dont l'import est mesuré")
+    args = parser.parse_args()
+
+    profiles = [import_profile(args.module) for _ in range(args.repeat)]
+    totals = [total for total, _ in profiles]
+    print(f"Import de {args.module} : médiane {statistics.median(totals):.1f} ms, min {min(totals):.1f} ms")
+
+    fastest = min(profiles, key=lambda profile: profile[0])[1]
+    print(f"\n{'module':<40}{'self (ms)':>10}{'cumulé (ms)':>13}")
+    for name, (self_ms, cumulative_ms) in sorted(fastest.items(), key=lambda item: -item[1][0])[:args.top]:
+        print(f"{name:<40}{self_ms:>10.1f}{cumulative_ms:>13.1f}")
+
+    heavy = loaded_heavy_modules(args.module)
+    print(f"\nModules lourds chargés à l'import : {', '.join(heavy) if heavy else 'aucun'}")
+
+    if args.module != 'intelligent_interface':
+        return
+    if not has_display():
+        print("Premier affichage : non mesuré (aucun serveur graphique)")
+        return
+    frames = [first_frame_ms() for _ in range(args.repeat)]
+    print(f"Premier affichage : médiane {statistics.median(frames):.1f} ms, min {min(frames):.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+"""
+Outils communs aux scripts de benchmark (données de projet synthétiques, mesures)
+"""
+
+import sys
+import time
+from pathlib import Path
+
+# Les modules de l'application sont à la racine du dépôt
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+SAMPLE_PROJECT = {
+    'client': {
+        'civilite': 'M.', 'nom': 'Durand', 'prenom': 'Paul', 'dateNaissance': '1980-04-12',
+        'lieuNaissance': 'Nîmes', 'adresse': '3 rue des Lilas', 'codePostal': '34000',
+        'ville': 'Montpellier', 'telephone': '0600000000', 'email': 'paul.durand@email.fictif.fr',
+    },
+    'projet': {
+        'typeProjet': 'construction_neuve', 'destination': 'habitation',
+        'adresseProjet': '1 chemin Vert', 'codePostalProjet': '34170', 'villeProjet': 'Castelnau-le-Lez',
+        'referenceCadastrale': 'AB 12', 'surfaceTerrain': '600', 'surfacePlancher': '120',
+        'empriseSol': '100', 'nombreNiveaux': '2', 'dateDepotSouhaitee': '2026-01-15',
+    },
+    'technique': {'zoneProtegee': True, 'demolition': True},
+}
+
+
+def best_of(func, repeat=5, number=1):
+    """Meilleur temps (secondes par appel) sur `repeat` séries de `number` appels."""
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best
+
+
+# Densités de données synthétiques : quelques champs, projet type, toutes les clés mappées
+DENSITIES = ('sparse', 'typical', 'full')
+
+SPARSE_PROJECT = {
+    'client': {'nom': 'Durand', 'prenom': 'Paul'},
+    'projet': {'typeProjet': 'extension'},
+}
+
+
+def _set_path(data, path, value):
+    """Écrit une valeur à un chemin découpé ; ignorée si un parent n'est pas un dictionnaire."""
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+        if not isinstance(data, dict):
+            return
+    data[path[-1]] = value
+
+
+def full_project(cerfa_id):
+    """Projet synthétique renseignant toutes les clés du mappage du CERFA."""
+    from fill_plans import OP_CHOICE, OP_DATE, get_fill_plan, resolve_path
+
+    project = {}
+    plan = get_fill_plan(cerfa_id)
+    for step in plan.steps if plan else ():
+        if step.op == OP_CHOICE:
+            value = next(iter(step.choices))
+        elif step.op == OP_DATE:
+            value = '2026-01-15'
+        else:
+            sample = resolve_path(SAMPLE_PROJECT, step.path)
+            value = sample if isinstance(sample, str) else f"Valeur {step.path[-1]}"
+        _set_path(project, step.path, value)
+    return project
+
+
+def project_for_density(density, cerfa_id):
+    """Données de projet d'une densité de DENSITIES pour un CERFA."""
+    if density == 'sparse':
+        return SPARSE_PROJECT
+    if density == 'typical':
+        return SAMPLE_PROJECT
+    if density == 'full':
+        return full_project(cerfa_id)
+    raise ValueError(f"Densité inconnue : {density} (disponibles : {', '.join(DENSITIES)})")
@@ -0,0 +1,122 @@
+"""
+Construit le pack de modèles CERFA allégés (cerfa_templates/lite/)
+
+Chaque modèle est réécrit une fois pour toutes sans objets inutilisés, avec flux
+compressés et flux d'objets. Les widgets de la version allégée sont comparés à ceux
+de l'original : un modèle dont un champ diffère n'est pas retenu. Le manifeste
+(manifest.json) associe l'empreinte de chaque original à celle de sa version allégée ;
+TemplateCache n'utilise une version allégée que si l'original n'a pas changé depuis.
+
+Usage :
+    python build_lite_templates.py            # Tous les modèles
+    python build_lite_templates.py 13406-15   # Modèles indiqués
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+import fitz  # PyMuPDF
+
+from config import Config
+from template_cache import LITE_MANIFEST_NAME, LITE_MANIFEST_VERSION
+
+logger = logging.getLogger('ArchiBot.build_lite_templates')
+
+
+def widget_signature(doc) -> List[Tuple[Any, ...]]:
+    """Description des widgets indépendante des numéros d'objets (xref)."""
+    signature = []
+    for page in doc:
+        for widget in page.widgets():
+            rect = tuple(round(coord, 2) for coord in widget.rect)
+            signature.append((page.number, widget.field_name, widget.field_type,
+                              widget.field_flags, widget.field_value, rect))
+    return sorted(signature, key=repr)
+
+
+def build_lite_template(source_data: bytes) -> bytes:
+    """Retourne la version allégée d'un modèle ; lève ValueError si ses widgets diffèrent."""
+    with fitz.open(stream=source_data, filetype="pdf") as source:
+        lite_data = source.tobytes(**Config.LITE_TEMPLATE_SAVE_OPTIONS)
+        with fitz.open(stream=lite_data, filetype="pdf") as lite:
+            if widget_signature(lite) != widget_signature(source):
+                raise ValueError("les widgets de la version allégée diffèrent de l'original")
+    return lite_data
+
+
+def build_pack(cerfa_ids=None) -> Dict[str, Any]:
+    """Construit les modèles allégés et écrit le manifeste ; retourne celui-ci."""
+    lite_dir = Config.LITE_TEMPLATES_DIR
+    lite_dir.mkdir(parents=True, exist_ok=True)
+    manifest_path = lite_dir / LITE_MANIFEST_NAME
+
+    templates = {}
+    if manifest_path.exists():
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            previous = json.load(f)
+        if previous.get('version') == LITE_MANIFEST_VERSION:
+            templates = previous.get('templates', {})
+
+    if cerfa_ids is None:
+        cerfa_ids = [p.stem[len("cerfa_"):] for p in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf"))]
+
+    for cerfa_id in cerfa_ids:
+        source_path = Config.CERFA_TEMPLATES_DIR / f"cerfa_{cerfa_id}.pdf"
+        lite_path = lite_dir / source_path.name
+        source_data = source_path.read_bytes()
+        try:
+            lite_data = build_lite_template(source_data)
+        except Exception as e:
+            logger.error(f"CERFA {cerfa_id} : modèle allégé non retenu ({e})")
+            templates.pop(cerfa_id, None)
+            lite_path.unlink(missing_ok=True)
+            continue
+
+        tmp_path = lite_path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(lite_data)
+        os.replace(tmp_path, lite_path)
+
+        templates[cerfa_id] = {
+            'source_sha256': hashlib.sha256(source_data).hexdigest(),
+            'source_size': len(source_data),
+            'lite_sha256': hashlib.sha256(lite_data).hexdigest(),
+            'lite_size': len(lite_data),
+        }
+        logger.info(f"CERFA {cerfa_id} : {len(source_data) / 1024:.0f} Ko -> {len(lite_data) / 1024:.0f} Ko")
+
+    manifest = {
+        'version': LITE_MANIFEST_VERSION,
+        'built_at': datetime.now().isoformat(timespec='seconds'),
+        'save_options': Config.LITE_TEMPLATE_SAVE_OPTIONS,
+        'templates': templates,
+    }
+    tmp_path = manifest_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, manifest_path)
+    return manifest
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Construit les modèles CERFA allégés")
+    parser.add_argument('cerfa_ids', nargs='*', help="CERFA à traiter (tous par défaut)")
+    args = parser.parse_args(argv)
+    Config.setup_logging()
+
+    requested = args.cerfa_ids or None
+    templates = build_pack(requested)['templates']
+    built = [cerfa_id for cerfa_id in (requested or templates) if cerfa_id in templates]
+    source_total = sum(templates[cerfa_id]['source_size'] for cerfa_id in built)
+    lite_total = sum(templates[cerfa_id]['lite_size'] for cerfa_id in built)
+    print(f"{len(built)} modèles allégés : {source_total / 1e6:.1f} Mo -> {lite_total / 1e6:.1f} Mo")
+    return 0 if requested is None or len(built) == len(requested) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
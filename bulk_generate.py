@@ -0,0 +1,392 @@
+"""
+Génération en masse des CERFA, sans interface graphique
+
+Lit des projets depuis un fichier JSONL (un projet JSON par ligne) ou CSV (colonnes
+en notation pointée : client.nom, projet.surfacePlancher... ; booléens true/false,
+oui/non ou 1/0), détermine les CERFA requis avec ArchitectBusinessLogic.analyser_projet,
+les remplit via pdf_filler et écrit un manifeste JSONL des résultats. Le manifeste sert aussi de point de reprise.
+
+Usage :
+    python bulk_generate.py projets.jsonl --output-dir filled_pdfs/lot --manifest lot.jsonl
+    python bulk_generate.py projets.csv --workers 8 --resume
+"""
+
+import argparse
+import csv
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Set, Tuple, Union
+
+from architect_business_logic import ArchitectBusinessLogic
+from config import Config
+from utils import sanitize_filename
+
+logger = logging.getLogger('ArchiBot.bulk_generate')
+
+
+# Colonnes CSV typées : une cellule est toujours une chaîne, et "false" serait vraie
+CSV_BOOLEAN_COLUMNS = ('technique.zoneProtegee', 'technique.demolition', 'technique.sousTraitance')
+CSV_NUMERIC_COLUMNS = ('projet.surfacePlancher', 'projet.surfaceTerrain')
+CSV_BOOLEAN_VALUES = {'true': True, 'vrai': True, 'oui': True, '1': True,
+                      'false': False, 'faux': False, 'non': False, '0': False}
+
+
+def _parse_cell(column: str, value: str) -> Any:
+    """Valeur typée d'une cellule CSV ; ValueError si elle ne peut pas être interprétée."""
+    if column in CSV_BOOLEAN_COLUMNS:
+        try:
+            return CSV_BOOLEAN_VALUES[value.strip().lower()]
+        except KeyError:
+            raise ValueError(f"colonne {column} : booléen attendu (true/false, oui/non, 1/0), pas {value!r}") from None
+    if column in CSV_NUMERIC_COLUMNS:
+        try:
+            number = float(value.replace(' ', '').replace('\u00a0', '').replace(',', '.'))
+        except ValueError:
+            raise ValueError(f"colonne {column} : nombre attendu, pas {value!r}") from None
+        return int(number) if number.is_integer() else number
+    return value
+
+
+def _nest_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """
+    Convertit une ligne CSV à colonnes pointées en dictionnaire imbriqué.
+
+    Les colonnes booléennes et numériques sont converties ; ValueError si une cellule
+    ne peut pas l'être.
+    """
+    project: Dict[str, Any] = {}
+    for column, value in row.items():
+        if not column or value is None or value == '':
+            continue
+        column = column.strip()
+        target = project
+        *parents, leaf = column.split('.')
+        for key in parents:
+            target = target.setdefault(key, {})
+        target[leaf] = _parse_cell(column, value)
+    return project
+
+
+class InvalidProject(NamedTuple):
+    """Ligne du fichier d'entrée qui n'est pas un projet (JSON invalide...)."""
+    error: str
+
+
+def iter_projects(input_path: Path) -> Iterator[Tuple[str, Union[Dict[str, Any], InvalidProject]]]:
+    """
+    Lit les projets un par un (mémoire bornée) ; produit (identifiant, données).
+
+    Une ligne JSONL illisible ou une cellule CSV non interprétable produit (« ligne-N »,
+    InvalidProject) au lieu d'interrompre le lot.
+    """
+    is_csv = input_path.suffix.lower() == '.csv'
+    with open(input_path, 'r', encoding='utf-8', newline='' if is_csv else None) as f:
+        if is_csv:
+            for line_number, row in enumerate(csv.DictReader(f), start=2):
+                try:
+                    project = _nest_row(row)
+                except ValueError as e:
+                    yield f"ligne-{line_number}", InvalidProject(f"ligne {line_number} : {e}")
+                    continue
+                yield str(project.pop('id', None) or f"ligne-{line_number}"), project
+        else:
+            for line_number, line in enumerate(f, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    project = json.loads(line)
+                except ValueError as e:
+                    yield f"ligne-{line_number}", InvalidProject(f"ligne {line_number} : JSON invalide ({e})")
+                    continue
+                if not isinstance(project, dict):
+                    yield f"ligne-{line_number}", InvalidProject(f"ligne {line_number} : objet JSON attendu")
+                    continue
+                yield str(project.get('id') or f"ligne-{line_number}"), project
+
+
+def read_checkpoint(manifest_path: Path) -> Set[str]:
+    """Identifiants des projets déjà présents dans le manifeste (reprise), hors lignes rejetées."""
+    done = set()
+    if not manifest_path.exists():
+        return done
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if 'input_error' not in record:  # Une ligne corrigée depuis est retentée
+                    done.add(record['project_id'])
+            except (ValueError, KeyError, TypeError):
+                continue  # Dernière ligne tronquée par une interruption
+    return done
+
+
+def select_cerfas(analysis: Dict[str, Any], include_optional: bool) -> Tuple[List[str], List[str]]:
+    """Sépare les CERFA retenus par l'analyse en (à générer, sans modèle PDF)."""
+    to_fill, skipped = [], []
+    for document in analysis['analyse_reglementaire']['autorisations_requises']:
+        if not document.get('obligatoire') and not include_optional:
+            continue
+        cerfa_id = document['type'].replace('CERFA', '').strip()
+        if cerfa_id in to_fill or cerfa_id in skipped:
+            continue
+        if (Config.CERFA_TEMPLATES_DIR / f"cerfa_{cerfa_id}.pdf").exists():
+            to_fill.append(cerfa_id)
+        else:
+            skipped.append(cerfa_id)
+    return to_fill, skipped
+
+
+def _result_record(result) -> Dict[str, Any]:
+    """Résumé sérialisable d'un FormFillResult."""
+    return {
+        'cerfa_id': result.cerfa_id,
+        'success': result.success,
+        'output_path': result.output_path,
+        'error': result.error,
+        'from_cache': result.from_cache,
+        'fields_filled': len(result.fields_filled),
+        'fields_missing': len(result.fields_missing),
+        'timings': {stage: round(duration, 4) for stage, duration in result.timings.items()},
+    }
+
+
+class BulkRun:
+    """Exécution d'un lot : planification bornée, manifeste et statistiques."""
+
+    def __init__(self, args):
+        self.args = args
+        self.logic = ArchitectBusinessLogic()
+        self.output_dir = Path(args.output_dir)
+        self.manifest_path = Path(args.manifest)
+        self.done = read_checkpoint(self.manifest_path) if args.resume else set()
+        self.pending: Dict[str, Dict[str, Any]] = {}  # Projets en cours : enregistrement du manifeste
+        self.projects = 0
+        self.forms_ok = 0
+        self.forms_failed = 0
+        self.resumed = 0
+        self.rejected = 0
+
+    def prepare(self, project_id: str, project: Dict[str, Any]) -> Optional[Tuple[List[str], Path]]:
+        """Analyse un projet ; retourne (CERFA à générer, répertoire) ou None s'il est clos d'emblée."""
+        record = {'project_id': project_id, 'results': [], 'skipped': []}
+        try:
+            analysis = self.logic.analyser_projet(project)
+            cerfa_ids, record['skipped'] = select_cerfas(analysis, self.args.include_optional)
+        except Exception as e:
+            record['analysis_error'] = str(e)
+            cerfa_ids = []
+
+        record['cerfas'] = cerfa_ids
+        self.pending[project_id] = record
+        if not cerfa_ids:
+            self.finish(project_id)
+            return None
+        return cerfa_ids, self.output_dir / sanitize_filename(project_id)
+
+    def add_result(self, project_id: str, result):
+        """Enregistre un formulaire terminé ; clôt le projet quand tous ses CERFA sont faits."""
+        if isinstance(result, list):  # Dossier fusionné : un résultat par CERFA
+            for form_result in result:
+                self.add_result(project_id, form_result)
+            return
+        record = self.pending[project_id]
+        record['results'].append(_result_record(result))
+        if result.success:
+            self.forms_ok += 1
+        else:
+            self.forms_failed += 1
+        if len(record['results']) == len(record['cerfas']):
+            self.finish(project_id)
+
+    def finish(self, project_id: str):
+        """Écrit la ligne du projet dans le manifeste (point de reprise)."""
+        record = self.pending.pop(project_id)
+        self.manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.manifest.flush()
+        self.projects += 1
+        if self.projects % 100 == 0:
+            logger.info(f"{self.projects} projets traités")
+
+    def reject(self, project_id: str, error: str):
+        """Inscrit au manifeste, en échec, une ligne d'entrée qui ne peut pas être traitée."""
+        logger.error(f"Projet {project_id} rejeté : {error}")
+        record = {'project_id': project_id, 'input_error': error, 'cerfas': [], 'results': [], 'skipped': []}
+        self.manifest.write(json.dumps(record, ensure_ascii=False) + '\n')
+        self.manifest.flush()
+        self.rejected += 1
+
+    def projects_to_run(self) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """
+        Projets du fichier d'entrée, hors ceux déjà traités (reprise).
+
+        Les lignes illisibles et les identifiants en double sont rejetés (inscrits en échec
+        au manifeste) : un identifiant désigne un seul projet, et un seul répertoire de sortie.
+        """
+        seen: Set[str] = set()
+        for project_id, project in iter_projects(Path(self.args.input)):
+            if isinstance(project, InvalidProject):
+                self.reject(project_id, project.error)
+                continue
+            if project_id in seen:
+                self.reject(project_id, "identifiant de projet en double dans le fichier d'entrée")
+                continue
+            seen.add(project_id)
+            if project_id in self.done:
+                self.resumed += 1
+                continue
+            yield project_id, project
+
+    def run(self) -> Dict[str, Any]:
+        """Traite tout le lot et retourne le résumé."""
+        self.manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        start = time.perf_counter()
+        with open(self.manifest_path, 'a', encoding='utf-8') as self.manifest:
+            if self.args.workers == 0:
+                self._run_in_process()
+            else:
+                self._run_with_pool()
+        elapsed = time.perf_counter() - start
+
+        forms = self.forms_ok + self.forms_failed
+        return {
+            'projects': self.projects,
+            'projects_resumed': self.resumed,
+            'projects_rejected': self.rejected,
+            'forms_ok': self.forms_ok,
+            'forms_failed': self.forms_failed,
+            'elapsed_s': round(elapsed, 3),
+            'projects_per_s': round(self.projects / elapsed, 3) if elapsed else 0.0,
+            'forms_per_s': round(forms / elapsed, 3) if elapsed else 0.0,
+            'manifest': str(self.manifest_path),
+        }
+
+    @staticmethod
+    def merged_path(project_dir: Path, date_suffix: str) -> Path:
+        """Chemin du PDF fusionné d'un projet (--merged)."""
+        return project_dir / f"dossier_{date_suffix}.pdf"
+
+    def _run_in_process(self):
+        """Exécution séquentielle dans le processus courant (--workers 0)."""
+        from pdf_filler import FormFillResult, dossier_output_path, fill_cerfa_form, fill_dossier_merged
+        from architect_profiles import get_architect_fields
+
+        date_suffix = datetime.now().strftime('%Y%m%d')
+        for project_id, project in self.projects_to_run():
+            prepared = self.prepare(project_id, project)
+            if prepared is None:
+                continue
+            cerfa_ids, project_dir = prepared
+            if self.args.merged:
+                self.add_result(project_id, fill_dossier_merged(
+                    cerfa_ids, project, self.merged_path(project_dir, date_suffix),
+                    self.args.architect_profile, self.args.save_profile, self.args.appearance))
+                continue
+            project_dir.mkdir(parents=True, exist_ok=True)
+            try:
+                architect_fields = get_architect_fields(self.args.architect_profile)
+            except (OSError, ValueError) as e:
+                for cerfa_id in cerfa_ids:
+                    self.add_result(project_id, FormFillResult(cerfa_id, error=str(e)))
+                continue
+            for cerfa_id in cerfa_ids:
+                output_path = dossier_output_path(project_dir, cerfa_id, self.args.storage)
+                self.add_result(project_id, fill_cerfa_form(
+                    cerfa_id, architect_fields, project, output_path, self.args.save_profile,
+                    appearance_mode=self.args.appearance, storage_mode=self.args.storage))
+
+    def _run_with_pool(self):
+        """Exécution sur le pool de processus, avec un nombre borné de formulaires en vol."""
+        from generation_engine import GenerationEngine
+
+        date_suffix = datetime.now().strftime('%Y%m%d')
+        with GenerationEngine(self.args.workers) as engine:
+            max_in_flight = self.args.max_in_flight or engine.max_workers * 4
+            in_flight = set()
+
+            def drain(block_until_below: int):
+                nonlocal in_flight
+                while len(in_flight) >= block_until_below:
+                    done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        self.add_result(*engine.collect(future))
+
+            for project_id, project in self.projects_to_run():
+                prepared = self.prepare(project_id, project)
+                if prepared is None:
+                    continue
+                cerfa_ids, project_dir = prepared
+                drain(max_in_flight)
+                if self.args.merged:
+                    in_flight.add(engine.submit_merged_dossier(
+                        cerfa_ids, project, self.merged_path(project_dir, date_suffix), dossier_id=project_id,
+                        architect_profile=self.args.architect_profile, save_profile=self.args.save_profile,
+                        appearance_mode=self.args.appearance))
+                    continue
+                in_flight.update(engine.submit_dossier(
+                    cerfa_ids, project, project_dir, dossier_id=project_id,
+                    architect_profile=self.args.architect_profile, save_profile=self.args.save_profile,
+                    storage_mode=self.args.storage, appearance_mode=self.args.appearance))
+            drain(1)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Génération en masse des CERFA (sans interface graphique)")
+    parser.add_argument('input', help="Fichier de projets (.jsonl ou .csv)")
+    parser.add_argument('--output-dir', default=str(Config.FILLED_PDFS_DIR / 'bulk'),
+                        help="Répertoire de sortie (un sous-répertoire par projet)")
+    parser.add_argument('--manifest', help="Manifeste JSONL des résultats (défaut : <output-dir>/manifest.jsonl)")
+    parser.add_argument('--workers', type=int, default=Config.GENERATION_WORKERS or os.cpu_count() or 1,
+                        help="Nombre de processus de génération (0 = dans le processus courant)")
+    parser.add_argument('--max-in-flight', type=int, default=0,
+                        help="Tâches (formulaires, ou dossiers avec --merged) soumises simultanément au pool (défaut : 4 par worker)")
+    parser.add_argument('--resume', action='store_true', help="Reprendre : ignorer les projets déjà dans le manifeste")
+    parser.add_argument('--merged', action='store_true', help="Un seul PDF par projet (dossier fusionné avec signets)")
+    parser.add_argument('--include-optional', action='store_true', help="Générer aussi les CERFA optionnels")
+    parser.add_argument('--architect-profile', help="Profil architecte signataire")
+    parser.add_argument('--save-profile', choices=list(Config.PDF_SAVE_PROFILES), help="Profil de sauvegarde PDF")
+    parser.add_argument('--appearance', choices=Config.PDF_APPEARANCE_MODES,
+                        help="Génération des apparences des champs (défaut : Config.PDF_DEFAULT_APPEARANCE_MODE)")
+    parser.add_argument('--storage', choices=Config.PDF_STORAGE_MODES, default=Config.PDF_DEFAULT_STORAGE_MODE,
+                        help="'delta' : fichiers .pdfdelta sur des modèles de base partagés (python pdf_storage.py materialize)")
+    parser.add_argument('--summary', help="Écrit aussi le résumé final dans ce fichier JSON")
+    parser.add_argument('--fill-metrics', nargs='?', const=str(Config.FILL_METRICS_PATH), default=None,
+                        help="Écrit les percentiles par modèle et par étape dans ce fichier JSON "
+                             f"(défaut : {Config.FILL_METRICS_PATH})")
+    args = parser.parse_args(argv)
+    if not args.manifest:
+        args.manifest = str(Path(args.output_dir) / 'manifest.jsonl')
+    if args.merged and args.storage == 'delta':
+        parser.error("--merged et --storage delta sont incompatibles (le dossier fusionné n'a pas de modèle de base)")
+    return args
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    Config.setup_logging()
+    summary = BulkRun(args).run()
+
+    logger.info(
+        f"Lot terminé : {summary['projects']} projets, {summary['projects_rejected']} lignes rejetées, "
+        f"{summary['forms_ok']} CERFA générés, {summary['forms_failed']} échecs en {summary['elapsed_s']} s "
+        f"({summary['projects_per_s']} projets/s, {summary['forms_per_s']} formulaires/s)"
+    )
+    if args.summary:
+        with open(args.summary, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+    if args.fill_metrics:
+        from fill_metrics import get_fill_metrics
+        metrics = get_fill_metrics()
+        logger.info("Durées par modèle et par étape :\n" + metrics.format_report())
+        metrics.dump(args.fill_metrics)
+    print(json.dumps(summary, ensure_ascii=False))
+    return 0 if summary['forms_failed'] == 0 and summary['projects_rejected'] == 0 else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,23 @@
+# Dictionnaire de correspondance pour les infos de l'architecte
+ARCHITECT_INTERNAL_MAP = {
+    "architecte.nom": "H1N_nom",
+    "architecte.prenom": "H1P_prenom",
+    "architecte.email": "H1AE1_email",
+    "architecte.telephone": "H1T_telephone",
+    "societe.raison_sociale": "H2R_raison",
+    "societe.siret": "H2S_siret",
+    "societe.adresse.numero": "H1Q_numero",
+    "societe.adresse.voie": "H1V_voie",
+    "societe.adresse.code_postal": "H1C_code",
+    "societe.adresse.ville": "H1L_localite",
+    "ordre_architectes.numero_national": "H1K_ordre",
+    "ordre_architectes.conseil_regional": "H1R_conseil",
+}
+
 CERFA_FIELD_MAPPINGS = {
     "13406-15": { # Permis de construire maison individuelle (PCMI) / Déclaration Préalable
         # --- Demandeur (Client) ---
-        "client.civilite": {
-            "M.": "D1M_monsieur",
-            "Mme": "D1F_madame"
-        },
+        "client.civilite": None, # Pas de case Madame / Monsieur dans ce modèle
         "client.nom": "D1N_nom",
         "client.prenom": "D1P_prenom",
         "client.dateNaissance": "D1A_naissance",
@@ -25,47 +38,21 @@ CERFA_FIELD_MAPPINGS = {
 
         # --- Projet ---
         "projet.typeProjet": {
-            "construction_neuve": "C2ZA1_neuve",
-            "extension": "C2ZA2_extension",
-            "renovation": "C2ZA3_amenagement", # Simplification, rénovation peut être aménagement
-        },
-        "projet.destination": {
-            "habitation": "C2ZR1_destination",
-            "commerce": "C2ZR2_destination",
-            "industrie": "C2ZR3_destination",
-            "erp": "C2ZR4_destination",
-            "bureau": "C2ZR5_destination",
-            "entrepot": "C2ZR6_destination",
+            "construction_neuve": "C2ZA1_nouvelle", # Nouvelle construction
+            "extension": "C2ZB1_existante", # Travaux sur construction existante
+            "renovation": "C2ZB1_existante",
         },
-        "projet.surfacePlancher": "C5ZK1_extension", # Surface créée
-        "projet.empriseSol": "C5ZJ1_emprise", # Emprise au sol créée
+        "projet.destination": None, # Maison individuelle : seule la résidence principale / secondaire est demandée
+        "projet.surfacePlancher": None, # Tableau des surfaces par destination (W2*) non alimenté ; C5ZK1_extension est une case
+        "projet.empriseSol": "W3ES2_creee", # Emprise au sol créée
         "projet.hauteurBatiment": None,
         "projet.nombreNiveaux": "C5ZB2_niveaux",
         
         # --- Technique / Architecte ---
-        "technique.zoneProtegee": "X1A_ABF",
-        "technique.demolition": "C2ZC2_demolir",
+        "technique.zoneProtegee": {True: "X1A_ABF"},
+        "technique.demolition": None, # Démolition totale (K1S_totale) ou partielle (K1E_partielle) : non renseigné par le projet
         # Les infos architecte sont gérées par ARCHITECT_INTERNAL_MAP
     },
-    "14880-02": { # Permis de conduire - Avis Médical
-        "client.nom": "topmostSubform[0].Page1[0].txt_nom[0]",
-        "client.prenom": "topmostSubform[0].Page1[0].txt_prenom[0]",
-        "client.dateNaissance.jour": "topmostSubform[0].Page1[0].txt_jour[0]",
-        "client.dateNaissance.mois": "topmostSubform[0].Page1[0].txt_mois[0]",
-        "client.dateNaissance.annee": "topmostSubform[0].Page1[0].txt_annee[0]",
-        "client.lieuNaissance": "topmostSubform[0].Page1[0].txt_communenaiss[0]",
-        "client.adresse": "topmostSubform[0].Page1[0].txt_adresseNom[0]",
-        "client.codePostal": "topmostSubform[0].Page1[0].txt_cp[0]",
-        "client.ville": "topmostSubform[0].Page1[0].txt_commune[0]",
-        "client.telephone": "topmostSubform[0].Page1[0].txt_num[0]",
-        "client.email": "topmostSubform[0].Page1[0].txt_courriel[0]",
-        "client.civilite": {
-            "M.": "topmostSubform[0].Page1[0].btn_sexe[0]", # Assumant que "M." correspond à la première option
-            "Mme": "topmostSubform[0].Page1[0].btn_sexe[1]" # Assumant que "Mme" correspond à la seconde
-        },
-        "client.profession": None,
-        "client.numeroSiret": None,
-    },
     "13405-13": { # Permis de démolir
         "client.nom": "D1N_nom",
         "client.prenom": "D1P_prenom",
@@ -84,7 +71,7 @@ CERFA_FIELD_MAPPINGS = {
         "projet.referenceCadastrale": "T2S_section",
         "projet.surfaceTerrain": "T2T_superficie",
         "technique.demolition": "K1J_travaux", # Champ texte, pas une checkbox directe
-        "technique.zoneProtegee": "X1A_ABF",
+        "technique.zoneProtegee": {True: "X1A_ABF"},
     },
     "13407-10": { # Déclaration d'ouverture de chantier
         "client.nom": "D1N_nom",
@@ -120,25 +107,29 @@ CERFA_FIELD_MAPPINGS = {
     },
     "13824-04": { # Demande d'autorisation ERP
         "client.nom": "Nom",
-        "client.prenom": "Prnom",
+        "client.prenom": "Prénom",
         "client.dateNaissance": "Date de naissance",
-        "client.adresse": "Adresse Numro",
+        "client.adresse": "Adresse Numéro",
         "client.codePostal": "CP",
-        "client.ville": "Localit",
-        "client.telephone": "Tlphone portable_2",
+        "client.ville": "Localité",
+        "client.telephone": "Téléphone portable_2",
         "client.email": "courriel_1",
-        "client.profession": "Activit principale exerce dans ltablissement par tages 1",
+        "client.profession": "Activité principale exercée dans létablissement par étages 1",
         "client.numeroSiret": "Siret",
 
-        "projet.adresseProjet": "Adresse Numro",
+        "projet.adresseProjet": "Adresse Numéro",
         "projet.codePostalProjet": "CP",
-        "projet.villeProjet": "Localit",
-        "projet.surfacePlancher": "Surface de plancher aprs travaux",
-        "projet.typeProjet": "Construction neuve", # Ceci est un champ texte, pas une checkbox
-        "projet.destination": "Types de locaux local  taux doccupation1er tage",
+        "projet.villeProjet": "Localité",
+        "projet.surfacePlancher": "Surface de plancher après travaux",
+        "projet.typeProjet": {
+            "construction_neuve": "Construction neuve",
+            "extension": "Extension",
+            "renovation": "Réhabilitation",
+        },
+        "projet.destination": "Types de locaux local  taux doccupation1er étage",
 
-        "technique.demolition": "Travaux damnagement remplacement de revtements rnovation lectrique cration dune rampe par exemple",
-        "technique.zoneProtegee": "X1A_ABF",
+        "technique.demolition": None, # Pas de case démolition dans ce modèle
+        "technique.zoneProtegee": None, # Pas de case ABF dans ce modèle
     },
     "16702-01": { # Déclaration préalable de travaux, constructions et aménagements
         "client.nom": "D1N_nom",
@@ -157,12 +148,12 @@ CERFA_FIELD_MAPPINGS = {
         "projet.villeProjet": "T2L_localite",
         "projet.referenceCadastrale": "T2S_section",
         "projet.surfaceTerrain": "T2T_superficie",
-        "projet.surfacePlancher": "C5ZK1_extension",
+        "projet.surfacePlancher": None, # Tableau des surfaces par destination (W2*) non alimenté ; C5ZK1_extension est une case
         "projet.typeProjet": "C2ZR1_destination",
         "projet.destination": "C2ZR1_destination",
 
-        "technique.demolition": "C2ZC3_cloture",
-        "technique.zoneProtegee": "X1A_ABF",
+        "technique.demolition": None, # Pas de case démolition dans ce modèle (C2ZC3_cloture : clôture)
+        "technique.zoneProtegee": {True: "X1A_ABF"},
     },
     "13408-12": { # Déclaration attestant l'achèvement et la conformité des travaux (DAACT)
         "client.nom": "D1N_nom",
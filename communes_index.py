@@ -0,0 +1,356 @@
+"""
+Index local des communes (INSEE) : population et nom par code INSEE ou code postal
+
+Construit une fois à partir des fichiers ouverts de l'INSEE (populations légales) et de
+La Poste (base officielle des codes postaux), sans accès réseau ensuite :
+
+    python communes_index.py build donnees_communes.csv --postal base_codes_postaux.csv
+    python communes_index.py lookup 34170 --ville Castelnau-le-Lez
+
+Le fichier (Config.COMMUNES_INDEX_PATH) est projeté en mémoire (mmap) au premier usage ;
+ses enregistrements de taille fixe sont triés par code et recherchés par dichotomie.
+
+Format (petit-boutiste) :
+    en-tête    MAGIC, version u16, nombre de communes u32, de codes postaux u32, taille des noms u32
+    communes   code INSEE (5 octets ASCII), population u32, position u32 et longueur u16 du nom
+    postaux    code postal (5 octets ASCII), rang u32 de la commune ; plusieurs lignes par code
+    noms       noms des communes en UTF-8
+"""
+
+import argparse
+import csv
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.communes_index')
+
+MAGIC = b'ARCHICOM'
+INDEX_FORMAT_VERSION = 1
+HEADER = struct.Struct('<8sHIII')
+COMMUNE_RECORD = struct.Struct('<5sIIH')
+POSTAL_RECORD = struct.Struct('<5sI')
+
+# Colonnes reconnues dans les CSV (sans tenir compte de la casse), par ordre de préférence
+CODE_COLUMNS = ('COM', 'CODGEO', 'DEPCOM', 'code_insee', 'Code_commune_INSEE', 'code_commune')
+POPULATION_COLUMNS = ('PMUN', 'PTOT', 'population_municipale', 'population')
+NAME_COLUMNS = ('Commune', 'LIBGEO', 'LIBELLE', 'nom_commune', 'Nom_de_la_commune', 'nom')
+DEPARTMENT_COLUMNS = ('DEP', 'CODDEP')
+POSTAL_CODE_COLUMNS = ('Code_postal', 'code_postal', 'CP')
+
+# Arrondissements municipaux (codes de La Poste) -> commune de l'INSEE
+ARRONDISSEMENTS = ((re.compile(r'^751\d\d$'), '75056'),   # Paris
+                   (re.compile(r'^6938\d$'), '69123'),    # Lyon
+                   (re.compile(r'^132\d\d$'), '13055'))   # Marseille
+
+
+class Commune(NamedTuple):
+    insee: str
+    name: str
+    population: int
+
+
+def normalize_name(name: str) -> str:
+    """Nom comparable : sans accents ni ponctuation, en majuscules, « ST » développé en « SAINT »."""
+    text = unicodedata.normalize('NFKD', str(name))
+    text = ''.join(char for char in text if not unicodedata.combining(char)).upper()
+    words = re.sub(r'[^A-Z0-9]+', ' ', text).split()
+    return ' '.join({'ST': 'SAINT', 'STE': 'SAINTE'}.get(word, word) for word in words)
+
+
+def _bisect_left(data, offset: int, count: int, record_size: int, key: bytes) -> int:
+    """Rang du premier enregistrement dont le code (5 premiers octets) est >= key."""
+    low, high = 0, count
+    while low < high:
+        middle = (low + high) // 2
+        start = offset + middle * record_size
+        if data[start:start + 5] < key:
+            low = middle + 1
+        else:
+            high = middle
+    return low
+
+
+class CommuneIndex:
+    """Index des communes, projeté en mémoire au premier usage."""
+
+    def __init__(self, path: Optional[Path] = None):
+        self.path = Path(path) if path else Config.COMMUNES_INDEX_PATH
+        self._data = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> bool:
+        """Projette le fichier en mémoire ; False s'il est absent ou invalide (une seule tentative)."""
+        if self._loaded:
+            return self._data is not None
+        with self._lock:
+            if self._loaded:
+                return self._data is not None
+            try:
+                with open(self.path, 'rb') as f:
+                    data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                magic, version, communes, postal_codes, names_size = HEADER.unpack_from(data)
+                self._communes_offset = HEADER.size
+                self._postal_offset = self._communes_offset + communes * COMMUNE_RECORD.size
+                self._names_offset = self._postal_offset + postal_codes * POSTAL_RECORD.size
+                if magic != MAGIC or version != INDEX_FORMAT_VERSION or len(data) != self._names_offset + names_size:
+                    raise ValueError("format non reconnu")
+                self._communes_count, self._postal_count = communes, postal_codes
+                self._data = data
+                logger.info(f"Index des communes chargé : {communes} communes, {postal_codes} codes postaux")
+            except FileNotFoundError:
+                logger.warning(f"Index des communes absent ({self.path}) : le seuil de "
+                               f"{Config.COMMUNE_POPULATION_THRESHOLD} habitants sera estimé par département. "
+                               "Construire l'index : python communes_index.py build <populations.csv> "
+                               "--postal <codes_postaux.csv>")
+            except (OSError, ValueError, struct.error) as e:
+                logger.warning(f"Index des communes illisible ({self.path.name}) : {e}")
+            self._loaded = True
+        return self._data is not None
+
+    @property
+    def available(self) -> bool:
+        return self._load()
+
+    def __len__(self) -> int:
+        return self._communes_count if self._load() else 0
+
+    def _commune_at(self, position: int) -> Commune:
+        insee, population, name_offset, name_size = COMMUNE_RECORD.unpack_from(
+            self._data, self._communes_offset + position * COMMUNE_RECORD.size)
+        start = self._names_offset + name_offset
+        return Commune(insee.decode('ascii'), self._data[start:start + name_size].decode('utf-8'), population)
+
+    def by_insee(self, code) -> Optional[Commune]:
+        """Commune d'un code INSEE (None si inconnue ou index absent)."""
+        key = _code_key(code)
+        if key is None or not self._load():
+            return None
+        data, offset = self._data, self._communes_offset
+        position = _bisect_left(data, offset, self._communes_count, COMMUNE_RECORD.size, key)
+        start = offset + position * COMMUNE_RECORD.size
+        if position < self._communes_count and data[start:start + 5] == key:
+            return self._commune_at(position)
+        return None
+
+    def by_postal_code(self, code) -> List[Commune]:
+        """Communes desservies par un code postal."""
+        key = _code_key(code)
+        if key is None or not self._load():
+            return []
+        data, offset = self._data, self._postal_offset
+        communes = []
+        position = _bisect_left(data, offset, self._postal_count, POSTAL_RECORD.size, key)
+        while position < self._postal_count:
+            postal, commune_position = POSTAL_RECORD.unpack_from(data, offset + position * POSTAL_RECORD.size)
+            if postal != key:
+                break
+            communes.append(self._commune_at(commune_position))
+            position += 1
+        return communes
+
+    def lookup(self, code, city: Optional[str] = None) -> List[Commune]:
+        """
+        Communes correspondant à un code postal (ou, à défaut, à un code INSEE).
+
+        Si `city` désigne l'une des communes d'un code postal partagé, seule celle-ci est retenue.
+        """
+        communes = self.by_postal_code(code)
+        if not communes:
+            commune = self.by_insee(code)
+            return [commune] if commune else []
+        if city and len(communes) > 1:
+            wanted = normalize_name(city)
+            named = [commune for commune in communes if normalize_name(commune.name) == wanted]
+            return named or communes
+        return communes
+
+    def above_threshold(self, code, city: Optional[str] = None, threshold: Optional[int] = None) -> Optional[bool]:
+        """
+        La commune compte-t-elle plus de `threshold` habitants (Config.COMMUNE_POPULATION_THRESHOLD) ?
+
+        None si la commune est inconnue, ou si le code postal en désigne plusieurs situées
+        de part et d'autre du seuil.
+        """
+        threshold = Config.COMMUNE_POPULATION_THRESHOLD if threshold is None else threshold
+        answers = {commune.population > threshold for commune in self.lookup(code, city)}
+        return answers.pop() if len(answers) == 1 else None
+
+
+def _code_key(code) -> Optional[bytes]:
+    """Code sur 5 caractères ASCII (« 1001 » lu comme nombre redevient « 01001 »)."""
+    if isinstance(code, (bytes, bytearray)):
+        return bytes(code) if len(code) == 5 else None
+    if code is None:
+        return None
+    text = str(code).strip().upper()
+    if text.isdigit() and len(text) == 4:
+        text = '0' + text
+    if len(text) != 5 or not text.isascii():
+        return None
+    return text.encode('ascii')
+
+
+def _read_csv(path: Path) -> Tuple[List[str], List[List[str]]]:
+    """En-tête et lignes d'un CSV (séparateur et encodage UTF-8 ou Windows-1252 détectés)."""
+    data = Path(path).read_bytes()
+    try:
+        text = data.decode('utf-8-sig')
+    except UnicodeDecodeError:
+        text = data.decode('cp1252', errors='replace')
+    first_line = text.split('\n', 1)[0]
+    delimiter = max(';,\t', key=first_line.count)
+    rows = list(csv.reader(text.splitlines(), delimiter=delimiter))
+    if not rows:
+        raise ValueError(f"{path} : fichier vide")
+    return [column.strip().lstrip('#') for column in rows[0]], rows[1:]
+
+
+def _column(header: List[str], candidates: Iterable[str], path: Path, required: bool = True) -> Optional[int]:
+    lowered = [column.lower() for column in header]
+    for candidate in candidates:
+        if candidate.lower() in lowered:
+            return lowered.index(candidate.lower())
+    if required:
+        raise ValueError(f"{path} : aucune des colonnes {', '.join(candidates)}")
+    return None
+
+
+def read_populations(path: Path) -> Dict[str, Tuple[str, int]]:
+    """Code INSEE -> (nom, population) depuis un CSV de populations légales de l'INSEE."""
+    header, rows = _read_csv(path)
+    code_col = _column(header, CODE_COLUMNS, path)
+    population_col = _column(header, POPULATION_COLUMNS, path)
+    name_col = _column(header, NAME_COLUMNS, path)
+    department_col = _column(header, DEPARTMENT_COLUMNS, path, required=False)
+
+    communes: Dict[str, Tuple[str, int]] = {}
+    skipped = 0
+    for row in rows:
+        try:
+            code = row[code_col].strip()
+            if len(code) < 4 and department_col is not None:  # Code de la commune dans son département
+                department = row[department_col].strip()
+                code = department + code.zfill(5 - len(department))
+            key = _code_key(code)
+            population = int(re.sub(r'\s', '', row[population_col]))
+            if key is None or population < 0:
+                raise ValueError(code)
+            communes.setdefault(key.decode('ascii'), (row[name_col].strip(), population))
+        except (IndexError, ValueError):
+            skipped += 1
+    if skipped:
+        logger.warning(f"{path.name} : {skipped} ligne(s) ignorée(s)")
+    return communes
+
+
+def read_postal_codes(path: Path, communes: Dict[str, Tuple[str, int]]) -> List[Tuple[str, str]]:
+    """Couples (code postal, code INSEE) de la base des codes postaux, limités aux communes connues."""
+    header, rows = _read_csv(path)
+    insee_col = _column(header, CODE_COLUMNS, path)
+    postal_col = _column(header, POSTAL_CODE_COLUMNS, path)
+    pairs = set()
+    unknown = 0
+    for row in rows:
+        try:
+            postal_key, insee_key = _code_key(row[postal_col]), _code_key(row[insee_col])
+        except IndexError:
+            continue
+        if postal_key is None or insee_key is None:
+            continue
+        insee = insee_key.decode('ascii')
+        if insee not in communes:
+            insee = next((commune for pattern, commune in ARRONDISSEMENTS if pattern.match(insee)), insee)
+        if insee in communes:
+            pairs.add((postal_key.decode('ascii'), insee))
+        else:
+            unknown += 1
+    if unknown:
+        logger.warning(f"{path.name} : {unknown} code(s) postal(aux) vers des communes absentes des populations")
+    return sorted(pairs)
+
+
+def write_index(path: Path, communes: Dict[str, Tuple[str, int]], postal_codes: Sequence[Tuple[str, str]]):
+    """Écrit l'index (remplacement atomique du fichier existant)."""
+    records, names = [], bytearray()
+    positions = {insee: position for position, insee in enumerate(sorted(communes))}
+    for insee in sorted(communes):
+        name, population = communes[insee]
+        encoded = name.encode('utf-8')[:0xFFFF]
+        records.append(COMMUNE_RECORD.pack(insee.encode('ascii'), population, len(names), len(encoded)))
+        names += encoded
+    postal_records = [POSTAL_RECORD.pack(postal.encode('ascii'), positions[insee])
+                      for postal, insee in sorted(postal_codes)]
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, INDEX_FORMAT_VERSION, len(records), len(postal_records), len(names)))
+        f.write(b''.join(records))
+        f.write(b''.join(postal_records))
+        f.write(names)
+    os.replace(tmp_path, path)
+
+
+_communes_index: Optional[CommuneIndex] = None
+
+
+def get_communes_index() -> CommuneIndex:
+    """Retourne l'index des communes partagé par le processus."""
+    global _communes_index
+    if _communes_index is None:
+        _communes_index = CommuneIndex()
+    return _communes_index
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index local des communes (population INSEE, codes postaux)")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    build = subparsers.add_parser('build', help="Construit l'index à partir des CSV de l'INSEE et de La Poste")
+    build.add_argument('populations', type=Path, help="CSV des populations légales (code INSEE, nom, population)")
+    build.add_argument('--postal', type=Path, help="CSV de la base officielle des codes postaux")
+    build.add_argument('-o', '--output', type=Path, default=None, help="Fichier d'index (défaut : Config)")
+    lookup = subparsers.add_parser('lookup', help="Recherche une commune par code postal ou INSEE")
+    lookup.add_argument('code')
+    lookup.add_argument('--ville', help="Nom de la commune (code postal partagé)")
+    args = parser.parse_args(argv)
+
+    if args.command == 'build':
+        output = args.output or Config.COMMUNES_INDEX_PATH
+        try:
+            communes = read_populations(args.populations)
+            postal_codes = read_postal_codes(args.postal, communes) if args.postal else []
+            write_index(output, communes, postal_codes)
+        except (OSError, ValueError) as e:
+            print(f"Erreur : {e}", file=sys.stderr)
+            return 1
+        print(f"{output} : {len(communes)} communes, {len(postal_codes)} codes postaux "
+              f"({output.stat().st_size / 1024:.0f} Ko)")
+        return 0
+
+    index = get_communes_index()
+    if not index.available:
+        print(f"Index absent ou illisible : {index.path}", file=sys.stderr)
+        return 1
+    communes = index.lookup(args.code, args.ville)
+    for commune in communes:
+        print(f"{commune.insee}  {commune.name}  {commune.population} hab.")
+    above = index.above_threshold(args.code, args.ville)
+    print(f"Plus de {Config.COMMUNE_POPULATION_THRESHOLD} habitants : "
+          f"{'indéterminé' if above is None else 'oui' if above else 'non'}")
+    return 0 if communes else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -14,12 +14,22 @@ class Config:
     
     # Répertoires de données
     CERFA_TEMPLATES_DIR = BASE_DIR / 'cerfa_templates'
+    WIDGET_INDEX_DIR = CERFA_TEMPLATES_DIR / '.widget_index'
+    LITE_TEMPLATES_DIR = CERFA_TEMPLATES_DIR / 'lite'
+    TEMPLATE_CATALOG_PATH = CERFA_TEMPLATES_DIR / 'catalog.json'
     CERFA_DATA_DIR = BASE_DIR / 'cerfa_data'
     FILLED_PDFS_DIR = BASE_DIR / 'filled_pdfs'
+    PDF_BASES_DIR = FILLED_PDFS_DIR / '.bases'  # Modèles de base des PDF stockés en delta (pdf_storage.py)
+    OUTPUT_CACHE_DIR = BASE_DIR / '.output_cache'
     
     # Fichiers de configuration
     ARCHITECT_INFO_PATH = BASE_DIR / 'mes_infos_cecile.json'
     
+    # Profils architecte : profils déclarés ici, ou <ARCHITECT_PROFILES_DIR>/<nom>.json
+    ARCHITECT_PROFILES_DIR = BASE_DIR / 'architectes'
+    ARCHITECT_PROFILES = {'default': ARCHITECT_INFO_PATH}
+    DEFAULT_ARCHITECT_PROFILE = 'default'
+    
     # Configuration des logs
     LOG_LEVEL = logging.INFO
     LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
@@ -39,6 +49,79 @@ class Config:
         'clean': True
     }
     
+    # Profils de sauvegarde (options de Document.save de PyMuPDF)
+    PDF_SAVE_PROFILES = {
+        # Brouillons et aperçus : collecte minimale des objets inutilisés
+        'fast': {'garbage': 1},
+        # Taille minimale : flux d'objets, compression maximale
+        'compact': {
+            'garbage': 3,
+            'deflate': True,
+            'deflate_images': True,
+            'deflate_fonts': True,
+            'use_objstms': 1
+        },
+        # Réglages historiques, les plus lents
+        'archival': PDF_COMPRESSION_SETTINGS
+    }
+    PDF_DEFAULT_SAVE_PROFILE = 'archival'
+    
+    # Génération des apparences des champs remplis :
+    # 'immediate' : widget.update() après chaque champ (comportement historique)
+    # 'batched' : valeurs posées d'abord, apparences régénérées en une passe par page
+    # 'need_appearances' : apparences laissées au lecteur PDF (/NeedAppearances), pour les brouillons
+    PDF_APPEARANCE_MODES = ('immediate', 'batched', 'need_appearances')
+    PDF_DEFAULT_APPEARANCE_MODE = 'batched'
+    
+    # Stockage des PDF remplis :
+    # 'full' : PDF complet, sauvegardé avec le profil de sauvegarde
+    # 'delta' : fichier .pdfdelta = mise à jour incrémentale sur un modèle de base partagé (pdf_storage.py)
+    PDF_STORAGE_MODES = ('full', 'delta')
+    PDF_DEFAULT_STORAGE_MODE = 'full'
+    
+    # Cache des analyses réglementaires (analysis_cache.py), en nombre de projets distincts
+    ANALYSIS_CACHE_MAX_ENTRIES = 256
+
+    # Règles et seuils d'IntelligentFormSystem (rules_registry.py), rechargés à chaud si le fichier change
+    REGULATORY_RULES_PATH = BASE_DIR / 'regles_reglementaires.json'
+    REGULATORY_RULES_CHECK_INTERVAL = 2.0  # secondes entre deux vérifications du fichier
+
+    # Index local des communes (communes_index.py, construit depuis les fichiers INSEE et La Poste)
+    COMMUNES_INDEX_PATH = BASE_DIR / 'communes.idx'
+    COMMUNE_POPULATION_THRESHOLD = 3500  # Dématérialisation des demandes (communes de plus de 3 500 habitants)
+    
+    # Cache mémoire des modèles CERFA (les 11 modèles font ~14 Mo)
+    TEMPLATE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+    
+    # Modèles allégés (python build_lite_templates.py), utilisés s'ils correspondent aux originaux.
+    # Gain : modèles ~30 % plus petits et sauvegarde ~40 % plus rapide ; l'ouverture est un peu plus
+    # lente (flux d'objets) et, avec le profil 'archival' (garbage=4), la taille produite est inchangée.
+    USE_LITE_TEMPLATES = True
+    LITE_TEMPLATE_SAVE_OPTIONS = {
+        'garbage': 4,
+        'clean': True,
+        'deflate': True,
+        'deflate_images': True,
+        'deflate_fonts': True,
+        'use_objstms': 1,
+    }
+    
+    # Cache des PDF remplis (clé : empreinte du modèle + valeurs des champs + options)
+    USE_OUTPUT_CACHE = True
+    OUTPUT_CACHE_MAX_BYTES = 256 * 1024 * 1024
+    
+    # Mesures par étape des remplissages (fill_metrics.py) : fichier écrit à la demande
+    FILL_METRICS_PATH = BASE_DIR / 'fill_metrics.json'
+    
+    # Génération parallèle (None = un worker par cœur)
+    GENERATION_WORKERS = None
+    GENERATION_MP_START_METHOD = 'spawn'  # Identique sous Windows et Linux, sûr avec Tkinter
+    
+    # Service de génération local (archibot_daemon.py, socket Unix)
+    DAEMON_SOCKET_PATH = BASE_DIR / 'archibot.sock'
+    DAEMON_MAX_PENDING = 32  # Générations en cours ou en attente au-delà desquelles le service répond 'busy'
+    DAEMON_MAX_REQUEST_BYTES = 4 * 1024 * 1024
+    
     @classmethod
     def ensure_directories(cls):
         """Crée les répertoires nécessaires s'ils n'existent pas."""
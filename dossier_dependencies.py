@@ -0,0 +1,258 @@
+"""
+Régénération incrémentale des dossiers : dépendances des CERFA et suivi des modifications
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, FrozenSet, Iterable, List, Mapping, Optional, Tuple
+
+from cerfa_field_mappings import ARCHITECT_INTERNAL_MAP
+from fill_plans import OP_CHOICE, get_fill_plan, resolve_path
+
+logger = logging.getLogger('ArchiBot.dossier_dependencies')
+
+STATE_FILE_NAME = '.dossier_state.json'
+STATE_FORMAT_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CerfaDependencies:
+    """Entrées dont dépend le PDF rempli d'un CERFA."""
+    cerfa_id: str
+    template_sha256: str
+    project_keys: Tuple[Tuple[str, Tuple[str, ...]], ...]  # (clé générique, chemin découpé)
+    architect_fields: Tuple[str, ...]                     # Champs PDF alimentés par le profil architecte
+    plan_digest: str                                      # Empreinte du plan : change si le mappage change
+
+    @property
+    def keys(self) -> FrozenSet[str]:
+        """Clés génériques du projet lues par ce CERFA."""
+        return frozenset(key for key, _ in self.project_keys)
+
+
+def _step_targets(step) -> Tuple[str, ...]:
+    """Champs PDF qu'une étape de plan peut écrire."""
+    if step.op == OP_CHOICE:
+        return tuple(step.choices.values())
+    return (step.target,) + tuple(step.date_targets or ())
+
+
+class DependencyIndex:
+    """
+    Dépendances de chaque CERFA, déduites des mappages et de ARCHITECT_INTERNAL_MAP.
+
+    Seules les clés dont au moins un champ cible existe dans le modèle sont retenues :
+    une valeur écrite dans un champ absent n'a aucun effet sur le PDF produit.
+    """
+
+    def __init__(self):
+        self._dependencies: Dict[Tuple[str, str], CerfaDependencies] = {}
+        self._lock = threading.Lock()
+
+    def get(self, cerfa_id: str) -> CerfaDependencies:
+        """Dépendances du CERFA pour la version actuelle de son modèle (FileNotFoundError sans modèle)."""
+        from template_cache import get_template_cache
+        from widget_index import get_widget_index_store
+
+        template_sha256 = get_template_cache().get(cerfa_id).sha256
+        with self._lock:
+            dependencies = self._dependencies.get((cerfa_id, template_sha256))
+        if dependencies:
+            return dependencies
+
+        widget_index = get_widget_index_store().get(cerfa_id, template_sha256)
+        plan = get_fill_plan(cerfa_id)
+        steps = plan.steps if plan else ()
+        project_keys = tuple(
+            (step.key, step.path) for step in steps
+            if any(target in widget_index for target in _step_targets(step))
+        )
+        architect_fields = tuple(sorted(
+            cerfa_field for cerfa_field in ARCHITECT_INTERNAL_MAP.values() if cerfa_field in widget_index
+        ))
+        plan_digest = hashlib.sha256(repr(steps).encode('utf-8')).hexdigest()
+        dependencies = CerfaDependencies(cerfa_id, template_sha256, project_keys, architect_fields, plan_digest)
+        with self._lock:
+            self._dependencies[(cerfa_id, template_sha256)] = dependencies
+        return dependencies
+
+    def affected_by(self, cerfa_ids: Iterable[str], changed_keys: Iterable[str]) -> List[str]:
+        """CERFA (parmi cerfa_ids) qui lisent au moins une des clés modifiées."""
+        changed_keys = set(changed_keys)
+        return [cerfa_id for cerfa_id in cerfa_ids if self.get(cerfa_id).keys & changed_keys]
+
+    def fingerprint(self, cerfa_id: str, project_data: dict, architect_fields: Mapping[str, Any],
+                    save_options: Mapping[str, Any], appearance_mode: str, storage_mode: str) -> str:
+        """Empreinte des seules entrées qui déterminent le PDF rempli de ce CERFA."""
+        import fitz
+        dependencies = self.get(cerfa_id)
+        payload = json.dumps([
+            STATE_FORMAT_VERSION, fitz.VersionBind, dependencies.template_sha256, dependencies.plan_digest,
+            {key: resolve_path(project_data, path) for key, path in dependencies.project_keys},
+            {name: architect_fields.get(name) for name in dependencies.architect_fields},
+            save_options, appearance_mode, storage_mode,
+        ], sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def changed_keys(old_project: dict, new_project: dict, prefix: str = '') -> List[str]:
+    """Clés génériques (notation pointée) dont la valeur diffère entre deux versions d'un projet."""
+    changed = []
+    for key in set(old_project) | set(new_project):
+        old_value, new_value = old_project.get(key), new_project.get(key)
+        if old_value == new_value:
+            continue
+        path = f"{prefix}{key}"
+        if isinstance(old_value, dict) or isinstance(new_value, dict):
+            changed.extend(changed_keys(old_value if isinstance(old_value, dict) else {},
+                                        new_value if isinstance(new_value, dict) else {}, f"{path}."))
+        else:
+            changed.append(path)
+    return sorted(changed)
+
+
+@dataclass
+class RegenerationPlan:
+    """Répartition des CERFA d'un dossier : à régénérer, ou inchangés (fichier existant conservé)."""
+    to_generate: List[str] = field(default_factory=list)
+    unchanged: Dict[str, str] = field(default_factory=dict)       # CERFA -> fichier existant, au nom du jour
+    fingerprints: Dict[str, str] = field(default_factory=dict)    # CERFA -> empreinte des entrées
+
+    def unchanged_results(self) -> list:
+        """FormFillResult des CERFA inchangés (fichier copié, sans nouveau remplissage)."""
+        from pdf_filler import FormFillResult
+        return [FormFillResult(cerfa_id, output_path=path, unchanged=True) for cerfa_id, path in self.unchanged.items()]
+
+
+class DossierState:
+    """
+    Empreintes des derniers PDF générés dans un répertoire de sortie (.dossier_state.json).
+
+    Un CERFA n'est régénéré que si l'empreinte de ses entrées a changé ou si son
+    dernier fichier a disparu. Le fichier d'un CERFA inchangé est copié sous le nom du
+    jour (cerfa_<id>_<AAAAMMJJ>.pdf), comme s'il avait été régénéré ; le fichier
+    précédent est laissé en place, comme lors d'une régénération.
+    """
+
+    def __init__(self, output_dir, index: Optional[DependencyIndex] = None):
+        self.output_dir = Path(output_dir)
+        self.path = self.output_dir / STATE_FILE_NAME
+        self.index = index or get_dependency_index()
+        self.forms: Dict[str, Dict[str, str]] = self._load()
+
+    def _load(self) -> Dict[str, Dict[str, str]]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"État du dossier illisible, régénération complète : {e}")
+            return {}
+        return state.get('forms', {}) if state.get('version') == STATE_FORMAT_VERSION else {}
+
+    def plan(self, cerfa_ids: List[str], project_data: dict, architect_profile: Optional[str] = None,
+             save_profile: Optional[str] = None, appearance_mode: Optional[str] = None,
+             storage_mode: Optional[str] = None) -> RegenerationPlan:
+        """Détermine quels CERFA doivent être régénérés ; les fichiers inchangés sont mis au nom du jour."""
+        from architect_profiles import get_architect_fields
+        from pdf_filler import get_appearance_mode, get_save_options, get_storage_mode
+
+        plan = RegenerationPlan()
+        try:
+            architect_fields = get_architect_fields(architect_profile)
+            save_options = get_save_options(save_profile)
+            appearance_mode = get_appearance_mode(appearance_mode)
+            storage_mode = get_storage_mode(storage_mode)
+        except (OSError, ValueError):
+            plan.to_generate = list(cerfa_ids)  # La génération reportera l'erreur
+            return plan
+
+        for cerfa_id in cerfa_ids:
+            try:
+                fingerprint = self.index.fingerprint(cerfa_id, project_data, architect_fields,
+                                                     save_options, appearance_mode, storage_mode)
+            except FileNotFoundError:
+                plan.to_generate.append(cerfa_id)
+                continue
+            plan.fingerprints[cerfa_id] = fingerprint
+            previous = self.forms.get(cerfa_id)
+            output_path = None
+            if previous and previous.get('fingerprint') == fingerprint:
+                output_path = self._current_copy(cerfa_id, previous['output_path'], storage_mode)
+            if output_path:
+                plan.unchanged[cerfa_id] = output_path
+                self.forms[cerfa_id] = {'fingerprint': fingerprint, 'output_path': output_path}
+            else:
+                plan.to_generate.append(cerfa_id)
+        return plan
+
+    def _current_copy(self, cerfa_id: str, previous_path: str, storage_mode: str) -> Optional[str]:
+        """Copie le dernier fichier d'un CERFA sous le nom du jour ; None s'il a disparu."""
+        from pdf_filler import dossier_output_path
+
+        target = dossier_output_path(self.output_dir, cerfa_id, storage_mode)
+        if Path(previous_path) == target:
+            return previous_path if target.exists() else None
+        tmp_path = target.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            shutil.copyfile(previous_path, tmp_path)
+            os.replace(tmp_path, target)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            if not isinstance(e, FileNotFoundError):
+                logger.warning(f"Copie de {previous_path} impossible, régénération du CERFA {cerfa_id} : {e}")
+            return None
+        return str(target)
+
+    def record(self, results: Iterable[Any], plan: RegenerationPlan):
+        """Enregistre les empreintes des CERFA générés avec succès."""
+        for result in results:
+            fingerprint = plan.fingerprints.get(result.cerfa_id)
+            if result.success and result.output_path and fingerprint:
+                self.forms[result.cerfa_id] = {'fingerprint': fingerprint, 'output_path': result.output_path}
+        self.save()
+
+    def save(self):
+        """Écrit l'état de façon atomique."""
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': STATE_FORMAT_VERSION, 'forms': self.forms}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, self.path)
+
+
+def regenerate_dossier(cerfa_ids: List[str], project_data: dict, output_dir,
+                       architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+                       appearance_mode: Optional[str] = None, storage_mode: Optional[str] = None) -> list:
+    """
+    Variante incrémentale de pdf_filler.fill_dossier : seuls les CERFA dont les entrées
+    ont changé sont remplis, les autres sont retournés avec unchanged=True.
+    """
+    from pdf_filler import fill_dossier
+
+    state = DossierState(output_dir)
+    plan = state.plan(cerfa_ids, project_data, architect_profile, save_profile, appearance_mode, storage_mode)
+    generated = fill_dossier(plan.to_generate, project_data, output_dir, architect_profile,
+                             save_profile, appearance_mode, storage_mode) if plan.to_generate else []
+    state.record(generated, plan)
+
+    by_id = {result.cerfa_id: result for result in generated + plan.unchanged_results()}
+    return [by_id[cerfa_id] for cerfa_id in cerfa_ids]
+
+
+_dependency_index: Optional[DependencyIndex] = None
+
+
+def get_dependency_index() -> DependencyIndex:
+    """Retourne l'index de dépendances partagé par le processus."""
+    global _dependency_index
+    if _dependency_index is None:
+        _dependency_index = DependencyIndex()
+    return _dependency_index
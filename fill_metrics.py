@@ -0,0 +1,186 @@
+"""
+Mesures par étape des remplissages de CERFA : journal structuré et percentiles par modèle
+"""
+
+import json
+import logging
+import os
+import threading
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Deque, Dict, Optional
+
+from config import Config
+from utils import percentile
+
+logger = logging.getLogger('ArchiBot.fill_metrics')
+
+METRICS_WINDOW = 512  # Remplissages conservés par modèle pour les percentiles
+
+# Étapes de FormFillResult.timings, dans l'ordre d'exécution
+STAGES = ('profile', 'mapping', 'cache', 'template', 'open', 'index', 'fill', 'merge', 'save', 'write')
+# Durées partagées entre les formulaires d'un dossier : journalisées mais exclues du total
+SHARED_STAGES = ('shared',)
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+@dataclass
+class _TemplateStats:
+    window: int
+    count: int = 0
+    errors: int = 0
+    cache_hits: int = 0
+    durations: Dict[str, Deque[float]] = field(default_factory=dict)
+    sizes: Deque[int] = field(init=False)
+    widgets_filled: Deque[int] = field(init=False)
+
+    def __post_init__(self):
+        self.sizes = deque(maxlen=self.window)
+        self.widgets_filled = deque(maxlen=self.window)
+
+    def add_duration(self, stage: str, seconds: float):
+        if stage not in self.durations:
+            self.durations[stage] = deque(maxlen=self.window)
+        self.durations[stage].append(seconds)
+
+
+def _distribution(values, scale: float = 1.0, digits: Optional[int] = 3) -> Dict[str, float]:
+    """Effectif, percentiles et maximum (digits=None : valeurs entières)."""
+    values = [value * scale for value in values]
+    summary = {'n': len(values)}
+    summary.update({f"p{int(q * 100)}": percentile(values, q) for q in QUANTILES})
+    summary['max'] = max(values, default=0)
+    return {key: round(value, digits) if key != 'n' else value for key, value in summary.items()}
+
+
+def _stage_order(stage: str):
+    return STAGES.index(stage) if stage in STAGES else len(STAGES)
+
+
+class FillMetrics:
+    """
+    Durées par étape, champs remplis et taille produite de chaque remplissage.
+
+    Chaque remplissage est journalisé (logger ArchiBot.fill_metrics, une ligne
+    clé=valeur, détail complet dans l'attribut 'fill_metrics' de l'enregistrement)
+    puis agrégé par modèle sur les METRICS_WINDOW derniers remplissages.
+    """
+
+    def __init__(self, window: int = METRICS_WINDOW):
+        self.window = window
+        self.enabled = True
+        self._templates: Dict[str, _TemplateStats] = {}
+        self._lock = threading.Lock()
+
+    def record(self, result):
+        """Journalise et agrège un FormFillResult terminé (succès ou échec)."""
+        if not self.enabled or result.unchanged:
+            return
+        stages = {stage: result.timings[stage] for stage in sorted(result.timings, key=_stage_order)}
+        total = sum(duration for stage, duration in stages.items() if stage not in SHARED_STAGES)
+        entry = {
+            'cerfa_id': result.cerfa_id,
+            'status': 'ok' if result.success else 'error',
+            'total_ms': round(total * 1000, 3),
+            **{f"{stage}_ms": round(duration * 1000, 3) for stage, duration in stages.items()},
+            'filled': len(result.fields_filled),
+            'missing': len(result.fields_missing),
+            'widgets': result.widgets_total,
+            'bytes': result.output_size,
+            'cache': 'hit' if result.from_cache else 'miss',
+        }
+        logger.info("fill " + " ".join(f"{key}={value}" for key, value in entry.items()),
+                    extra={'fill_metrics': entry})
+
+        with self._lock:
+            stats = self._templates.get(result.cerfa_id)
+            if stats is None:
+                stats = self._templates[result.cerfa_id] = _TemplateStats(self.window)
+            stats.count += 1
+            if not result.success:
+                stats.errors += 1
+                return
+            stats.cache_hits += result.from_cache
+            for stage, duration in stages.items():
+                stats.add_duration(stage, duration)
+            stats.add_duration('total', total)
+            if result.output_size:
+                stats.sizes.append(result.output_size)
+            stats.widgets_filled.append(len(result.fields_filled))
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Agrégats par modèle : compteurs, percentiles des durées (ms) et des tailles (octets)."""
+        with self._lock:
+            return {
+                cerfa_id: {
+                    'fills': stats.count,
+                    'errors': stats.errors,
+                    'cache_hits': stats.cache_hits,
+                    'stages_ms': {stage: _distribution(durations, 1000)
+                                  for stage, durations in sorted(stats.durations.items(),
+                                                                 key=lambda item: _stage_order(item[0]))},
+                    'bytes': _distribution(stats.sizes, digits=None),
+                    'widgets_filled': _distribution(stats.widgets_filled, digits=None),
+                }
+                for cerfa_id, stats in sorted(self._templates.items())
+            }
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Reprises du cache de sortie sur tous les remplissages réussis enregistrés.
+
+        Calculé à partir des résultats : pour le moteur de génération, ce sont ceux que
+        collect enregistre dans le processus principal, quel que soit le worker.
+        """
+        with self._lock:
+            fills = sum(stats.count - stats.errors for stats in self._templates.values())
+            hits = sum(stats.cache_hits for stats in self._templates.values())
+        return {'fills': fills, 'hits': hits, 'hit_rate': round(hits / fills, 4) if fills else 0.0}
+
+    def format_report(self) -> str:
+        """Tableau texte des percentiles par modèle et par étape."""
+        lines = [f"{'CERFA':<10}{'étape':<10}{'n':>6}{'p50 (ms)':>11}{'p95 (ms)':>11}{'p99 (ms)':>11}{'max (ms)':>11}"]
+        for cerfa_id, stats in self.snapshot().items():
+            for stage, summary in stats['stages_ms'].items():
+                lines.append(f"{cerfa_id:<10}{stage:<10}{summary['n']:>6}"
+                             + "".join(f"{summary[key]:>11.1f}" for key in ('p50', 'p95', 'p99', 'max')))
+        return "\n".join(lines)
+
+    def dump(self, path: Optional[Path] = None) -> Path:
+        """Écrit les agrégats en JSON (de façon atomique) et retourne le chemin."""
+        path = Path(path) if path else Config.FILL_METRICS_PATH
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'pid': os.getpid(), 'templates': self.snapshot()}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+        logger.info(f"Mesures de remplissage écrites dans {path}")
+        return path
+
+    def reset(self):
+        with self._lock:
+            self._templates.clear()
+
+
+@contextmanager
+def recording(result):
+    """Enregistre le résultat à la sortie du bloc ; une exception levée y est reportée comme erreur."""
+    try:
+        yield result
+    except Exception as e:
+        result.error = result.error or str(e)
+        raise
+    finally:
+        get_fill_metrics().record(result)
+
+
+_fill_metrics: Optional[FillMetrics] = None
+
+
+def get_fill_metrics() -> FillMetrics:
+    """Retourne les mesures de remplissage du processus."""
+    global _fill_metrics
+    if _fill_metrics is None:
+        _fill_metrics = FillMetrics()
+    return _fill_metrics
@@ -0,0 +1,133 @@
+"""
+Compilation des mappages CERFA en plans de remplissage précalculés
+"""
+
+import threading
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
+
+from cerfa_field_mappings import CERFA_FIELD_MAPPINGS
+
+# Types d'opération d'une étape de plan
+OP_TEXT = 'text'        # Valeur copiée telle quelle dans un champ texte
+OP_CHOICE = 'choice'    # Valeur -> case à cocher/option à cocher
+OP_DATE = 'date'        # Date AAAA-MM-JJ, éventuellement décomposée en jour/mois/année
+
+
+class FillStep(NamedTuple):
+    """Étape d'un plan : une clé du projet et les widgets qu'elle alimente."""
+    key: str                                        # Clé générique (ex: 'client.nom')
+    path: Tuple[str, ...]                           # Clé pré-découpée (ex: ('client', 'nom'))
+    op: str
+    target: Optional[str] = None                    # Champ PDF (OP_TEXT, OP_DATE)
+    choices: Optional[Mapping[Any, str]] = None     # Valeur -> champ PDF (OP_CHOICE)
+    date_targets: Optional[Tuple[str, str, str]] = None  # Champs (jour, mois, année) (OP_DATE)
+
+
+def resolve_path(data: Any, path: Tuple[str, ...]) -> Any:
+    """Équivalent de get_nested_value pour un chemin déjà découpé."""
+    value = data
+    for key in path:
+        if isinstance(value, dict):
+            value = value.get(key)
+        else:
+            return None
+    return value
+
+
+@dataclass(frozen=True)
+class FillPlan:
+    """Plan de remplissage compilé d'un CERFA."""
+    cerfa_id: str
+    steps: Tuple[FillStep, ...]
+
+    @property
+    def keys(self) -> Tuple[str, ...]:
+        """Clés génériques du projet lues par ce plan."""
+        return tuple(step.key for step in self.steps)
+
+    def apply(self, project_data: dict, final_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Applique le plan : écrit dans final_data les valeurs champ PDF -> valeur.
+
+        Chaque clé est résolue et appliquée dans la même passe, sans dictionnaire
+        intermédiaire : c'est plus rapide que de partager des valeurs pré-résolues.
+        """
+        for _, path, op, target, choices, date_targets in self.steps:
+            value = project_data
+            for key in path:
+                if isinstance(value, dict):
+                    value = value.get(key)
+                else:
+                    value = None
+                    break
+            if value is None or value == "":
+                continue
+            if op == OP_TEXT:
+                final_data[target] = value
+            else:
+                _apply_special(final_data, value, op, target, choices, date_targets)
+        return final_data
+
+
+def _apply_special(final_data: Dict[str, Any], value: Any, op: str, target: Optional[str],
+                   choices: Optional[Mapping[Any, str]], date_targets: Optional[Tuple[str, str, str]]):
+    """Applique une valeur non vide pour les opérations OP_CHOICE et OP_DATE."""
+    if op == OP_CHOICE:
+        choice_field = choices.get(value)
+        if choice_field:
+            final_data[choice_field] = "On"  # Valeur standard pour cocher
+    elif isinstance(value, str) and '-' in value:
+        parts = value.split('-')
+        if len(parts) == 3 and date_targets:
+            jour, mois, annee = date_targets
+            final_data[jour] = parts[2]
+            final_data[mois] = parts[1]
+            final_data[annee] = parts[0]
+        else:
+            final_data[target] = value  # Fallback si pas de mapping jour/mois/année
+    else:
+        final_data[target] = value
+
+
+def compile_mapping(cerfa_id: str, mapping: Mapping[str, Any]) -> FillPlan:
+    """Compile un mappage brut (clé générique -> champ ou dict d'options) en FillPlan."""
+    steps = []
+    for generic_key, cerfa_field in mapping.items():
+        if not cerfa_field:
+            continue
+        path = tuple(generic_key.split('.'))
+
+        if isinstance(cerfa_field, dict):
+            choices = {value: field for value, field in cerfa_field.items() if field}
+            steps.append(FillStep(generic_key, path, OP_CHOICE, choices=choices))
+        elif "date" in generic_key.lower():
+            split_fields = tuple(mapping.get(f"{generic_key}.{part}") for part in ('jour', 'mois', 'annee'))
+            date_targets = split_fields if all(split_fields) else None
+            steps.append(FillStep(generic_key, path, OP_DATE, target=cerfa_field, date_targets=date_targets))
+        else:
+            steps.append(FillStep(generic_key, path, OP_TEXT, target=cerfa_field))
+    return FillPlan(cerfa_id, tuple(steps))
+
+
+_plans: Dict[str, FillPlan] = {}
+_plans_lock = threading.Lock()
+
+
+def get_fill_plan(cerfa_id: str) -> Optional[FillPlan]:
+    """Retourne le plan compilé d'un CERFA (compilé à la première demande), ou None sans mappage."""
+    plan = _plans.get(cerfa_id)
+    if plan is None:
+        mapping = CERFA_FIELD_MAPPINGS.get(cerfa_id)
+        if not mapping:
+            return None
+        with _plans_lock:
+            plan = _plans.setdefault(cerfa_id, compile_mapping(cerfa_id, mapping))
+    return plan
+
+
+def compile_all(cerfa_ids: Optional[Iterable[str]] = None) -> Dict[str, FillPlan]:
+    """Compile d'avance les plans (tous les CERFA mappés par défaut)."""
+    if cerfa_ids is None:
+        cerfa_ids = CERFA_FIELD_MAPPINGS.keys()
+    return {cerfa_id: plan for cerfa_id in cerfa_ids if (plan := get_fill_plan(cerfa_id))}
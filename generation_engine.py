@@ -0,0 +1,189 @@
+"""
+Moteur de génération PDF parallèle (pool de processus à workers préchauffés)
+"""
+
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.generation_engine')
+
+
+def _init_worker():
+    """Précharge les modèles, leurs index de widgets, les plans compilés et les profils architecte."""
+    from architect_profiles import get_architect_profile_cache
+    from fill_metrics import get_fill_metrics
+    from fill_plans import compile_all
+    from template_cache import get_template_cache
+    from widget_index import get_widget_index_store
+
+    cache = get_template_cache()
+    cache.preload()
+    store = get_widget_index_store()
+    for template_path in sorted(cache.templates_dir.glob("cerfa_*.pdf")):
+        cerfa_id = template_path.stem[len("cerfa_"):]
+        template = cache.get(cerfa_id)
+        store.get(cerfa_id, template.sha256)
+    compile_all()
+    get_fill_metrics().enabled = False  # Les résultats sont mesurés par le processus principal (collect)
+
+    profiles = get_architect_profile_cache()
+    for name in profiles.profile_names():
+        try:
+            profiles.get_fields(name)
+        except (OSError, ValueError) as e:
+            logger.error(f"Profil architecte {name} indisponible dans le worker {os.getpid()}: {e}")
+
+
+def _noop():
+    """Tâche vide, utilisée pour démarrer les workers à l'avance."""
+    return os.getpid()
+
+
+def _generate_form(cerfa_id: str, project_data: dict, output_pdf_path: str,
+                   architect_profile: Optional[str], save_profile: Optional[str],
+                   storage_mode: Optional[str] = None, appearance_mode: Optional[str] = None):
+    """Tâche exécutée dans un worker : remplit un CERFA."""
+    from architect_profiles import get_architect_fields
+    from pdf_filler import FormFillResult, fill_cerfa_form
+
+    try:
+        architect_fields = get_architect_fields(architect_profile)
+    except (OSError, ValueError) as e:
+        return FormFillResult(cerfa_id, error=f"Profil architecte indisponible : {e}")
+    return fill_cerfa_form(cerfa_id, architect_fields, project_data, output_pdf_path, save_profile,
+                           appearance_mode=appearance_mode, storage_mode=storage_mode)
+
+
+def _generate_merged_dossier(cerfa_ids: List[str], project_data: dict, output_pdf_path: str,
+                             architect_profile: Optional[str], save_profile: Optional[str],
+                             appearance_mode: Optional[str] = None):
+    """Tâche exécutée dans un worker : remplit tout un dossier dans un seul PDF."""
+    from pdf_filler import fill_dossier_merged
+    return fill_dossier_merged(cerfa_ids, project_data, output_pdf_path, architect_profile, save_profile,
+                               appearance_mode)
+
+
+class GenerationEngine:
+    """
+    Répartit le remplissage des CERFA sur un pool de processus.
+
+    Chaque formulaire est une tâche indépendante : les formulaires d'un dossier, et les
+    dossiers d'un lot, sont donc distribués sur tous les cœurs. Les résultats sont
+    restitués au fur et à mesure de leur achèvement.
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        self.max_workers = max_workers or Config.GENERATION_WORKERS or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context(Config.GENERATION_MP_START_METHOD),
+            initializer=_init_worker,
+        )
+        self._jobs: Dict[Future, Tuple[Any, str]] = {}
+
+    def warm_up(self):
+        """Démarre et initialise tous les workers sans attendre la première génération."""
+        futures = [self._executor.submit(_noop) for _ in range(self.max_workers)]
+        for future in futures:
+            future.result()
+
+    def submit_form(self, cerfa_id: str, project_data: dict, output_pdf_path, dossier_id: Any = None,
+                    architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+                    storage_mode: Optional[str] = None, appearance_mode: Optional[str] = None) -> Future:
+        """Soumet le remplissage d'un CERFA (options : voir pdf_filler.fill_pdf)."""
+        future = self._executor.submit(_generate_form, cerfa_id, project_data, str(output_pdf_path),
+                                       architect_profile, save_profile, storage_mode, appearance_mode)
+        self._jobs[future] = (dossier_id, cerfa_id)
+        return future
+
+    def submit_dossier(self, cerfa_ids: List[str], project_data: dict, output_dir,
+                       dossier_id: Any = None, architect_profile: Optional[str] = None,
+                       save_profile: Optional[str] = None, storage_mode: Optional[str] = None,
+                       appearance_mode: Optional[str] = None) -> List[Future]:
+        """Soumet tous les CERFA d'un dossier (un fichier par CERFA dans output_dir, nommé comme par fill_dossier)."""
+        from pdf_filler import dossier_output_path
+
+        output_dir = Path(output_dir)
+        output_dir.mkdir(parents=True, exist_ok=True)
+        return [
+            self.submit_form(cerfa_id, project_data, dossier_output_path(output_dir, cerfa_id, storage_mode),
+                             dossier_id, architect_profile, save_profile, storage_mode, appearance_mode)
+            for cerfa_id in cerfa_ids
+        ]
+
+    def submit_merged_dossier(self, cerfa_ids: List[str], project_data: dict, output_pdf_path,
+                              dossier_id: Any = None, architect_profile: Optional[str] = None,
+                              save_profile: Optional[str] = None, appearance_mode: Optional[str] = None) -> Future:
+        """Soumet un dossier fusionné (un seul PDF) : une tâche pour tous ses CERFA."""
+        Path(output_pdf_path).parent.mkdir(parents=True, exist_ok=True)
+        future = self._executor.submit(_generate_merged_dossier, list(cerfa_ids), project_data,
+                                       str(output_pdf_path), architect_profile, save_profile, appearance_mode)
+        self._jobs[future] = (dossier_id, tuple(cerfa_ids))
+        return future
+
+    def collect(self, future: Future) -> Tuple[Any, Any]:
+        """
+        Retourne (identifiant du dossier, résultat) d'une tâche terminée.
+
+        Le résultat est un FormFillResult, ou la liste des FormFillResult du dossier
+        pour une tâche soumise par submit_merged_dossier.
+        """
+        from fill_metrics import get_fill_metrics
+        from pdf_filler import FormFillResult
+
+        dossier_id, cerfa_id = self._jobs.pop(future)
+        try:
+            result = future.result()
+        except Exception as e:
+            # Worker tombé ou erreur de transmission : le résultat porte l'erreur
+            logger.error(f"Échec de la génération du CERFA {cerfa_id}: {e}")
+            if isinstance(cerfa_id, tuple):
+                result = [FormFillResult(merged_id, error=str(e)) for merged_id in cerfa_id]
+            else:
+                result = FormFillResult(cerfa_id, error=str(e))
+
+        metrics = get_fill_metrics()
+        for form_result in result if isinstance(result, list) else [result]:
+            metrics.record(form_result)
+        return dossier_id, result
+
+    def iter_results(self, futures: Iterable[Future]) -> Iterator[Tuple[Any, Any]]:
+        """Restitue les résultats dans l'ordre d'achèvement."""
+        for future in as_completed(list(futures)):
+            yield self.collect(future)
+
+    def generate_dossier(self, cerfa_ids: List[str], project_data: dict, output_dir) -> Iterator[Any]:
+        """Génère un dossier et restitue chaque FormFillResult dès qu'il est prêt."""
+        for _, result in self.iter_results(self.submit_dossier(cerfa_ids, project_data, output_dir)):
+            yield result
+
+    def generate_batch(self, dossiers: Iterable[Tuple[Any, List[str], dict, Any]]) -> Iterator[Tuple[Any, Any]]:
+        """
+        Génère un lot de dossiers.
+
+        Args:
+            dossiers: Tuples (identifiant, cerfa_ids, project_data, output_dir).
+
+        Yields:
+            (identifiant du dossier, FormFillResult) dans l'ordre d'achèvement.
+        """
+        futures = []
+        for dossier_id, cerfa_ids, project_data, output_dir in dossiers:
+            futures.extend(self.submit_dossier(cerfa_ids, project_data, output_dir, dossier_id))
+        yield from self.iter_results(futures)
+
+    def shutdown(self, wait: bool = True):
+        """Arrête le pool (les tâches non démarrées sont annulées si wait=False)."""
+        self._executor.shutdown(wait=wait, cancel_futures=not wait)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.shutdown()
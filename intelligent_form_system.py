@@ -7,11 +7,13 @@ import json
 import logging
 from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple, Any
+from typing import Dict, List, Mapping, Optional, Tuple, Any
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from communes_index import get_communes_index
 from config import Config
+from rules_registry import RuleRegistry, get_rule_registry
 from utils import validate_project_data, get_nested_value
 
 logger = logging.getLogger('ArchiBot.intelligent_form')
@@ -76,110 +78,34 @@ class ArchitecteInfo:
 class IntelligentFormSystem:
     """Système de formulaire intelligent pour architectes"""
     
-    def __init__(self):
-        """Initialise le système avec les règles métier françaises"""
-        self.regles_urbanisme = self._charger_regles_urbanisme()
-        self.seuils_reglementaires = self._charger_seuils_reglementaires()
-        self.templates_projets = self._charger_templates_projets()
-        
-    def _charger_regles_urbanisme(self) -> Dict[str, Any]:
-        """Charge les règles d'urbanisme françaises"""
-        return {
-            # Article R*421-1 et suivants du Code de l'urbanisme
-            "seuils_permis_construire": {
-                "personne_physique": {
-                    "surface_plancher": 150,  # m²
-                    "emprise_sol": 150  # m²
-                },
-                "personne_morale": {
-                    "surface_plancher": 0,  # Toujours PC
-                    "emprise_sol": 0
-                }
-            },
-            "seuils_declaration_prealable": {
-                "extension": {
-                    "zone_urbaine": {"min": 5, "max": 40},  # m²
-                    "zone_protegee": {"min": 0, "max": 20}  # m²
-                },
-                "modification_aspect": True,
-                "construction_annexe": {"max": 20}  # m²
-            },
-            "obligations_architecte": {
-                "surface_plancher_min": 150,  # m²
-                "emprise_sol_min": 150,  # m²
-                "personne_morale": True,
-                "erp": True,
-                "batiment_france": True
-            },
-            "delais_instruction": {
-                "permis_construire_maison": 60,  # jours
-                "permis_construire_autre": 90,
-                "declaration_prealable": 30,
-                "permis_amenager": 90,
-                "permis_demolir": 60,
-                "modificatif": 60,
-                "transfert": 30,
-                "certificat_urbanisme": 30
-            }
-        }
-    
-    def _charger_seuils_reglementaires(self) -> Dict[str, Any]:
-        """Charge les seuils réglementaires 2025"""
-        return {
-            "etude_thermique": {
-                "surface_min": 50,  # m²
-                "norme": "RE2020"
-            },
-            "etude_sol": {
-                "surface_terrain_min": 1000,  # m²
-                "zone_sensible": True
-            },
-            "raccordement_reseaux": {
-                "assainissement_collectif": True,
-                "eau_potable": True,
-                "electricite": True
-            },
-            "accessibilite_pmr": {
-                "erp": True,
-                "logement_collectif": True,
-                "seuil_logements": 3
-            },
-            "stationnement": {
-                "ratio_logement": 1,  # places par logement
-                "ratio_commerce": 1  # places par 25m²
-            }
-        }
-    
-    def _charger_templates_projets(self) -> Dict[str, Any]:
-        """Templates de projets types pour les architectes"""
-        return {
-            "maison_individuelle": {
-                "surface_type": 120,
-                "emprise_type": 100,
-                "hauteur_type": 8,
-                "destination": DestinationBatiment.HABITATION,
-                "documents_types": ["plans", "facades", "coupes", "notice"],
-                "etudes_requises": ["thermique", "sol"]
-            },
-            "extension_maison": {
-                "surface_type": 30,
-                "rattachement_existant": True,
-                "respect_prospect": True,
-                "documents_types": ["plans", "facades", "notice"]
-            },
-            "renovation_batiment": {
-                "changement_destination": False,
-                "modification_structure": False,
-                "isolation_thermique": True,
-                "documents_types": ["etat_existant", "projet", "notice"]
-            },
-            "etablissement_commercial": {
-                "surface_type": 200,
-                "accessibilite_pmr": True,
-                "stationnement": True,
-                "etudes_requises": ["impact", "securite", "accessibilite"]
-            }
-        }
+    def __init__(self, registry: Optional[RuleRegistry] = None):
+        """Initialise le système avec les règles métier françaises (registre partagé du processus)"""
+        self._registry = registry or get_rule_registry()
+        self._registry.get()  # Fichier de règles absent ou invalide : erreur dès la construction
+
+    @property
+    def regles_urbanisme(self) -> Mapping[str, Any]:
+        return self._charger_regles_urbanisme()
+
+    @property
+    def seuils_reglementaires(self) -> Mapping[str, Any]:
+        return self._charger_seuils_reglementaires()
+
+    @property
+    def templates_projets(self) -> Mapping[str, Any]:
+        return self._charger_templates_projets()
+
+    def _charger_regles_urbanisme(self) -> Mapping[str, Any]:
+        """Règles d'urbanisme françaises (Article R*421-1 et suivants), en lecture seule"""
+        return self._registry.get().regles_urbanisme
+
+    def _charger_seuils_reglementaires(self) -> Mapping[str, Any]:
+        """Seuils réglementaires 2025, en lecture seule"""
+        return self._registry.get().seuils_reglementaires
+
+    def _charger_templates_projets(self) -> Mapping[str, Any]:
+        """Templates de projets types pour les architectes, en lecture seule"""
+        return self._registry.get().templates_projets
     
     def analyser_projet(self, donnees_projet: Dict[str, Any]) -> Dict[str, Any]:
         """Analyse intelligente d'un projet selon la réglementation"""
@@ -244,7 +170,8 @@ class IntelligentFormSystem:
             zone_abf=technique.get('zoneProtegee', False),
             secteur_sauvegarde=technique.get('secteurSauvegarde', False),
             site_classe=technique.get('siteClasse', False),
-            commune_plus_3500_hab=self._determiner_taille_commune(projet.get('codePostalProjet'))
+            commune_plus_3500_hab=self._determiner_taille_commune(projet.get('codePostalProjet'),
+                                                                  projet.get('villeProjet'))
         )
     
     def _determiner_autorisations(self, projet: Dict, surface_plancher: float, 
@@ -253,15 +180,19 @@ class IntelligentFormSystem:
         """Détermine les autorisations d'urbanisme requises"""
         autorisations = []
         type_projet = projet.get('typeProjet')
+        regles = self.regles_urbanisme
+        seuils_pcmi = regles['seuils_permis_construire']['personne_physique']
+        delais = regles['delais_instruction']
         
         if type_projet == TypeProjet.CONSTRUCTION_NEUVE.value:
-            if est_personne_physique and surface_plancher <= 150 and emprise_sol <= 150:
+            if (est_personne_physique and surface_plancher <= seuils_pcmi['surface_plancher']
+                    and emprise_sol <= seuils_pcmi['emprise_sol']):
                 autorisations.append({
                     'type': 'CERFA 13406*15',
                     'nom': 'Permis de construire pour une maison individuelle',
                     'article_code': 'R*421-1',
                     'obligatoire': True,
-                    'delai_instruction': 60,
+                    'delai_instruction': delais['permis_construire_maison'],
                     'pieces_jointes': self._pieces_pc_maison_individuelle()
                 })
             else:
@@ -270,38 +201,31 @@ class IntelligentFormSystem:
                     'nom': 'Permis de construire',
                     'article_code': 'R*421-1',
                     'obligatoire': True,
-                    'delai_instruction': 90,
+                    'delai_instruction': delais['permis_construire_autre'],
                     'pieces_jointes': self._pieces_pc_autre()
                 })
         
         elif type_projet == TypeProjet.EXTENSION.value:
-            if surface_plancher <= 20 and not contexte.zone_abf:
-                # Extension sans autorisation si < 5m² et pas en zone protégée
-                if surface_plancher >= 5:
+            seuils_dp = regles['seuils_declaration_prealable']['extension']['zone_urbaine']
+            if surface_plancher <= seuils_dp['max']:
+                # Extension sans autorisation sous le seuil minimal, hors zone protégée
+                if contexte.zone_abf or surface_plancher >= seuils_dp['min']:
                     autorisations.append({
                         'type': 'CERFA 16702*01',
                         'nom': 'Déclaration préalable - Extension',
                         'article_code': 'R*421-9',
                         'obligatoire': True,
-                        'delai_instruction': 30
+                        'delai_instruction': delais['declaration_prealable']
                     })
-            elif surface_plancher <= 40:
-                autorisations.append({
-                    'type': 'CERFA 16702*01',
-                    'nom': 'Déclaration préalable - Extension',
-                    'article_code': 'R*421-9',
-                    'obligatoire': True,
-                    'delai_instruction': 30
-                })
             else:
-                # Extension > 40m² = Permis de construire
+                # Extension au-delà du seuil de la déclaration préalable = Permis de construire
                 if est_personne_physique:
                     autorisations.append({
                         'type': 'CERFA 13406*15',
                         'nom': 'Permis de construire maison - Extension',
                         'article_code': 'R*421-1',
                         'obligatoire': True,
-                        'delai_instruction': 60
+                        'delai_instruction': delais['permis_construire_maison']
                     })
                 else:
                     autorisations.append({
@@ -309,7 +233,7 @@ class IntelligentFormSystem:
                         'nom': 'Permis de construire - Extension',
                         'article_code': 'R*421-1',
                         'obligatoire': True,
-                        'delai_instruction': 90
+                        'delai_instruction': delais['permis_construire_autre']
                     })
         
         # Toujours proposer le certificat d'urbanisme
@@ -319,7 +243,7 @@ class IntelligentFormSystem:
             'article_code': 'R*410-1',
             'obligatoire': False,
             'recommande': True,
-            'delai_instruction': 30,
+            'delai_instruction': delais['certificat_urbanisme'],
             'utilite': 'Connaître les règles d\'urbanisme et la faisabilité'
         })
         
@@ -337,16 +261,18 @@ class IntelligentFormSystem:
             'accessibilite_pmr': False,
             'dematerialisation': False
         }
+        seuils_architecte = self.regles_urbanisme['obligations_architecte']
         
         # Obligation architecte (Article L431-3)
-        if (surface_plancher > 150 or emprise_sol > 150 or 
+        if (surface_plancher > seuils_architecte['surface_plancher_min'] or
+            emprise_sol > seuils_architecte['emprise_sol_min'] or 
             not est_personne_physique or 
             destination == DestinationBatiment.ERP.value or
             contexte.zone_abf):
             obligations['architecte'] = True
         
         # Étude thermique (RE2020)
-        if surface_plancher > 50:
+        if surface_plancher > self.seuils_reglementaires['etude_thermique']['surface_min']:
             obligations['etude_thermique'] = True
         
         # Étude de sol (Article L132-3)
@@ -474,11 +400,26 @@ class IntelligentFormSystem:
             "PC12 - Étude d'impact (si requis)"
         ]
     
-    def _determiner_taille_commune(self, code_postal: str) -> bool:
-        """Détermine si la commune fait plus de 3500 habitants"""
-        # Simplification - en réalité, consulter base INSEE
+    def _determiner_taille_commune(self, code_postal: Optional[str], ville: Optional[str] = None) -> bool:
+        """
+        Détermine si la commune fait plus de 3500 habitants (index INSEE local, communes_index.py).
+
+        Sans code postal, la commune est considérée comme de plus de 3500 habitants (dépôt
+        dématérialisé : hypothèse la plus contraignante). Commune inconnue ou ambiguë, ou index
+        absent (signalé au chargement) : estimation par département, signalée dans le journal.
+        """
+        if not code_postal:
+            logger.warning("Code postal du projet absent : commune supposée de plus de 3500 habitants")
+            return ContexteReglementaire.commune_plus_3500_hab
+        index = get_communes_index()
+        plus_3500_hab = index.above_threshold(code_postal, ville)
+        if plus_3500_hab is not None:
+            return plus_3500_hab
+        if index.available:
+            logger.warning(f"Commune {code_postal} ({ville or 'nom non renseigné'}) inconnue ou ambiguë dans l'index : "
+                           "taille estimée par département")
         grandes_communes = ['75', '69', '13', '33', '31', '59', '92', '93', '94']
-        return any(code_postal.startswith(prefix) for prefix in grandes_communes)
+        return any(str(code_postal).strip().startswith(prefix) for prefix in grandes_communes)
     
     def _generer_planning_projet(self, delai_instruction: int) -> List[Dict[str, str]]:
         """Génère un planning type de projet"""
@@ -541,10 +482,20 @@ class IntelligentFormSystem:
         else:
             return "Projet complexe - Recours à des experts spécialisés recommandé"
 
+_intelligent_form_system: Optional[IntelligentFormSystem] = None
+
+
+def get_intelligent_form_system() -> IntelligentFormSystem:
+    """Retourne le système partagé du processus (règles rechargées à chaud via le registre)"""
+    global _intelligent_form_system
+    if _intelligent_form_system is None:
+        _intelligent_form_system = IntelligentFormSystem()
+    return _intelligent_form_system
+
 # Fonctions utilitaires pour l'interface
 def generer_formulaire_intelligent(donnees_partielles: Dict[str, Any]) -> Dict[str, Any]:
     """Génère un formulaire intelligent basé sur les données partielles"""
-    system = IntelligentFormSystem()
+    system = get_intelligent_form_system()
     
     # Analyse avec les données disponibles
     if donnees_partielles.get('projet', {}).get('typeProjet'):
@@ -3,21 +3,31 @@ Interface utilisateur intelligente et progressive
 Optimisée pour le workflow des architectes
 """
 
+import time
+_STARTUP_TIME = time.perf_counter()  # Référence de la mesure du temps jusqu'au premier affichage
+
 import tkinter as tk
 from tkinter import ttk, messagebox, scrolledtext
 import json
+import logging
+import os
 import sys
 import re
+import threading
 from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
-# Imports locaux
+# Imports locaux ; les sous-systèmes lourds (règles métier, mappages, moteur de génération,
+# PyMuPDF) sont importés à la demande ou préchargés après le premier affichage
 sys.path.append(str(Path(__file__).parent))
 from config import Config
-from architect_business_logic import ArchitectBusinessLogic
-from utils import validate_project_data
-from pdf_filler import fill_pdf
+from utils import sanitize_filename, validate_project_data
+
+logger = logging.getLogger('ArchiBot.interface')
+
+# Variable d'environnement utilisée par benchmarks/bench_startup.py : quitte après le premier affichage
+EXIT_AFTER_FIRST_FRAME_ENV = 'ARCHIBOT_EXIT_AFTER_FIRST_FRAME'
 
 class ProgressiveFormWizard:
     """Assistant de saisie progressive et intelligente"""
@@ -28,8 +38,11 @@ class ProgressiveFormWizard:
         self.master.geometry("1200x800")
         self.master.configure(bg='#f8f9fa')
         
-        # Système intelligent
-        self.architect_logic = ArchitectBusinessLogic()
+        # Système intelligent (créé à la première analyse, ou par le préchargement)
+        self._architect_logic = None
+        self._analysis_cache = None  # Analyses indexées par les champs lus par les règles
+        self.generation_engine = None  # Pool de génération PDF, créé par le préchargement ou à la première génération
+        self._subsystems_lock = threading.Lock()
         
         # Données du projet
         self.project_data = {
@@ -55,6 +68,63 @@ class ProgressiveFormWizard:
         
         self._create_interface()
         self._setup_auto_completion()
+    
+    @property
+    def architect_logic(self):
+        """Moteur de règles métier, chargé au premier usage"""
+        with self._subsystems_lock:
+            if self._architect_logic is None:
+                from architect_business_logic import ArchitectBusinessLogic
+                self._architect_logic = ArchitectBusinessLogic()
+            return self._architect_logic
+    
+    @property
+    def analysis_cache(self):
+        """Cache des analyses (analysis_cache.py), créé au premier usage"""
+        logic = self.architect_logic
+        with self._subsystems_lock:
+            if self._analysis_cache is None:
+                from analysis_cache import AnalysisCache
+                self._analysis_cache = AnalysisCache(logic)
+            return self._analysis_cache
+    
+    def _get_generation_engine(self):
+        """Pool de génération PDF, créé au premier appel (depuis le préchargement ou l'interface)"""
+        with self._subsystems_lock:
+            if self.generation_engine is None:
+                from generation_engine import GenerationEngine
+                self.generation_engine = GenerationEngine()
+            return self.generation_engine
+    
+    def on_first_frame(self):
+        """Appelé une fois la fenêtre affichée : mesure le démarrage puis lance le préchargement"""
+        elapsed_ms = (time.perf_counter() - _STARTUP_TIME) * 1000
+        logger.info(f"Premier affichage en {elapsed_ms:.0f} ms")
+        if os.environ.get(EXIT_AFTER_FIRST_FRAME_ENV):
+            print(f"first_frame_ms={elapsed_ms:.1f}", flush=True)
+            self.master.destroy()
+            return
+        threading.Thread(target=self._warm_up_subsystems, name="archibot-warmup", daemon=True).start()
+    
+    def _warm_up_subsystems(self):
+        """Précharge en arrière-plan ce que la dernière étape utilisera (sans toucher aux widgets Tk)"""
+        start = time.perf_counter()
+        try:
+            self.analysis_cache
+            from template_catalog import log_coverage_issues
+            log_coverage_issues()  # Mappages pointant vers des champs absents des modèles
+            from dossier_dependencies import get_dependency_index
+            import fitz  # noqa: F401  (PyMuPDF : empreintes calculées par DossierState.plan)
+            import pdf_filler  # noqa: F401
+            index = get_dependency_index()
+            for template_path in sorted(Config.CERFA_TEMPLATES_DIR.glob("cerfa_*.pdf")):
+                index.get(template_path.stem[len("cerfa_"):])
+            self._get_generation_engine().warm_up()
+        except Exception as e:
+            # Le préchargement est facultatif : la génération refera ces étapes si besoin
+            logger.warning(f"Préchargement interrompu : {e}")
+            return
+        logger.info(f"Sous-systèmes préchargés en {(time.perf_counter() - start) * 1000:.0f} ms")
         
     def _create_interface(self):
         """Crée l'interface principale"""
@@ -584,6 +654,9 @@ class ProgressiveFormWizard:
         
         ttk.Button(action_frame, text="📥 Générer tous les PDF", 
                   command=self._generate_all_pdfs, style='Primary.TButton').pack(side=tk.LEFT, padx=5)
+        self.merge_pdfs_var = tk.BooleanVar(value=False)
+        tk.Checkbutton(action_frame, text="Un seul PDF (dossier fusionné)", variable=self.merge_pdfs_var,
+                       bg='#f8f9fa').pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="💾 Sauvegarder le projet", 
                   command=self._save_final_project).pack(side=tk.LEFT, padx=5)
         ttk.Button(action_frame, text="📊 Rapport d'analyse", 
@@ -777,15 +850,36 @@ class ProgressiveFormWizard:
         return min(100, int(essential_rate + optional_rate))
     
     def _get_full_analysis(self) -> Dict[str, Any]:
-        """Obtient l'analyse complète du projet"""
+        """Obtient l'analyse complète du projet (figée et partagée par le cache d'analyses)"""
         try:
-            # Convertir les données pour l'analyse
-            analysis_data = self._prepare_data_for_analysis()
-            # Obtenir l'analyse intelligente
-            return self.architect_logic.analyser_projet(analysis_data)
+            # Seuls les champs lus par les règles : l'analyse d'un projet inchangé est reprise du cache
+            analysis_data = self._prepare_rule_inputs()
+            return self.analysis_cache.analyse(analysis_data)
         except Exception as e:
             return {'error': str(e)}
     
+    def _prepare_rule_inputs(self) -> Dict[str, Any]:
+        """Comme _prepare_data_for_analysis, limité aux champs lus par les règles (RULE_FIELDS)"""
+        from architect_rules import RULE_FIELDS
+        sources = {
+            'client': getattr(self, 'client_vars', {}),
+            'projet': getattr(self, 'project_vars', {}),
+            'technique': getattr(self, 'technical_vars', {}),
+        }
+        prepared_data = {section: {} for section in sources}
+        for section, field in RULE_FIELDS:
+            var = sources[section].get(field)
+            if var is not None:
+                prepared_data[section][field] = var.get()
+        
+        # Type et destination depuis les variables globales
+        if hasattr(self, 'type_var'):
+            prepared_data['projet']['typeProjet'] = self.type_var.get()
+        if hasattr(self, 'destination_var'):
+            prepared_data['projet']['destination'] = self.destination_var.get()
+        
+        return prepared_data
+    
     def _prepare_data_for_analysis(self) -> Dict[str, Any]:
         """Prépare les données pour l'analyse"""
         # Conversion des variables Tkinter en valeurs Python
@@ -1023,20 +1117,29 @@ class ProgressiveFormWizard:
                 selected_docs = [doc_type for doc_type, var in self.doc_vars.items() if var.get()]
                 if selected_docs:
                     project_data = self._prepare_data_for_analysis()
+                    cerfa_ids = []
                     for doc_type in selected_docs:
                         # Extraire l'ID du CERFA à partir du type de document (ex: "cerfa_13406-15")
                         match = re.search(r'(\d{5}-\d{2})', doc_type)
                         if not match:
                             print(f"Impossible d'extraire l'ID du CERFA pour: {doc_type}")
                             continue
-                        
-                        cerfa_id = match.group(1)
-                        output_filename = f"cerfa_{cerfa_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
-                        output_path = Config.FILLED_PDFS_DIR / output_filename
-                        
-                        fill_pdf(cerfa_id, project_data, str(output_path))
+                        cerfa_ids.append(match.group(1))
                     
-                    messagebox.showinfo("Génération", f"{len(selected_docs)} documents générés avec succès dans le dossier 'filled_pdfs'.")
+                    # Génération dans le pool de processus : l'interface reste réactive
+                    engine = self._get_generation_engine()
+                    if getattr(self, 'merge_pdfs_var', None) is not None and self.merge_pdfs_var.get():
+                        client_name = sanitize_filename(project_data.get('client', {}).get('nom', '') or 'projet')
+                        output_path = Config.FILLED_PDFS_DIR / f"dossier_{client_name}_{datetime.now().strftime('%Y%m%d')}.pdf"
+                        futures = [engine.submit_merged_dossier(cerfa_ids, project_data, output_path)]
+                        self._poll_generation(futures, [])
+                    else:
+                        # Seuls les CERFA dont les entrées ont changé depuis la dernière génération sont refaits
+                        from dossier_dependencies import DossierState
+                        state = DossierState(Config.FILLED_PDFS_DIR)
+                        plan = state.plan(cerfa_ids, project_data)
+                        futures = engine.submit_dossier(plan.to_generate, project_data, Config.FILLED_PDFS_DIR)
+                        self._poll_generation(futures, plan.unchanged_results(), (state, plan))
                 else:
                     messagebox.showwarning("Sélection", "Aucun document sélectionné")
             else:
@@ -1044,6 +1147,40 @@ class ProgressiveFormWizard:
         except Exception as e:
             messagebox.showerror("Erreur", f"Erreur de génération: {e}")
     
+    def _poll_generation(self, pending, results, dossier_state=None):
+        """Récupère les PDF générés au fil de l'eau sans bloquer la boucle Tkinter"""
+        still_pending = []
+        for future in pending:
+            if future.done():
+                _, result = self.generation_engine.collect(future)
+                if isinstance(result, list):  # Dossier fusionné : un résultat par CERFA
+                    results.extend(result)
+                else:
+                    results.append(result)
+            else:
+                still_pending.append(future)
+        
+        if still_pending:
+            self.master.after(100, self._poll_generation, still_pending, results, dossier_state)
+            return
+        
+        if dossier_state:
+            state, plan = dossier_state
+            state.record(results, plan)
+        
+        generated = [r for r in results if r.success]
+        failed = [r for r in results if not r.success]
+        message = f"{len(generated)} documents générés avec succès dans le dossier 'filled_pdfs'."
+        unchanged = sum(1 for r in generated if r.unchanged)
+        reused = sum(1 for r in generated if r.from_cache)
+        if unchanged:
+            message += f"\n({unchanged} inchangés depuis la dernière génération, fichiers conservés)"
+        if reused:
+            message += f"\n({reused} repris du cache sans nouveau remplissage)"
+        if failed:
+            message += "\n\nÉchecs :\n" + "\n".join(f"• CERFA {r.cerfa_id} : {r.error}" for r in failed)
+        messagebox.showinfo("Génération", message)
+    
     def _save_final_project(self):
         """Sauvegarde finale du projet complet"""
         self._save_project()
@@ -1165,6 +1302,7 @@ class ProgressiveFormWizard:
 
 def main():
     """Fonction principale pour lancer l'interface intelligente"""
+    Config.setup_logging()
     root = tk.Tk()
     app = ProgressiveFormWizard(root)
     
@@ -1172,9 +1310,12 @@ def main():
     def on_closing():
         if messagebox.askokcancel("Quitter", "Voulez-vous sauvegarder avant de quitter?"):
             app._save_project()
+        if app.generation_engine is not None:
+            app.generation_engine.shutdown(wait=False)
         root.destroy()
     
     root.protocol("WM_DELETE_WINDOW", on_closing)
+    root.after_idle(app.on_first_frame)  # Après le premier rendu de la fenêtre
     root.mainloop()
 
 if __name__ == "__main__":
@@ -0,0 +1,191 @@
+"""
+Cache adressé par contenu des PDF remplis
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.output_cache')
+
+CACHE_FORMAT_VERSION = 1
+
+
+def make_output_key(template_sha256: str, final_data: Mapping[str, Any],
+                    save_options: Mapping[str, Any], appearance_mode: str) -> str:
+    """
+    Clé d'un PDF rempli : empreinte du modèle, valeurs des champs et options de rendu.
+
+    Le dictionnaire champ -> valeur est sérialisé de façon canonique (clés triées),
+    l'ordre d'insertion n'a donc pas d'incidence sur la clé.
+    """
+    import fitz
+    payload = json.dumps(
+        [CACHE_FORMAT_VERSION, fitz.VersionBind, template_sha256, final_data, save_options, appearance_mode],
+        sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class OutputCache:
+    """
+    Cache disque borné des PDF remplis, évincé du moins récemment utilisé.
+
+    Les fichiers sont écrits de façon atomique ; le répertoire peut donc être partagé
+    par les workers du moteur de génération (chacun garde sa propre vue de l'index,
+    resynchronisée avant toute éviction).
+    """
+
+    def __init__(self, cache_dir: Optional[Path] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir) if cache_dir else Config.OUTPUT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.OUTPUT_CACHE_MAX_BYTES
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # clé -> taille, du plus ancien au plus récent
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.evictions = 0
+        self._scan()
+
+    def entry_path(self, key: str) -> Path:
+        """Chemin du fichier en cache pour une clé."""
+        return self.cache_dir / key[:2] / f"{key}.pdf"
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """Contenu du PDF en cache, ou None."""
+        path = self.entry_path(key)
+        try:
+            data = path.read_bytes()
+        except OSError:
+            self._miss(key)
+            return None
+        self._touch(key, path, len(data))
+        return data
+
+    def get_path(self, key: str) -> Optional[Path]:
+        """Fichier du PDF en cache (à copier, jamais à modifier sur place), ou None."""
+        path = self.entry_path(key)
+        try:
+            size = path.stat().st_size
+        except OSError:
+            self._miss(key)
+            return None
+        self._touch(key, path, size)
+        return path
+
+    def put(self, key: str, pdf_bytes: bytes):
+        """Enregistre un PDF rempli, puis applique la borne de taille."""
+        if len(pdf_bytes) > self.max_bytes:
+            return
+        path = self.entry_path(key)
+        tmp_path = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path.write_bytes(pdf_bytes)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            # Le cache est facultatif : un disque plein ne doit pas faire échouer la génération
+            logger.warning(f"PDF non mis en cache : {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        with self._lock:
+            self._current_bytes += len(pdf_bytes) - self._entries.pop(key, 0)
+            self._entries[key] = len(pdf_bytes)
+            self.stores += 1
+            over_budget = self._current_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            shutil.rmtree(self.cache_dir, ignore_errors=True)
+            self._entries.clear()
+            self._current_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Compteurs du cache, dont le taux de succès.
+
+        Les compteurs sont ceux du processus : pour les remplissages faits par les workers
+        du moteur de génération, voir FillMetrics.cache_stats (résultats collectés).
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'stores': self.stores,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _miss(self, key: str):
+        """Compte un échec et oublie l'entrée si elle a disparu (évincée par un autre processus)."""
+        with self._lock:
+            self.misses += 1
+            if key in self._entries:
+                self._current_bytes -= self._entries.pop(key)
+
+    def _touch(self, key: str, path: Path, size: int):
+        """Compte un succès et marque l'entrée comme récemment utilisée."""
+        try:
+            os.utime(path)  # La date de modification sert d'ordre LRU entre processus
+        except OSError:
+            pass
+        with self._lock:
+            self.hits += 1
+            self._current_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+
+    def _scan(self):
+        """Reconstruit l'index à partir du répertoire (ordre LRU : date de modification)."""
+        files = []
+        if self.cache_dir.is_dir():
+            for path in self.cache_dir.glob("*/*.pdf"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                files.append((stat.st_mtime_ns, path.stem, stat.st_size))
+        with self._lock:
+            # Dates égales (granularité du système de fichiers) : l'ordre connu du processus départage
+            order = {key: position for position, key in enumerate(self._entries)}
+            files.sort(key=lambda entry: (entry[0], order.get(entry[1], -1)))
+            self._entries = OrderedDict((key, size) for _, key, size in files)
+            self._current_bytes = sum(size for _, _, size in files)
+
+    def _evict(self):
+        """Supprime les entrées les plus anciennes jusqu'à repasser sous la borne."""
+        self._scan()  # D'autres processus ont pu ajouter ou utiliser des entrées
+        with self._lock:
+            while self._current_bytes > self.max_bytes and self._entries:
+                key, size = self._entries.popitem(last=False)
+                self._current_bytes -= size
+                self.entry_path(key).unlink(missing_ok=True)
+                self.evictions += 1
+        logger.debug(f"Cache de sortie réduit à {self._current_bytes} octets")
+
+
+_output_cache: Optional[OutputCache] = None
+
+
+def get_output_cache() -> OutputCache:
+    """Retourne le cache de sortie partagé par le processus."""
+    global _output_cache
+    if _output_cache is None:
+        _output_cache = OutputCache()
+    return _output_cache
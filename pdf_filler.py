@@ -1,24 +1,38 @@
-import fitz  # PyMuPDF
-import json
+import io
+import shutil
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
 from pathlib import Path
-from cerfa_field_mappings import CERFA_FIELD_MAPPINGS
+from typing import Any, Dict, List, Optional, Union
+from architect_business_logic import CERFA_DATABASE
+from architect_profiles import get_architect_fields
+from cerfa_field_mappings import ARCHITECT_INTERNAL_MAP  # Réexporté pour les appelants existants
 from config import Config
+from fill_metrics import get_fill_metrics, recording
+from fill_plans import get_fill_plan
+from output_cache import get_output_cache, make_output_key
+from pdf_storage import delta_path, encode_delta, get_pdf_base_store, incremental_update, read_header
+from template_cache import get_template_cache
+from widget_index import get_widget_index_store
 
-# Dictionnaire de correspondance pour les infos de l'architecte
-ARCHITECT_INTERNAL_MAP = {
-    "architecte.nom": "H1N_nom",
-    "architecte.prenom": "H1P_prenom",
-    "architecte.email": "H1AE1_email",
-    "architecte.telephone": "H1T_telephone",
-    "societe.raison_sociale": "H2R_raison",
-    "societe.siret": "H2S_siret",
-    "societe.adresse.numero": "H1Q_numero",
-    "societe.adresse.voie": "H1V_voie",
-    "societe.adresse.code_postal": "H1C_code",
-    "societe.adresse.ville": "H1L_localite",
-    "ordre_architectes.numero_national": "H1K_ordre",
-    "ordre_architectes.conseil_regional": "H1R_conseil",
-}
+@dataclass
+class FormFillResult:
+    """Résultat du remplissage d'un formulaire CERFA."""
+    cerfa_id: str
+    output_path: Optional[str] = None
+    fields_filled: List[str] = field(default_factory=list)
+    fields_missing: List[str] = field(default_factory=list)  # Champs avec valeur mais absents du modèle
+    timings: Dict[str, float] = field(default_factory=dict)  # Durées par étape, en secondes
+    error: Optional[str] = None
+    from_cache: bool = False  # PDF repris du cache de sortie, sans nouveau remplissage
+    unchanged: bool = False   # Entrées inchangées depuis la dernière génération : fichier existant conservé
+    widgets_total: int = 0    # Widgets du modèle
+    output_size: int = 0      # Taille du PDF produit, en octets (0 pour un dossier fusionné)
+
+    @property
+    def success(self) -> bool:
+        return self.error is None
 
 def get_nested_value(data_dict, key_path):
     """Récupère une valeur dans un dictionnaire imbriqué via un chemin (ex: 'societe.adresse.ville')."""
@@ -31,7 +45,337 @@ def get_nested_value(data_dict, key_path):
             return None
     return value
 
-def fill_pdf(cerfa_id: str, project_data_dict: dict, output_pdf_path: str):
+def get_save_options(save_profile: Optional[str] = None) -> Dict[str, Any]:
+    """Options de sauvegarde PyMuPDF d'un profil de Config.PDF_SAVE_PROFILES (profil par défaut si None)."""
+    save_profile = save_profile or Config.PDF_DEFAULT_SAVE_PROFILE
+    try:
+        return Config.PDF_SAVE_PROFILES[save_profile]
+    except KeyError:
+        raise ValueError(f"Profil de sauvegarde inconnu : {save_profile} "
+                         f"(disponibles : {', '.join(Config.PDF_SAVE_PROFILES)})") from None
+
+def build_form_data(cerfa_id: str, architect_fields: Dict[str, Any], project_data_dict: dict) -> Dict[str, Any]:
+    """
+    Construit le dictionnaire champ PDF -> valeur d'un CERFA.
+
+    Les infos de l'architecte servent de base, les données du projet sont appliquées
+    par-dessus via le plan compilé du CERFA.
+    """
+    final_data = dict(architect_fields)
+
+    plan = get_fill_plan(cerfa_id)
+    if not plan:
+        print(f"Avertissement : Aucun mappage trouvé pour le CERFA {cerfa_id}. Seules les infos de l'architecte seront utilisées.")
+        return final_data
+
+    return plan.apply(project_data_dict, final_data)
+
+def get_appearance_mode(appearance_mode: Optional[str] = None) -> str:
+    """Valide un mode de Config.PDF_APPEARANCE_MODES (mode par défaut si None)."""
+    appearance_mode = appearance_mode or Config.PDF_DEFAULT_APPEARANCE_MODE
+    if appearance_mode not in Config.PDF_APPEARANCE_MODES:
+        raise ValueError(f"Mode d'apparence inconnu : {appearance_mode} "
+                         f"(disponibles : {', '.join(Config.PDF_APPEARANCE_MODES)})")
+    return appearance_mode
+
+def get_storage_mode(storage_mode: Optional[str] = None) -> str:
+    """Valide un mode de Config.PDF_STORAGE_MODES (mode par défaut si None)."""
+    storage_mode = storage_mode or Config.PDF_DEFAULT_STORAGE_MODE
+    if storage_mode not in Config.PDF_STORAGE_MODES:
+        raise ValueError(f"Mode de stockage inconnu : {storage_mode} "
+                         f"(disponibles : {', '.join(Config.PDF_STORAGE_MODES)})")
+    return storage_mode
+
+# Un delta conserve le modèle octet pour octet : le profil de sauvegarde n'intervient pas
+DELTA_SAVE_OPTIONS = {'incremental': True}
+
+def _fill_document(doc, widget_index, final_data: Dict[str, Any], result: FormFillResult,
+                   appearance_mode: Optional[str] = None):
+    """Remplit uniquement les widgets concernés, localisés via l'index."""
+    appearance_mode = get_appearance_mode(appearance_mode)
+    if appearance_mode == 'immediate':
+        _fill_immediate(doc, widget_index, final_data, result)
+    else:
+        _fill_batched(doc, widget_index, final_data, result,
+                      regenerate=appearance_mode == 'batched')
+        if appearance_mode == 'need_appearances':
+            doc.need_appearances(True)
+
+def _fill_immediate(doc, widget_index, final_data: Dict[str, Any], result: FormFillResult):
+    """Pose chaque valeur via l'API Widget, avec régénération de l'apparence champ par champ."""
+    pages = {}
+    for field_name, value in final_data.items():
+        if value is None:
+            continue
+        entries = widget_index.get(field_name)
+        if not entries:
+            result.fields_missing.append(field_name)
+            continue
+        for page_number, xref, field_type, on_state in entries:
+            try:
+                page = pages.get(page_number)
+                if page is None:
+                    page = pages[page_number] = doc[page_number]
+                widget = page.load_widget(xref)
+                if on_state is not None and value == "On":
+                    widget.field_value = on_state  # Case à cocher : valeur "cochée" propre au modèle
+                else:
+                    widget.field_value = str(value)
+                widget.update()
+                result.fields_filled.append(field_name)
+            except Exception as e:
+                print(f"Impossible de définir la valeur pour le champ {field_name}: {e}")
+
+def _fill_batched(doc, widget_index, final_data: Dict[str, Any], result: FormFillResult, regenerate: bool = True):
+    """
+    Pose toutes les valeurs directement dans les objets PDF, puis régénère les apparences
+    en une seule passe par page (pdf_update_page) si regenerate est vrai. Sinon les
+    apparences du modèle sont conservées telles quelles (mode 'need_appearances').
+
+    Les propriétés du widget (police, bordures, scripts) ne sont pas réécrites, seules
+    la valeur et l'état coché changent : c'est ce qui rend ce mode bien plus rapide
+    que widget.update() sur les grands formulaires.
+    """
+    import fitz
+    mupdf = fitz.mupdf
+    pdf = mupdf.pdf_document_from_fz_document(doc.this)
+    choice_types = (fitz.PDF_WIDGET_TYPE_COMBOBOX, fitz.PDF_WIDGET_TYPE_LISTBOX)
+
+    # Valeurs à poser, regroupées par page puis par xref de widget
+    by_page: Dict[int, Dict[int, tuple]] = {}
+    for field_name, value in final_data.items():
+        if value is None:
+            continue
+        entries = widget_index.get(field_name)
+        if not entries:
+            result.fields_missing.append(field_name)
+            continue
+        for page_number, xref, field_type, on_state in entries:
+            by_page.setdefault(page_number, {})[xref] = (field_name, value, field_type, on_state)
+
+    for page_number, wanted in by_page.items():
+        page = doc[page_number]
+        pdf_page = mupdf.pdf_page_from_fz_page(page.this)
+        widget = mupdf.pdf_first_widget(pdf_page)
+        while widget.m_internal:
+            obj = mupdf.pdf_annot_obj(widget)
+            item = wanted.get(mupdf.pdf_to_num(obj))
+            if item:
+                field_name, value, field_type, on_state = item
+                try:
+                    if on_state is not None:
+                        # Case à cocher / bouton radio : mêmes règles que Widget.update()
+                        if field_type == fitz.PDF_WIDGET_TYPE_RADIOBUTTON:
+                            checked = bool(str(value))
+                        else:
+                            checked = value == "On" or str(value) in (on_state, "Yes")
+                        state = on_state if checked else "Off"
+                        mupdf.pdf_set_field_value(pdf, obj, state, 1)
+                        mupdf.pdf_dict_put_name(obj, mupdf.PDF_ENUM_NAME_AS, state)
+                        if field_type == fitz.PDF_WIDGET_TYPE_CHECKBOX:
+                            mupdf.pdf_dict_put_name(obj, mupdf.PDF_ENUM_NAME_V, state)
+                    else:
+                        text = str(value)
+                        if text:
+                            mupdf.pdf_set_field_value(pdf, obj, text, 1)
+                            if field_type in choice_types:
+                                mupdf.pdf_dict_del(obj, mupdf.PDF_ENUM_NAME_I)
+                    if regenerate:
+                        mupdf.pdf_dirty_annot(widget)
+                    result.fields_filled.append(field_name)
+                except Exception as e:
+                    print(f"Impossible de définir la valeur pour le champ {field_name}: {e}")
+            widget = mupdf.pdf_next_widget(widget)
+        if regenerate:
+            mupdf.pdf_update_page(pdf_page)
+
+def _open_filled(cerfa_id: str, final_data: Dict[str, Any], result: FormFillResult,
+                 appearance_mode: Optional[str] = None):
+    """Ouvre le modèle (depuis le cache mémoire) et le remplit ; l'appelant ferme le document."""
+    import fitz  # PyMuPDF, importé à la première génération : son chargement est coûteux
+    start = time.perf_counter()
+    template = get_template_cache().get(cerfa_id)
+    result.timings['template'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc = fitz.open(stream=template.data, filetype="pdf")
+    result.timings['open'] = time.perf_counter() - start
+    try:
+        start = time.perf_counter()
+        widget_index = get_widget_index_store().get(cerfa_id, template.sha256, doc, template.source_sha256)
+        result.widgets_total = sum(len(entries) for entries in widget_index.values())
+        result.timings['index'] = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _fill_document(doc, widget_index, final_data, result, appearance_mode)
+        result.timings['fill'] = time.perf_counter() - start
+    except Exception:
+        doc.close()
+        raise
+    return doc
+
+def _count_fields(widget_index, final_data: Dict[str, Any], result: FormFillResult):
+    """Renseigne champs remplis / manquants comme l'aurait fait le remplissage."""
+    for field_name, value in final_data.items():
+        if value is None:
+            continue
+        entries = widget_index.get(field_name)
+        if entries:
+            result.fields_filled.extend([field_name] * len(entries))
+        else:
+            result.fields_missing.append(field_name)
+
+def _render_form(cerfa_id: str, final_data: Dict[str, Any], result: FormFillResult,
+                 save_profile: Optional[str] = None, appearance_mode: Optional[str] = None,
+                 storage_mode: Optional[str] = None, as_file: bool = False) -> Union[bytes, Path]:
+    """
+    Ouvre le modèle, le remplit et retourne le PDF en octets (le contenu du fichier
+    .pdfdelta en mode de stockage 'delta').
+
+    Si le même modèle a déjà été rempli avec exactement les mêmes valeurs et options,
+    le PDF est repris du cache de sortie : avec as_file, l'appelant qui n'a besoin que
+    d'un fichier reçoit le chemin de l'entrée en cache, à copier, sans la lire en mémoire.
+    """
+    delta = get_storage_mode(storage_mode) == 'delta'
+    save_options = DELTA_SAVE_OPTIONS if delta else get_save_options(save_profile)
+    appearance_mode = get_appearance_mode(appearance_mode)
+
+    cache_key = None
+    if Config.USE_OUTPUT_CACHE:
+        start = time.perf_counter()
+        template = get_template_cache().get(cerfa_id)
+        cache_key = make_output_key(template.sha256, final_data, save_options, appearance_mode)
+        cache = get_output_cache()
+        cached = cache.get_path(cache_key) if as_file else cache.get_bytes(cache_key)
+        if cached is not None:
+            widget_index = get_widget_index_store().get(cerfa_id, template.sha256)
+            _count_fields(widget_index, final_data, result)
+            result.widgets_total = sum(len(entries) for entries in widget_index.values())
+            result.from_cache = True
+            result.output_size = cached.stat().st_size if as_file else len(cached)
+            result.timings['cache'] = time.perf_counter() - start
+            return cached
+        result.timings['cache'] = time.perf_counter() - start
+
+    doc = _open_filled(cerfa_id, final_data, result, appearance_mode)
+    try:
+        start = time.perf_counter()
+        if delta:
+            template = get_template_cache().get(cerfa_id)
+            pdf_bytes = encode_delta(template.sha256, len(template.data), incremental_update(doc, template.data))
+        else:
+            pdf_bytes = doc.tobytes(**save_options)
+        result.timings['save'] = time.perf_counter() - start
+    finally:
+        doc.close()
+    result.output_size = len(pdf_bytes)
+
+    if cache_key:
+        get_output_cache().put(cache_key, pdf_bytes)
+    return pdf_bytes
+
+def _ensure_delta_base(cerfa_id: str, delta: Union[bytes, Path]):
+    """Enregistre le modèle de base d'un .pdfdelta (contenu ou fichier), nécessaire pour le reconstituer."""
+    template = get_template_cache().get(cerfa_id)
+    if isinstance(delta, Path):
+        with open(delta, 'rb') as f:
+            header = read_header(f)
+    else:
+        header = read_header(io.BytesIO(delta))
+    if header.base_sha256 != template.sha256:
+        raise ValueError(f"Le modèle du CERFA {cerfa_id} a changé pendant le remplissage")
+    get_pdf_base_store().ensure(template.sha256, template.data)
+
+def _write_output(cerfa_id: str, pdf: Union[bytes, Path], output_pdf_path, result: FormFillResult,
+                  storage_mode: Optional[str] = None):
+    """
+    Écrit le PDF rempli (octets, ou fichier du cache de sortie recopié tel quel) ;
+    en mode 'delta', écrit le .pdfdelta après s'être assuré de son modèle de base.
+    """
+    start = time.perf_counter()
+    if get_storage_mode(storage_mode) == 'delta':
+        _ensure_delta_base(cerfa_id, pdf)
+        output_pdf_path = delta_path(output_pdf_path)
+    if isinstance(pdf, Path):
+        shutil.copyfile(pdf, output_pdf_path)
+    else:
+        Path(output_pdf_path).write_bytes(pdf)
+    result.timings['write'] = time.perf_counter() - start
+    result.output_path = str(output_pdf_path)
+
+def _fill_form(cerfa_id: str, final_data: Dict[str, Any], output_pdf_path, result: FormFillResult,
+               save_profile: Optional[str] = None, appearance_mode: Optional[str] = None,
+               storage_mode: Optional[str] = None) -> FormFillResult:
+    """Remplit le CERFA en mémoire puis écrit le fichier de sortie."""
+    pdf = _render_form(cerfa_id, final_data, result, save_profile, appearance_mode, storage_mode, as_file=True)
+    _write_output(cerfa_id, pdf, output_pdf_path, result, storage_mode)
+    return result
+
+def _form_data(cerfa_id: str, project_data_dict: dict, result: FormFillResult,
+               architect_profile: Optional[str] = None) -> Dict[str, Any]:
+    """Prépare les données (architecte + projet) du CERFA : champ PDF -> valeur."""
+    start = time.perf_counter()
+    architect_fields = get_architect_fields(architect_profile)
+    result.timings['profile'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    final_data = build_form_data(cerfa_id, architect_fields, project_data_dict)
+    result.timings['mapping'] = time.perf_counter() - start
+    return final_data
+
+def _fill_to_bytes(cerfa_id: str, project_data_dict: dict, result: FormFillResult,
+                   architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+                   appearance_mode: Optional[str] = None, storage_mode: Optional[str] = None) -> bytes:
+    """
+    Remplit le CERFA en mémoire pour un appelant qui ne passe pas par _write_output :
+    en mode 'delta', le modèle de base est donc enregistré ici.
+    """
+    final_data = _form_data(cerfa_id, project_data_dict, result, architect_profile)
+    pdf_bytes = _render_form(cerfa_id, final_data, result, save_profile, appearance_mode, storage_mode)
+    if get_storage_mode(storage_mode) == 'delta':
+        _ensure_delta_base(cerfa_id, pdf_bytes)
+    return pdf_bytes
+
+def fill_pdf_to_bytes(cerfa_id: str, project_data_dict: dict, architect_profile: Optional[str] = None,
+                      save_profile: Optional[str] = None, appearance_mode: Optional[str] = None,
+                      storage_mode: Optional[str] = None) -> bytes:
+    """
+    Remplit un formulaire PDF et le retourne en octets, sans passer par le disque
+    (contenu d'un fichier .pdfdelta en mode de stockage 'delta', voir fill_pdf).
+
+    Contrairement à fill_pdf, les erreurs sont levées (FileNotFoundError si le modèle
+    ou le profil architecte est introuvable, ValueError si le profil est inconnu...).
+    """
+    with recording(FormFillResult(cerfa_id)) as result:
+        return _fill_to_bytes(cerfa_id, project_data_dict, result, architect_profile, save_profile, appearance_mode,
+                              storage_mode)
+
+def fill_pdf_to_stream(cerfa_id: str, project_data_dict: dict, stream, architect_profile: Optional[str] = None,
+                       save_profile: Optional[str] = None, appearance_mode: Optional[str] = None,
+                       storage_mode: Optional[str] = None) -> FormFillResult:
+    """
+    Remplit un formulaire PDF et l'écrit dans un flux binaire fourni par l'appelant
+    (contenu d'un fichier .pdfdelta en mode de stockage 'delta', voir fill_pdf).
+
+    Args:
+        stream: Objet binaire disposant d'une méthode write() (BytesIO, fichier, archive zip...).
+
+    Returns:
+        FormFillResult: Champs remplis, champs manquants et durées (output_path reste à None).
+        Les erreurs sont levées, comme pour fill_pdf_to_bytes.
+    """
+    with recording(FormFillResult(cerfa_id)) as result:
+        pdf_bytes = _fill_to_bytes(cerfa_id, project_data_dict, result, architect_profile, save_profile,
+                                   appearance_mode, storage_mode)
+
+        start = time.perf_counter()
+        stream.write(pdf_bytes)
+        result.timings['write'] = time.perf_counter() - start
+    return result
+
+def fill_pdf(cerfa_id: str, project_data_dict: dict, output_pdf_path: str,
+             architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+             appearance_mode: Optional[str] = None, storage_mode: Optional[str] = None) -> FormFillResult:
     """
     Remplit un formulaire PDF en fusionnant les données de l'architecte et celles du projet.
 
@@ -39,82 +383,192 @@ def fill_pdf(cerfa_id: str, project_data_dict: dict, output_pdf_path: str):
         cerfa_id (str): L'identifiant du CERFA (ex: '13406-15').
         project_data_dict (dict): Dictionnaire des données du projet (client, projet, technique).
         output_pdf_path (str): Chemin absolu où le PDF rempli doit être sauvegardé.
+        architect_profile (str, optional): Profil architecte signataire (profil par défaut si None).
+        save_profile (str, optional): Profil de sauvegarde 'fast', 'compact' ou 'archival'
+            (Config.PDF_DEFAULT_SAVE_PROFILE si None).
+        appearance_mode (str, optional): Génération des apparences 'immediate', 'batched' ou
+            'need_appearances' (Config.PDF_DEFAULT_APPEARANCE_MODE si None).
+        storage_mode (str, optional): 'full' (PDF complet) ou 'delta' (fichier .pdfdelta à la
+            place de output_pdf_path, voir pdf_storage.py) ; Config.PDF_DEFAULT_STORAGE_MODE si None.
+
+    Returns:
+        FormFillResult: Champs remplis, champs manquants, durées et chemin de sortie.
     """
-    
-    template_pdf_path = Config.CERFA_TEMPLATES_DIR / f"cerfa_{cerfa_id}.pdf"
-    architect_info_path = Config.ARCHITECT_INFO_PATH
+    result = FormFillResult(cerfa_id)
 
     try:
-        # 1. Charger les données de l'architecte
-        with open(architect_info_path, 'r', encoding='utf-8') as f:
-            architect_data = json.load(f)
-
-        # 2. Préparer les données en pré-remplissant avec les infos de l'architecte
-        final_data = {}
-        for generic_key, cerfa_field in ARCHITECT_INTERNAL_MAP.items():
-            value = get_nested_value(architect_data, generic_key)
-            if value:
-                final_data[cerfa_field] = value
-
-        # 3. Appliquer les données du projet par-dessus, en utilisant le mappage spécifique au CERFA
-        cerfa_mapping = CERFA_FIELD_MAPPINGS.get(cerfa_id)
-        if not cerfa_mapping:
-            print(f"Avertissement : Aucun mappage trouvé pour le CERFA {cerfa_id}. Seules les infos de l'architecte seront utilisées.")
-        else:
-            for generic_key, cerfa_field in cerfa_mapping.items():
-                if not cerfa_field:
-                    continue
-
-                value = get_nested_value(project_data_dict, generic_key)
-                if value is None or value == "":
-                    continue
-
-                # --- GESTION DES CAS SPÉCIFIQUES ---
-                # Si le mapping est un dictionnaire, on traite un groupe de cases à cocher/options
-                if isinstance(cerfa_field, dict):
-                    if value in cerfa_field and cerfa_field[value]:
-                        final_data[cerfa_field[value]] = "On"  # Valeur standard pour cocher
-                
-                # Si le champ est une date à décomposer (logique simplifiée)
-                elif "date" in generic_key.lower() and isinstance(value, str) and '-' in value:
-                    try:
-                        parts = value.split('-')
-                        if len(parts) == 3 and cerfa_mapping.get(f"{generic_key}.jour"):
-                            final_data[cerfa_mapping[f"{generic_key}.jour"]] = parts[2]
-                            final_data[cerfa_mapping[f"{generic_key}.mois"]] = parts[1]
-                            final_data[cerfa_mapping[f"{generic_key}.annee"]] = parts[0]
-                        else:
-                            final_data[cerfa_field] = value # Fallback si pas de mapping jour/mois/année
-                    except Exception:
-                        final_data[cerfa_field] = value
-                
-                # Cas général pour les champs texte simples
-                else:
-                    final_data[cerfa_field] = value
-        
-        # 4. Ouvrir le modèle PDF
-        doc = fitz.open(template_pdf_path)
-
-        # 5. Remplir les champs
-        filled_count = 0
-        for page in doc:
-            for field in page.widgets():
-                field_name = field.field_name
-                if field_name in final_data and final_data[field_name] is not None:
-                    try:
-                        field.field_value = str(final_data[field_name])
-                        field.update()
-                        filled_count += 1
-                    except Exception as e:
-                        print(f"Impossible de définir la valeur pour le champ {field_name}: {e}")
-        
-        print(f"{filled_count} champs ont été remplis pour le CERFA {cerfa_id}.")
-
-        # 6. Sauvegarder le PDF rempli
-        doc.save(output_pdf_path, garbage=4, deflate=True, clean=True)
-        print(f"Succès ! Fichier de sortie créé : {output_pdf_path}")
+        # 1. Fusionner les infos de l'architecte et les données du projet
+        final_data = _form_data(cerfa_id, project_data_dict, result, architect_profile)
+
+        # 2. Remplir le modèle en mémoire puis sauvegarder le PDF rempli
+        #    (le fichier n'est créé qu'une fois le remplissage réussi)
+        _fill_form(cerfa_id, final_data, output_pdf_path, result, save_profile, appearance_mode, storage_mode)
+
+        print(f"{len(result.fields_filled)} champs ont été remplis pour le CERFA {cerfa_id}.")
+        print(f"Succès ! Fichier de sortie créé : {result.output_path}")
 
     except FileNotFoundError as e:
+        result.error = f"Fichier introuvable : {e.filename}"
         print(f"Erreur : Fichier introuvable. Vérifiez les chemins : {e.filename}")
     except Exception as e:
+        result.error = str(e)
         print(f"Une erreur inattendue est survenue : {e}")
+
+    get_fill_metrics().record(result)
+    return result
+
+def fill_cerfa_form(cerfa_id: str, architect_fields: Dict[str, Any], project_data: dict,
+                    output_pdf_path, save_profile: Optional[str] = None,
+                    appearance_mode: Optional[str] = None, storage_mode: Optional[str] = None) -> FormFillResult:
+    """
+    Remplit un CERFA à partir des infos de l'architecte déjà chargées.
+
+    Les erreurs ne sont pas levées : elles sont reportées dans le résultat.
+    """
+    result = FormFillResult(cerfa_id)
+    try:
+        start = time.perf_counter()
+        final_data = build_form_data(cerfa_id, architect_fields, project_data)
+        result.timings['mapping'] = time.perf_counter() - start
+
+        _fill_form(cerfa_id, final_data, output_pdf_path, result, save_profile, appearance_mode, storage_mode)
+    except FileNotFoundError as e:
+        result.error = f"Fichier introuvable : {e.filename}"
+    except Exception as e:
+        result.error = str(e)
+    get_fill_metrics().record(result)
+    return result
+
+def dossier_output_path(output_dir, cerfa_id: str, storage_mode: Optional[str] = None) -> Path:
+    """Fichier du jour d'un CERFA dans un dossier : cerfa_<id>_<AAAAMMJJ>.pdf (ou .pdfdelta)."""
+    output_pdf_path = Path(output_dir) / f"cerfa_{cerfa_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+    return delta_path(output_pdf_path) if get_storage_mode(storage_mode) == 'delta' else output_pdf_path
+
+def fill_dossier(cerfa_ids: List[str], project_data: dict, output_dir,
+                 architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+                 appearance_mode: Optional[str] = None, storage_mode: Optional[str] = None) -> List[FormFillResult]:
+    """
+    Génère en une passe tous les CERFA d'un dossier.
+
+    Les infos de l'architecte sont chargées une seule fois pour l'ensemble des
+    formulaires, chacun étant rempli via son plan compilé. Une erreur sur un
+    formulaire n'interrompt pas les suivants : elle est reportée dans son résultat.
+
+    Args:
+        cerfa_ids (list): Identifiants des CERFA à générer (ex: ['13406-15', '13407-10']).
+        project_data (dict): Dictionnaire des données du projet (client, projet, technique).
+        output_dir: Répertoire où les PDF remplis sont sauvegardés.
+        architect_profile (str, optional): Profil architecte signataire (profil par défaut si None).
+        save_profile (str, optional): Profil de sauvegarde (voir fill_pdf).
+        appearance_mode (str, optional): Génération des apparences (voir fill_pdf).
+        storage_mode (str, optional): PDF complets ou fichiers .pdfdelta (voir fill_pdf).
+
+    Returns:
+        list[FormFillResult]: Un résultat par CERFA, dans l'ordre demandé.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    start = time.perf_counter()
+    try:
+        architect_fields = get_architect_fields(architect_profile)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : Impossible de charger les informations de l'architecte : {e}")
+        return [FormFillResult(cerfa_id, error=str(e)) for cerfa_id in cerfa_ids]
+    shared_time = time.perf_counter() - start
+
+    results = []
+    for cerfa_id in cerfa_ids:
+        output_pdf_path = dossier_output_path(output_dir, cerfa_id)  # .pdfdelta ajouté par _write_output
+        result = fill_cerfa_form(cerfa_id, architect_fields, project_data, output_pdf_path, save_profile,
+                                 appearance_mode, storage_mode)
+        result.timings['shared'] = shared_time
+        results.append(result)
+
+    succeeded = sum(1 for result in results if result.success)
+    print(f"Dossier généré : {succeeded}/{len(results)} CERFA remplis dans {output_dir}")
+    return results
+
+def fill_dossier_merged(cerfa_ids: List[str], project_data: dict, output_pdf_path,
+                        architect_profile: Optional[str] = None, save_profile: Optional[str] = None,
+                        appearance_mode: Optional[str] = None) -> List[FormFillResult]:
+    """
+    Génère tous les CERFA d'un dossier dans un seul PDF, avec un signet par formulaire.
+
+    Les formulaires remplis sont assemblés en mémoire puis le dossier est sauvegardé
+    une seule fois, avec au moins garbage=3 : les polices et images communes aux
+    différents CERFA ne sont conservées qu'en un exemplaire. Les champs homonymes
+    d'un formulaire à l'autre sont renommés par PyMuPDF pour rester indépendants.
+    Un formulaire en erreur est exclu du dossier et reporté dans son résultat.
+
+    Args:
+        cerfa_ids (list): Identifiants des CERFA, dans l'ordre du dossier.
+        project_data (dict): Dictionnaire des données du projet (client, projet, technique).
+        output_pdf_path: Chemin du PDF fusionné.
+        architect_profile, save_profile, appearance_mode: Voir fill_pdf.
+
+    Returns:
+        list[FormFillResult]: Un résultat par CERFA ; output_path désigne le PDF fusionné.
+    """
+    output_pdf_path = Path(output_pdf_path)
+    try:
+        save_options = dict(get_save_options(save_profile))
+        appearance_mode = get_appearance_mode(appearance_mode)
+        architect_fields = get_architect_fields(architect_profile)
+    except (OSError, ValueError) as e:
+        print(f"Erreur : Impossible de préparer le dossier : {e}")
+        return [FormFillResult(cerfa_id, error=str(e)) for cerfa_id in cerfa_ids]
+    save_options['garbage'] = max(save_options.get('garbage', 0), 3)  # Dédoublonnage des objets communs
+
+    import fitz
+    results = []
+    merged = fitz.open()
+    toc = []
+    try:
+        for cerfa_id in cerfa_ids:
+            result = FormFillResult(cerfa_id)
+            results.append(result)
+            try:
+                start = time.perf_counter()
+                final_data = build_form_data(cerfa_id, architect_fields, project_data)
+                result.timings['mapping'] = time.perf_counter() - start
+
+                doc = _open_filled(cerfa_id, final_data, result, appearance_mode)
+                try:
+                    start = time.perf_counter()
+                    first_page = merged.page_count + 1
+                    merged.insert_pdf(doc)
+                    result.timings['merge'] = time.perf_counter() - start
+                finally:
+                    doc.close()
+                title = CERFA_DATABASE.get(cerfa_id, {}).get('nom')
+                toc.append([1, f"CERFA {cerfa_id} - {title}" if title else f"CERFA {cerfa_id}", first_page])
+            except FileNotFoundError as e:
+                result.error = f"Fichier introuvable : {e.filename}"
+            except Exception as e:
+                result.error = str(e)
+
+        if toc:
+            start = time.perf_counter()
+            merged.set_toc(toc)
+            pdf_bytes = merged.tobytes(**save_options)
+            output_pdf_path.parent.mkdir(parents=True, exist_ok=True)
+            output_pdf_path.write_bytes(pdf_bytes)
+            shared_time = time.perf_counter() - start
+            for result in results:
+                if result.success:
+                    result.output_path = str(output_pdf_path)
+                    result.timings['shared'] = shared_time
+    except Exception as e:
+        for result in results:
+            if result.success:
+                result.error = f"Échec de l'enregistrement du dossier : {e}"
+    finally:
+        merged.close()
+
+    metrics = get_fill_metrics()
+    for result in results:
+        metrics.record(result)
+    succeeded = sum(1 for result in results if result.success)
+    print(f"Dossier fusionné : {succeeded}/{len(results)} CERFA dans {output_pdf_path}")
+    return results
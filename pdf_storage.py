@@ -0,0 +1,216 @@
+"""
+Stockage des PDF remplis en deltas incrémentaux sur des modèles de base partagés
+
+Un PDF rempli est le modèle, octet pour octet, suivi d'une section de mise à jour
+incrémentale contenant les seuls objets modifiés (valeurs et apparences des widgets).
+Le modèle est stocké une fois par empreinte (Config.PDF_BASES_DIR/<sha256>.pdf) ;
+chaque PDF rempli ne coûte plus que son delta (quelques Ko au lieu de 1 à 2 Mo).
+Le PDF complet est reconstitué par simple concaténation, en flux.
+
+Format d'un fichier .pdfdelta : une ligne d'en-tête
+    %ARCHIBOT-DELTA <version> <sha256 du modèle> <taille du modèle>\\n
+suivie des octets de la mise à jour incrémentale.
+
+Usage :
+    python pdf_storage.py materialize dossier/cerfa_13406-15_20260115.pdfdelta [-o sortie.pdf]
+    python pdf_storage.py stats filled_pdfs/bulk
+"""
+
+import argparse
+import hashlib
+import logging
+import os
+import sys
+from pathlib import Path
+from typing import BinaryIO, Iterator, NamedTuple, Optional, Union
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.pdf_storage')
+
+DELTA_SUFFIX = '.pdfdelta'
+DELTA_MAGIC = b'%ARCHIBOT-DELTA'
+DELTA_FORMAT_VERSION = 1
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+class DeltaHeader(NamedTuple):
+    """En-tête d'un fichier .pdfdelta."""
+    base_sha256: str
+    base_size: int
+    offset: int       # Position des octets de la mise à jour dans le fichier
+
+
+def delta_path(output_pdf_path) -> Path:
+    """Chemin du fichier delta correspondant à un chemin de PDF."""
+    return Path(output_pdf_path).with_suffix(DELTA_SUFFIX)
+
+
+def incremental_update(doc, base: bytes) -> bytes:
+    """
+    Octets de la mise à jour incrémentale d'un document ouvert depuis `base`.
+
+    Lève ValueError si le document ne peut pas être sauvegardé de façon incrémentale
+    (fichier réparé à l'ouverture, par exemple) ou si la sortie ne commence pas par
+    les octets exacts du modèle.
+    """
+    import fitz
+    mupdf = fitz.mupdf
+    if not doc.can_save_incrementally():
+        raise ValueError("sauvegarde incrémentale impossible pour ce modèle")
+
+    # PyMuPDF n'accepte l'option incremental que vers le fichier d'origine : on passe
+    # par MuPDF pour écrire en mémoire (modèle recopié suivi de la mise à jour)
+    options = mupdf.PdfWriteOptions()
+    options.do_incremental = 1
+    buffer = mupdf.FzBuffer(len(base) + 64 * 1024)
+    output = mupdf.FzOutput(buffer)
+    mupdf.pdf_write_document(mupdf.pdf_document_from_fz_document(doc.this), output, options)
+    output.fz_close_output()
+    data = buffer.fz_buffer_extract()
+
+    if len(data) < len(base) or memoryview(data)[:len(base)] != base:
+        raise ValueError("la sortie incrémentale ne prolonge pas le modèle")
+    return data[len(base):]
+
+
+def encode_delta(base_sha256: str, base_size: int, update: bytes) -> bytes:
+    """Contenu d'un fichier .pdfdelta."""
+    header = f"{DELTA_MAGIC.decode('ascii')} {DELTA_FORMAT_VERSION} {base_sha256} {base_size}\n"
+    return header.encode('ascii') + update
+
+
+def read_header(stream: BinaryIO) -> DeltaHeader:
+    """Lit l'en-tête d'un fichier .pdfdelta ouvert en binaire."""
+    line = stream.readline(256)
+    parts = line.split()
+    if len(parts) != 4 or parts[0] != DELTA_MAGIC or int(parts[1]) != DELTA_FORMAT_VERSION:
+        raise ValueError("fichier delta invalide ou de version inconnue")
+    return DeltaHeader(parts[2].decode('ascii'), int(parts[3]), len(line))
+
+
+class PdfBaseStore:
+    """Modèles de base adressés par leur empreinte, partagés par tous les deltas."""
+
+    def __init__(self, bases_dir: Optional[Path] = None):
+        self.bases_dir = Path(bases_dir) if bases_dir else Config.PDF_BASES_DIR
+
+    def base_path(self, sha256: str) -> Path:
+        return self.bases_dir / f"{sha256}.pdf"
+
+    def ensure(self, sha256: str, data: bytes) -> Path:
+        """Enregistre le modèle s'il n'est pas déjà présent (écriture atomique)."""
+        path = self.base_path(sha256)
+        if path.exists():
+            return path
+        if hashlib.sha256(data).hexdigest() != sha256:
+            raise ValueError(f"empreinte du modèle incohérente : {sha256}")
+        self.bases_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+        logger.info(f"Modèle de base enregistré : {path.name} ({len(data)} octets)")
+        return path
+
+    def iter_pdf(self, delta_file, chunk_size: int = READ_CHUNK_SIZE) -> Iterator[bytes]:
+        """Reconstitue en flux le PDF complet d'un fichier .pdfdelta (modèle puis mise à jour)."""
+        with open(delta_file, 'rb') as delta:
+            header = read_header(delta)
+            base = self.base_path(header.base_sha256)
+            with open(base, 'rb') as f:
+                if os.fstat(f.fileno()).st_size != header.base_size:
+                    raise ValueError(f"modèle de base altéré : {base}")
+                while chunk := f.read(chunk_size):
+                    yield chunk
+            while chunk := delta.read(chunk_size):
+                yield chunk
+
+    def reconstruct(self, delta_file) -> bytes:
+        """PDF complet d'un fichier .pdfdelta, en mémoire."""
+        return b''.join(self.iter_pdf(delta_file))
+
+    def copy_to(self, delta_file, stream: BinaryIO):
+        """Écrit le PDF complet dans un flux binaire (réponse HTTP, archive zip...)."""
+        for chunk in self.iter_pdf(delta_file):
+            stream.write(chunk)
+
+    def materialize(self, delta_file, output_pdf_path: Optional[Union[str, Path]] = None) -> Path:
+        """Écrit le PDF complet à côté du delta (ou à output_pdf_path) de façon atomique."""
+        output_pdf_path = Path(output_pdf_path) if output_pdf_path else Path(delta_file).with_suffix('.pdf')
+        tmp_path = output_pdf_path.with_suffix(f".{os.getpid()}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                self.copy_to(delta_file, f)
+            os.replace(tmp_path, output_pdf_path)
+        except BaseException:
+            tmp_path.unlink(missing_ok=True)
+            raise
+        return output_pdf_path
+
+
+_base_store: Optional[PdfBaseStore] = None
+
+
+def get_pdf_base_store() -> PdfBaseStore:
+    """Retourne le magasin de modèles de base du processus."""
+    global _base_store
+    if _base_store is None:
+        _base_store = PdfBaseStore()
+    return _base_store
+
+
+def storage_stats(directory: Path) -> dict:
+    """Place occupée par les deltas d'un répertoire, comparée aux PDF complets équivalents."""
+    deltas = delta_bytes = full_bytes = 0
+    bases = set()
+    for path in Path(directory).rglob(f"*{DELTA_SUFFIX}"):
+        with open(path, 'rb') as f:
+            header = read_header(f)
+        size = path.stat().st_size
+        deltas += 1
+        delta_bytes += size
+        full_bytes += header.base_size + size - header.offset
+        bases.add((header.base_sha256, header.base_size))
+    base_bytes = sum(size for _, size in bases)
+    return {
+        'deltas': deltas,
+        'delta_bytes': delta_bytes,
+        'bases': len(bases),
+        'base_bytes': base_bytes,
+        'full_pdf_bytes': full_bytes,
+        'ratio': round(full_bytes / (delta_bytes + base_bytes), 1) if deltas else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="PDF remplis stockés en deltas incrémentaux")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    materialize = subparsers.add_parser('materialize', help="Reconstitue des PDF complets")
+    materialize.add_argument('deltas', nargs='+', type=Path)
+    materialize.add_argument('-o', '--output', type=Path, help="PDF de sortie (un seul delta)")
+    stats = subparsers.add_parser('stats', help="Place occupée par les deltas d'un répertoire")
+    stats.add_argument('directory', type=Path)
+    args = parser.parse_args(argv)
+
+    if args.command == 'stats':
+        result = storage_stats(args.directory)
+        print(f"{result['deltas']} deltas ({result['delta_bytes'] / 1024:.0f} Ko) + {result['bases']} modèles de base "
+              f"({result['base_bytes'] / 1024:.0f} Ko) au lieu de {result['full_pdf_bytes'] / 1024:.0f} Ko "
+              f"de PDF complets (x{result['ratio']})")
+        return 0
+
+    if args.output and len(args.deltas) > 1:
+        parser.error("-o n'est possible qu'avec un seul delta")
+    store = get_pdf_base_store()
+    status = 0
+    for delta_file in args.deltas:
+        try:
+            print(store.materialize(delta_file, args.output))
+        except (OSError, ValueError) as e:
+            print(f"Erreur : {delta_file} : {e}", file=sys.stderr)
+            status = 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,213 @@
+"""
+Analyse réglementaire vectorisée (NumPy) d'un portefeuille de projets
+
+Les règles d'architect_rules.py sont évaluées colonne par colonne sur tous les projets
+à la fois : CERFA requis (matrice de booléens, ou masque de bits par projet), alertes et
+délai d'instruction. Utile pour rejouer l'analyse de tout le portefeuille lorsqu'un seuil
+change (règles modifiées passées à analyse_portfolio). Chaque projet se reconvertit à la
+demande au format de ArchitectBusinessLogic.analyser_projet.
+
+Usage :
+    columns = PortfolioColumns.from_projects(projets)      # ou colonnes NumPy existantes
+    analysis = analyse_portfolio(columns)
+    analysis.required_bits, analysis.delays, analysis.to_dict(0)
+"""
+
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+from architect_business_logic import CERFA_DATABASE
+from architect_rules import (ALERT_RULES, BOOLEAN_ATTRIBUTES, CERFA_RULES, DELAY_RULES, NUMERIC_ATTRIBUTES,
+                             OPERATORS, project_criteria)
+
+# Codes des types de projet (colonne project_type) ; -1 : tout autre type
+PROJECT_TYPES = ('construction_neuve', 'extension', 'renovation', 'amenagement', 'modification',
+                 'appel_offres_public')
+OTHER_TYPE = -1
+
+
+def project_type_code(project_type: Any) -> int:
+    """Code d'un type de projet (OTHER_TYPE s'il n'est pas dans PROJECT_TYPES)."""
+    if isinstance(project_type, str) and project_type in PROJECT_TYPES:
+        return PROJECT_TYPES.index(project_type)
+    return OTHER_TYPE
+
+
+@dataclass
+class PortfolioColumns:
+    """Critères des règles en colonnes, un élément par projet."""
+    project_type: np.ndarray     # Codes (voir PROJECT_TYPES)
+    floor_area: np.ndarray       # surfacePlancher (m²)
+    land_area: np.ndarray        # surfaceTerrain (m²)
+    company: np.ndarray          # Client avec SIRET
+    protected_zone: np.ndarray
+    demolition: np.ndarray
+    erp: np.ndarray
+    subcontracting: np.ndarray
+
+    def __post_init__(self):
+        self.project_type = np.asarray(self.project_type, dtype=np.int8)
+        for name in NUMERIC_ATTRIBUTES:
+            setattr(self, name, np.asarray(getattr(self, name), dtype=np.float64))
+        for name in BOOLEAN_ATTRIBUTES:
+            setattr(self, name, np.asarray(getattr(self, name), dtype=bool))
+        lengths = {len(getattr(self, name)) for name in self.__dataclass_fields__}
+        if len(lengths) > 1:
+            raise ValueError(f"Colonnes de longueurs différentes : {sorted(lengths)}")
+
+    def __len__(self) -> int:
+        return len(self.project_type)
+
+    @classmethod
+    def from_projects(cls, projects: Iterable[Dict[str, Any]]) -> 'PortfolioColumns':
+        """Colonnes extraites de projets au format du formulaire (mêmes exceptions que analyser_projet)."""
+        rows = [project_criteria(project) for project in projects]
+        return cls(
+            project_type=[project_type_code(row.project_type) for row in rows],
+            floor_area=[row.floor_area for row in rows],
+            land_area=[row.land_area for row in rows],
+            company=[row.company for row in rows],
+            protected_zone=[bool(row.protected_zone) for row in rows],
+            demolition=[bool(row.demolition) for row in rows],
+            erp=[row.erp for row in rows],
+            subcontracting=[bool(row.subcontracting) for row in rows],
+        )
+
+
+def _type_mask(rule: Mapping[str, Any], columns: PortfolioColumns) -> np.ndarray:
+    """Projets dont le type est concerné par la règle."""
+    mask = np.ones(len(columns), dtype=bool)
+    for key, included in (('types', True), ('except_types', False)):
+        if key in rule:
+            unknown = [project_type for project_type in rule[key] if project_type not in PROJECT_TYPES]
+            if unknown:
+                raise ValueError(f"Type de projet sans code dans PROJECT_TYPES : {', '.join(unknown)}")
+            codes = [PROJECT_TYPES.index(project_type) for project_type in rule[key]]
+            mask &= np.isin(columns.project_type, codes) == included
+    return mask
+
+
+def _condition_mask(when: Mapping[str, Any], columns: PortfolioColumns) -> np.ndarray:
+    """Projets satisfaisant toutes les conditions (NaN : comparaisons fausses, comme en Python)."""
+    mask = np.ones(len(columns), dtype=bool)
+    for attribute, expected in when.items():
+        column = getattr(columns, attribute)
+        if attribute in NUMERIC_ATTRIBUTES:
+            for op, threshold in expected:
+                mask &= OPERATORS[op](column, threshold)
+        else:
+            mask &= column == bool(expected)
+    return mask
+
+
+@dataclass
+class PortfolioAnalysis:
+    """Résultat vectorisé de l'analyse d'un portefeuille."""
+    cerfa_ids: Tuple[str, ...]          # Colonnes de required / optional, bits de required_bits
+    required: np.ndarray                # (projets, CERFA) booléens : CERFA obligatoires
+    optional: np.ndarray                # (projets, CERFA) booléens : CERFA optionnels
+    alerts: np.ndarray                  # (projets, règles d'alerte) booléens
+    surcharges: np.ndarray              # (projets, règles de délai) booléens : majorations appliquées
+    delays: np.ndarray                  # delai_instruction_estime_jours par projet
+    matched_cases: np.ndarray           # (projets, décisions) : cas retenu par décision, -1 si aucun
+    cerfa_rules: Sequence[Mapping[str, Any]]
+    alert_rules: Sequence[Mapping[str, Any]]
+    delay_rules: Sequence[Mapping[str, Any]]
+    cerfa_database: Mapping[str, Any]
+
+    def __len__(self) -> int:
+        return len(self.delays)
+
+    @property
+    def required_bits(self) -> np.ndarray:
+        """Masque de bits par projet : bit j pour cerfa_ids[j] obligatoire (64 CERFA au plus)."""
+        if len(self.cerfa_ids) > 64:
+            raise ValueError("Plus de 64 CERFA : utiliser la matrice required")
+        weights = np.left_shift(np.uint64(1), np.arange(len(self.cerfa_ids), dtype=np.uint64))
+        return (self.required * weights).sum(axis=1, dtype=np.uint64)
+
+    def cerfa_counts(self) -> Dict[str, int]:
+        """Nombre de projets du portefeuille pour lesquels chaque CERFA est obligatoire."""
+        return dict(zip(self.cerfa_ids, self.required.sum(axis=0).tolist()))
+
+    def to_dict(self, index: int) -> Dict[str, Any]:
+        """Résultat d'un projet au format de ArchitectBusinessLogic.analyser_projet."""
+        authorizations = []
+        for rule, case_index in zip(self.cerfa_rules, self.matched_cases[index].tolist()):
+            if case_index < 0:
+                continue
+            case = rule['cases'][case_index]
+            for cerfa_ids, required in ((case.get('cerfa', ()), True), (case.get('optional', ()), False)):
+                for cerfa_id in cerfa_ids:
+                    authorizations.append({
+                        "type": f"CERFA {cerfa_id}",
+                        "nom": self.cerfa_database[cerfa_id]["nom"],
+                        "delai_instruction": self.cerfa_database[cerfa_id]["delai"],
+                        "obligatoire": required,
+                    })
+
+        alerts = [{"message": rule['message']}
+                  for rule, matched in zip(self.alert_rules, self.alerts[index].tolist()) if matched]
+        delay = max((doc["delai_instruction"] for doc in authorizations if doc["obligatoire"]), default=0)
+        for rule, applied in zip(self.delay_rules, self.surcharges[index].tolist()):
+            if applied:
+                delay += rule['days']
+                alerts.append({"message": rule['message'].format(total=delay)})
+
+        return {
+            "analyse_reglementaire": {
+                "autorisations_requises": authorizations,
+                "alertes_conformite": alerts,
+                "delai_instruction_estime_jours": int(self.delays[index]),
+            }
+        }
+
+    def to_dicts(self, indexes: Optional[Iterable[int]] = None) -> List[Dict[str, Any]]:
+        """Résultats au format de analyser_projet (tous les projets par défaut)."""
+        return [self.to_dict(index) for index in (range(len(self)) if indexes is None else indexes)]
+
+
+def analyse_portfolio(columns: PortfolioColumns, cerfa_rules=CERFA_RULES, alert_rules=ALERT_RULES,
+                      delay_rules=DELAY_RULES, cerfa_database: Optional[Mapping[str, Any]] = None) -> PortfolioAnalysis:
+    """
+    Évalue les règles sur tout le portefeuille en une passe par règle.
+
+    Les règles par défaut sont celles de l'application ; passer des règles modifiées
+    (un seuil déplacé, par exemple) pour rejouer l'analyse avec d'autres valeurs.
+    """
+    cerfa_database = cerfa_database or CERFA_DATABASE
+    cerfa_ids = tuple(cerfa_database)
+    column_of = {cerfa_id: j for j, cerfa_id in enumerate(cerfa_ids)}
+    n = len(columns)
+
+    required = np.zeros((n, len(cerfa_ids)), dtype=bool)
+    optional = np.zeros((n, len(cerfa_ids)), dtype=bool)
+    matched_cases = np.full((n, len(cerfa_rules)), -1, dtype=np.int8)
+    for d, rule in enumerate(cerfa_rules):
+        remaining = _type_mask(rule, columns)  # Premier cas satisfait de la décision
+        for c, case in enumerate(rule['cases']):
+            matched = remaining & _condition_mask(case.get('when', {}), columns)
+            matched_cases[matched, d] = c
+            remaining &= ~matched
+            for cerfa_id in case.get('cerfa', ()):
+                required[:, column_of[cerfa_id]] |= matched
+            for cerfa_id in case.get('optional', ()):
+                optional[:, column_of[cerfa_id]] |= matched
+
+    alerts = np.zeros((n, len(alert_rules)), dtype=bool)
+    for a, rule in enumerate(alert_rules):
+        alerts[:, a] = _type_mask(rule, columns) & _condition_mask(rule.get('when', {}), columns)
+
+    # Délai : le plus long des CERFA obligatoires, majoré seulement s'il y en a au moins un
+    cerfa_delays = np.array([cerfa_database[cerfa_id]["delai"] for cerfa_id in cerfa_ids], dtype=np.int64)
+    delays = np.where(required, cerfa_delays, 0).max(axis=1, initial=0)
+    has_required = required.any(axis=1)
+    surcharges = np.zeros((n, len(delay_rules)), dtype=bool)
+    for r, rule in enumerate(delay_rules):
+        surcharges[:, r] = has_required & _type_mask(rule, columns) & _condition_mask(rule.get('when', {}), columns)
+        delays += np.where(surcharges[:, r], rule['days'], 0)
+
+    return PortfolioAnalysis(cerfa_ids, required, optional, alerts, surcharges, delays, matched_cases,
+                             cerfa_rules, alert_rules, delay_rules, cerfa_database)
@@ -0,0 +1,144 @@
+"""
+Registre partagé des règles réglementaires d'IntelligentFormSystem
+
+Les règles d'urbanisme, seuils réglementaires et projets types sont lus depuis un
+fichier JSON externe (Config.REGULATORY_RULES_PATH), une fois par processus, et figés
+(dictionnaires en lecture seule, listes en tuples) : toutes les instances les partagent
+sans copie. Le fichier est rechargé à chaud lorsque sa date de modification ou sa
+taille change (vérifié au plus une fois par Config.REGULATORY_RULES_CHECK_INTERVAL
+secondes) ; un fichier invalide est ignoré et les règles précédentes restent en vigueur.
+"""
+
+import json
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from config import Config
+from utils import freeze
+
+logger = logging.getLogger('ArchiBot.rules_registry')
+
+RULES_FORMAT_VERSION = 1
+RULE_SECTIONS = ('regles_urbanisme', 'seuils_reglementaires', 'templates_projets')
+
+
+@dataclass(frozen=True)
+class RuleSet:
+    """Règles chargées d'un fichier (instantané immuable)."""
+    path: Path
+    mtime_ns: int
+    size: int
+    regles_urbanisme: Mapping[str, Any]
+    seuils_reglementaires: Mapping[str, Any]
+    templates_projets: Mapping[str, Any]
+
+
+def _convertir_destinations(templates: Dict[str, Any]):
+    """Remplace les destinations des projets types (chaînes JSON) par des DestinationBatiment."""
+    from intelligent_form_system import DestinationBatiment
+
+    for nom, template in templates.items():
+        if isinstance(template, dict) and 'destination' in template:
+            try:
+                template['destination'] = DestinationBatiment(template['destination'])
+            except ValueError:
+                raise ValueError(f"destination inconnue pour le projet type {nom} : {template['destination']!r}") from None
+
+
+def load_rule_set(path) -> RuleSet:
+    """
+    Charge et fige un fichier de règles.
+
+    Les destinations des projets types deviennent des DestinationBatiment. Lève
+    FileNotFoundError si le fichier n'existe pas, ValueError s'il n'est pas un JSON
+    valide, d'une autre version, s'il lui manque une section ou si une destination est inconnue.
+    """
+    path = Path(path)
+    stat = path.stat()
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict) or data.get('version') != RULES_FORMAT_VERSION:
+        raise ValueError(f"version de règles non prise en charge (attendue : {RULES_FORMAT_VERSION})")
+    missing = [section for section in RULE_SECTIONS if not isinstance(data.get(section), dict)]
+    if missing:
+        raise ValueError(f"section(s) absente(s) : {', '.join(missing)}")
+    _convertir_destinations(data['templates_projets'])
+    return RuleSet(path, stat.st_mtime_ns, stat.st_size, *(freeze(data[section]) for section in RULE_SECTIONS))
+
+
+class RuleRegistry:
+    """Règles du processus, rechargées uniquement si le fichier change."""
+
+    def __init__(self, path: Optional[Path] = None, check_interval: Optional[float] = None):
+        self.path = Path(path) if path else Config.REGULATORY_RULES_PATH
+        self.check_interval = (check_interval if check_interval is not None
+                               else Config.REGULATORY_RULES_CHECK_INTERVAL)
+        self._next_check = 0.0  # time.monotonic() de la prochaine vérification du fichier
+        self._current: Optional[RuleSet] = None
+        self._rejected: Optional[Tuple[int, int]] = None  # (mtime_ns, size) d'un fichier invalide
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.reloads = 0
+        self.errors = 0
+
+    def get(self) -> RuleSet:
+        """
+        Retourne les règles en vigueur, rechargées si le fichier a changé.
+
+        Au premier chargement, lève FileNotFoundError ou ValueError (voir load_rule_set) ;
+        ensuite, un fichier supprimé ou invalide laisse les règles précédentes en vigueur.
+        """
+        current = self._current
+        now = time.monotonic()
+        if current is not None and now < self._next_check:
+            self.hits += 1  # Chemin sans verrou : compteur indicatif
+            return current
+        self._next_check = now + self.check_interval
+        try:
+            stat = self.path.stat()
+        except OSError:
+            if current is None:
+                raise
+            return current
+        signature = (stat.st_mtime_ns, stat.st_size)
+        if current is not None and signature in ((current.mtime_ns, current.size), self._rejected):
+            self.hits += 1
+            return current
+
+        with self._lock:
+            current = self._current
+            if current and (current.mtime_ns, current.size) == signature:
+                return current
+            try:
+                rule_set = load_rule_set(self.path)
+            except (OSError, ValueError) as e:
+                if current is None:
+                    raise
+                self._rejected = signature
+                self.errors += 1
+                logger.warning(f"Règles non rechargées ({self.path.name}) : {e} ; les règles précédentes restent en vigueur")
+                return current
+            self._current = rule_set
+            self._rejected = None
+            self.reloads += 1
+        logger.info(f"Règles réglementaires chargées : {self.path.name}")
+        return rule_set
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du registre."""
+        return {'hits': self.hits, 'reloads': self.reloads, 'errors': self.errors}
+
+
+_rule_registry: Optional[RuleRegistry] = None
+
+
+def get_rule_registry() -> RuleRegistry:
+    """Retourne le registre de règles partagé par le processus."""
+    global _rule_registry
+    if _rule_registry is None:
+        _rule_registry = RuleRegistry()
+    return _rule_registry
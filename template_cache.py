@@ -0,0 +1,229 @@
+"""
+Cache mémoire des modèles CERFA (PDF) avec détection des modifications
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, Optional
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.template_cache')
+
+# Manifeste du pack de modèles allégés (voir build_lite_templates.py)
+LITE_MANIFEST_NAME = 'manifest.json'
+LITE_MANIFEST_VERSION = 1
+
+
+@dataclass(frozen=True)
+class CachedTemplate:
+    """Modèle PDF conservé en mémoire"""
+    cerfa_id: str
+    path: Path
+    data: bytes
+    sha256: str
+    mtime_ns: int
+    size: int                 # Taille du fichier original (revalidation par stat)
+    source_sha256: str = ''   # Empreinte de l'original (diffère de sha256 pour un modèle allégé)
+    lite: bool = False
+    lite_manifest_mtime_ns: Optional[int] = None  # Manifeste du pack allégé au chargement (None : absent)
+
+
+class TemplateCache:
+    """Cache LRU borné des modèles CERFA, invalidé sur changement de mtime ou de contenu."""
+
+    def __init__(self, templates_dir: Optional[Path] = None, max_bytes: Optional[int] = None,
+                 use_lite: Optional[bool] = None, lite_dir: Optional[Path] = None):
+        self.templates_dir = Path(templates_dir) if templates_dir else Config.CERFA_TEMPLATES_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else Config.TEMPLATE_CACHE_MAX_BYTES
+        self.use_lite = Config.USE_LITE_TEMPLATES if use_lite is None else use_lite
+        self.lite_dir = Path(lite_dir) if lite_dir else Config.LITE_TEMPLATES_DIR
+        self._lite_manifest: Dict[str, dict] = {}
+        self._lite_manifest_mtime_ns: Optional[int] = None
+        self._entries: "OrderedDict[str, CachedTemplate]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.evictions = 0
+
+    def template_path(self, cerfa_id: str) -> Path:
+        """Chemin du modèle PDF pour un CERFA donné."""
+        return self.templates_dir / f"cerfa_{cerfa_id}.pdf"
+
+    def get(self, cerfa_id: str) -> CachedTemplate:
+        """
+        Retourne le modèle en cache, en le (re)chargeant si nécessaire.
+
+        Une entrée est revalidée par un simple stat : si la date de modification ou la
+        taille de l'original, ou le manifeste du pack allégé (construit, reconstruit ou
+        supprimé), a changé, le fichier est relu et son empreinte SHA-256 comparée.
+        Si le pack allégé contient une version construite à partir de ce même original,
+        ce sont ses octets qui sont servis.
+        Lève FileNotFoundError si le modèle n'existe pas.
+        """
+        path = self.template_path(cerfa_id)
+        stat = path.stat()
+        manifest_mtime_ns = self._lite_manifest_mtime() if self.use_lite else None
+
+        with self._lock:
+            entry = self._entries.get(cerfa_id)
+            if (entry and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size
+                    and entry.lite_manifest_mtime_ns == manifest_mtime_ns):
+                self._entries.move_to_end(cerfa_id)
+                self.hits += 1
+                return entry
+
+        data = path.read_bytes()
+        source_sha256 = hashlib.sha256(data).hexdigest()
+        lite_data = self._load_lite(cerfa_id, source_sha256) if self.use_lite else None
+        if lite_data is not None:
+            data = lite_data
+            sha256 = hashlib.sha256(data).hexdigest()
+        else:
+            sha256 = source_sha256
+
+        with self._lock:
+            entry = self._entries.get(cerfa_id)
+            if entry and entry.sha256 == sha256:
+                # Fichier touché mais contenu identique : on conserve les octets déjà en cache
+                data = entry.data
+                self.hits += 1
+            else:
+                if entry:
+                    self.invalidations += 1
+                    logger.info(f"Modèle modifié, entrée invalidée : {path.name}")
+                self.misses += 1
+
+            new_entry = CachedTemplate(cerfa_id, path, data, sha256, stat.st_mtime_ns, stat.st_size,
+                                       source_sha256, lite_data is not None, manifest_mtime_ns)
+            self._store(new_entry)
+            return new_entry
+
+    def _load_lite(self, cerfa_id: str, source_sha256: str) -> Optional[bytes]:
+        """Octets de la version allégée construite à partir de cet original, sinon None."""
+        entry = self._read_lite_manifest().get(cerfa_id)
+        if not entry or entry.get('source_sha256') != source_sha256:
+            return None
+        try:
+            data = (self.lite_dir / f"cerfa_{cerfa_id}.pdf").read_bytes()
+        except OSError:
+            return None
+        if hashlib.sha256(data).hexdigest() != entry.get('lite_sha256'):
+            logger.warning(f"Modèle allégé du CERFA {cerfa_id} altéré, original utilisé")
+            return None
+        return data
+
+    def _lite_manifest_mtime(self) -> Optional[int]:
+        """Date de modification du manifeste du pack allégé (None s'il est absent)."""
+        try:
+            return (self.lite_dir / LITE_MANIFEST_NAME).stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def lite_sha256(self, cerfa_id: str, source_sha256: str) -> Optional[str]:
+        """Empreinte de la version allégée construite à partir de cet original (None s'il n'y en a pas)."""
+        entry = self._read_lite_manifest().get(cerfa_id)
+        if entry and entry.get('source_sha256') == source_sha256:
+            return entry.get('lite_sha256')
+        return None
+
+    def _read_lite_manifest(self) -> Dict[str, dict]:
+        """Manifeste du pack allégé, relu seulement s'il a changé."""
+        manifest_path = self.lite_dir / LITE_MANIFEST_NAME
+        try:
+            mtime_ns = manifest_path.stat().st_mtime_ns
+        except OSError:
+            self._lite_manifest, self._lite_manifest_mtime_ns = {}, None
+            return self._lite_manifest
+        if mtime_ns != self._lite_manifest_mtime_ns:
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Manifeste des modèles allégés illisible : {e}")
+                manifest = {}
+            if manifest.get('version') != LITE_MANIFEST_VERSION:
+                manifest = {}
+            self._lite_manifest = manifest.get('templates', {})
+            self._lite_manifest_mtime_ns = mtime_ns
+        return self._lite_manifest
+
+    def get_bytes(self, cerfa_id: str) -> bytes:
+        """Retourne le contenu brut du modèle."""
+        return self.get(cerfa_id).data
+
+    def open_document(self, cerfa_id: str):
+        """Ouvre un document PyMuPDF à partir des octets en cache."""
+        import fitz
+        return fitz.open(stream=self.get_bytes(cerfa_id), filetype="pdf")
+
+    def preload(self, cerfa_ids: Optional[Iterable[str]] = None) -> int:
+        """Charge en cache les modèles indiqués (tous ceux du répertoire par défaut)."""
+        if cerfa_ids is None:
+            cerfa_ids = [p.stem[len("cerfa_"):] for p in sorted(self.templates_dir.glob("cerfa_*.pdf"))]
+        loaded = 0
+        for cerfa_id in cerfa_ids:
+            try:
+                self.get(cerfa_id)
+                loaded += 1
+            except FileNotFoundError:
+                logger.warning(f"Modèle introuvable pour le CERFA {cerfa_id}")
+        return loaded
+
+    def invalidate(self, cerfa_id: Optional[str] = None):
+        """Supprime une entrée (ou tout le cache)."""
+        with self._lock:
+            if cerfa_id is None:
+                self._entries.clear()
+                self._current_bytes = 0
+            elif cerfa_id in self._entries:
+                self._current_bytes -= len(self._entries.pop(cerfa_id).data)
+
+    def stats(self) -> Dict[str, int]:
+        """Compteurs du cache, pour le dimensionner."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'lite_entries': sum(1 for entry in self._entries.values() if entry.lite),
+                'bytes': self._current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+                'evictions': self.evictions,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def _store(self, entry: CachedTemplate):
+        """Insère une entrée et applique la borne LRU (appelé sous verrou)."""
+        previous = self._entries.pop(entry.cerfa_id, None)
+        if previous:
+            self._current_bytes -= len(previous.data)
+        if len(entry.data) > self.max_bytes:
+            # Trop gros pour le cache : servi sans être conservé
+            return
+        self._entries[entry.cerfa_id] = entry
+        self._current_bytes += len(entry.data)
+        while self._current_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._current_bytes -= len(evicted.data)
+            self.evictions += 1
+
+
+_template_cache: Optional[TemplateCache] = None
+
+
+def get_template_cache() -> TemplateCache:
+    """Retourne le cache de modèles partagé par le processus."""
+    global _template_cache
+    if _template_cache is None:
+        _template_cache = TemplateCache()
+    return _template_cache
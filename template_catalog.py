@@ -0,0 +1,228 @@
+"""
+Catalogue des champs des modèles CERFA et contrôle de couverture des mappages
+
+Le catalogue (cerfa_templates/catalog.json, généré, non versionné) liste, pour chaque
+modèle identifié par son empreinte, tous ses widgets : nom, type, page, options et
+valeur "cochée". Le contrôle de couverture vérifie CERFA_FIELD_MAPPINGS contre ce
+catalogue sans ouvrir aucun PDF ; les modèles absents du catalogue ou modifiés depuis
+sont signalés (à reconstruire avec --build).
+
+Usage :
+    python template_catalog.py --build   # (Re)construit le catalogue (seuls les modèles modifiés sont relus)
+    python template_catalog.py --check   # Contrôle les mappages ; code de sortie 1 en cas de problème
+    python template_catalog.py --build --check
+"""
+
+import argparse
+import difflib
+import hashlib
+import json
+import logging
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cerfa_field_mappings import ARCHITECT_INTERNAL_MAP, CERFA_FIELD_MAPPINGS
+from config import Config
+
+logger = logging.getLogger('ArchiBot.template_catalog')
+
+CATALOG_FORMAT_VERSION = 1
+
+# Types de widget PyMuPDF (fitz.PDF_WIDGET_TYPE_*) ; le contrôle n'importe pas fitz
+WIDGET_TYPE_NAMES = {
+    0: 'unknown', 1: 'button', 2: 'checkbox', 3: 'combobox',
+    4: 'listbox', 5: 'radiobutton', 6: 'signature', 7: 'text',
+}
+CHECKABLE_TYPES = ('checkbox', 'radiobutton')
+
+
+@dataclass(frozen=True)
+class CoverageIssue:
+    """Problème détecté dans un mappage."""
+    cerfa_id: str
+    key: str          # Clé générique du mappage (ou '*' pour le CERFA entier)
+    field: str        # Champ PDF concerné
+    problem: str
+
+    def __str__(self):
+        return f"CERFA {self.cerfa_id} : {self.key} -> {self.field} : {self.problem}"
+
+
+def _template_ids(templates_dir: Path) -> List[str]:
+    return [p.stem[len("cerfa_"):] for p in sorted(templates_dir.glob("cerfa_*.pdf"))]
+
+
+def extract_fields(doc) -> Dict[str, List[Dict[str, Any]]]:
+    """Description de tous les widgets d'un document, par nom de champ."""
+    fields: Dict[str, List[Dict[str, Any]]] = {}
+    for page in doc:
+        for widget in page.widgets():
+            type_name = WIDGET_TYPE_NAMES.get(widget.field_type, 'unknown')
+            entry = {'page': page.number, 'type': type_name, 'flags': widget.field_flags}
+            if widget.field_label:
+                entry['label'] = widget.field_label
+            if widget.choice_values:
+                entry['options'] = list(widget.choice_values)
+            if type_name in CHECKABLE_TYPES:
+                state = widget.on_state()
+                entry['on_state'] = state if isinstance(state, str) else "Yes"
+            fields.setdefault(widget.field_name, []).append(entry)
+    return fields
+
+
+def load_catalog(catalog_path: Optional[Path] = None) -> Dict[str, Any]:
+    """Lit le catalogue ; retourne un catalogue vide s'il est absent ou d'un autre format."""
+    catalog_path = Path(catalog_path) if catalog_path else Config.TEMPLATE_CATALOG_PATH
+    try:
+        with open(catalog_path, 'r', encoding='utf-8') as f:
+            catalog = json.load(f)
+    except FileNotFoundError:
+        return {'version': CATALOG_FORMAT_VERSION, 'templates': {}}
+    if catalog.get('version') != CATALOG_FORMAT_VERSION:
+        return {'version': CATALOG_FORMAT_VERSION, 'templates': {}}
+    return catalog
+
+
+def stale_templates(catalog: Dict[str, Any], templates_dir: Optional[Path] = None) -> List[str]:
+    """Modèles absents du catalogue ou modifiés depuis (taille puis empreinte, sans ouvrir les PDF)."""
+    templates_dir = Path(templates_dir) if templates_dir else Config.CERFA_TEMPLATES_DIR
+    stale = []
+    for cerfa_id in _template_ids(templates_dir):
+        entry = catalog['templates'].get(cerfa_id)
+        path = templates_dir / f"cerfa_{cerfa_id}.pdf"
+        if (not entry or entry['size'] != path.stat().st_size
+                or entry['sha256'] != hashlib.sha256(path.read_bytes()).hexdigest()):
+            stale.append(cerfa_id)
+    return stale
+
+
+def build_catalog(templates_dir: Optional[Path] = None, catalog_path: Optional[Path] = None) -> Dict[str, Any]:
+    """Met à jour le catalogue : seuls les modèles nouveaux ou modifiés sont ouverts."""
+    import fitz
+    templates_dir = Path(templates_dir) if templates_dir else Config.CERFA_TEMPLATES_DIR
+    catalog_path = Path(catalog_path) if catalog_path else Config.TEMPLATE_CATALOG_PATH
+    catalog = load_catalog(catalog_path)
+
+    present = set(_template_ids(templates_dir))
+    templates = {cerfa_id: entry for cerfa_id, entry in catalog['templates'].items() if cerfa_id in present}
+    for cerfa_id in stale_templates({'templates': templates}, templates_dir):
+        data = (templates_dir / f"cerfa_{cerfa_id}.pdf").read_bytes()
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            fields = extract_fields(doc)
+        templates[cerfa_id] = {
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'size': len(data),
+            'fields': fields,
+        }
+        logger.info(f"Catalogue : CERFA {cerfa_id} ({len(fields)} champs)")
+
+    catalog = {'version': CATALOG_FORMAT_VERSION, 'templates': templates}
+    tmp_path = catalog_path.with_suffix(f".{os.getpid()}.tmp")
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(catalog, f, indent=1, ensure_ascii=False, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp_path, catalog_path)
+    return catalog
+
+
+def check_mappings(catalog: Dict[str, Any], mappings: Optional[Dict[str, Dict[str, Any]]] = None) -> List[CoverageIssue]:
+    """
+    Vérifie que chaque champ visé par un mappage existe dans le modèle, avec un type compatible :
+    case à cocher pour un mappage valeur -> case (dict), champ non cochable pour une valeur copiée.
+    """
+    mappings = CERFA_FIELD_MAPPINGS if mappings is None else mappings
+    templates = catalog['templates']
+    issues = []
+
+    for cerfa_id, mapping in mappings.items():
+        template = templates.get(cerfa_id)
+        if template is None:
+            issues.append(CoverageIssue(cerfa_id, '*', '*', "modèle absent du catalogue"))
+            continue
+        fields = template['fields']
+
+        for key, target in mapping.items():
+            if not target:
+                continue
+            if isinstance(target, dict):
+                expected, targets = CHECKABLE_TYPES, [field for field in target.values() if field]
+            else:
+                expected, targets = None, [target]
+            for field in targets:
+                entries = fields.get(field)
+                if not entries:
+                    close = difflib.get_close_matches(field, fields.keys(), n=1, cutoff=0.8)
+                    problem = f"champ absent du modèle (proche : {close[0]!r})" if close else "champ absent du modèle"
+                    issues.append(CoverageIssue(cerfa_id, key, field, problem))
+                elif expected and not any(entry['type'] in expected for entry in entries):
+                    issues.append(CoverageIssue(cerfa_id, key, field,
+                                                f"type {entries[0]['type']}, case à cocher attendue"))
+                elif not expected and all(entry['type'] in CHECKABLE_TYPES for entry in entries):
+                    # Une valeur texte écrite dans une case à cocher la laisse décochée
+                    issues.append(CoverageIssue(cerfa_id, key, field,
+                                                f"case à cocher ({entries[0]['type']}) : mappage valeur -> case attendu"))
+
+    for key, field in ARCHITECT_INTERNAL_MAP.items():
+        if not any(field in template['fields'] for template in templates.values()):
+            issues.append(CoverageIssue('*', key, field, "champ architecte présent dans aucun modèle"))
+    return issues
+
+
+def check_coverage(templates_dir: Optional[Path] = None, catalog_path: Optional[Path] = None,
+                   refresh: bool = False) -> List[CoverageIssue]:
+    """
+    Contrôle complet : fraîcheur du catalogue puis couverture des mappages.
+
+    Aucun PDF n'est ouvert : les modèles absents du catalogue ou modifiés depuis sont
+    signalés comme problèmes, sauf avec refresh=True (catalogue reconstruit au préalable).
+    """
+    catalog = load_catalog(catalog_path)
+    if not catalog['templates'] and not refresh:
+        return [CoverageIssue('*', '*', '*', "catalogue absent (python template_catalog.py --build)")]
+    stale = stale_templates(catalog, templates_dir)
+    if stale and refresh:
+        catalog = build_catalog(templates_dir, catalog_path)
+        stale = []
+    issues = [CoverageIssue(cerfa_id, '*', '*', "catalogue périmé (python template_catalog.py --build)")
+              for cerfa_id in stale]
+    return issues + check_mappings(catalog)
+
+
+def log_coverage_issues() -> int:
+    """Contrôle de démarrage : journalise les problèmes de couverture et retourne leur nombre."""
+    try:
+        issues = check_coverage()
+    except (OSError, ValueError) as e:
+        logger.warning(f"Contrôle de couverture des mappages impossible : {e}")
+        return 0
+    for issue in issues:
+        logger.warning(str(issue))
+    return len(issues)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Catalogue des champs des modèles CERFA")
+    parser.add_argument('--build', action='store_true', help="Construit ou met à jour le catalogue")
+    parser.add_argument('--check', action='store_true', help="Contrôle la couverture des mappages")
+    args = parser.parse_args(argv)
+    if not (args.build or args.check):
+        parser.error("indiquer --build et/ou --check")
+
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s - %(message)s')
+    if args.build:
+        catalog = build_catalog()
+        print(f"Catalogue : {len(catalog['templates'])} modèles -> {Config.TEMPLATE_CATALOG_PATH}")
+    if args.check:
+        issues = check_coverage()
+        for issue in issues:
+            print(issue)
+        print(f"{len(issues)} problème(s) de couverture")
+        return 1 if issues else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,42 @@
+"""
+Configuration pytest : les modules de l'application sont à la racine du dépôt
+"""
+
+import sys
+from pathlib import Path
+
+import pytest
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+if str(BASE_DIR) not in sys.path:
+    sys.path.insert(0, str(BASE_DIR))
+
+SAMPLE_PROJECT = {
+    'client': {
+        'civilite': 'M.', 'nom': 'Durand', 'prenom': 'Paul', 'dateNaissance': '1980-04-12',
+        'adresse': '3 rue des Lilas', 'codePostal': '34000', 'ville': 'Montpellier',
+    },
+    'projet': {
+        'typeProjet': 'construction_neuve', 'destination': 'habitation',
+        'adresseProjet': '1 chemin Vert', 'codePostalProjet': '34170', 'villeProjet': 'Castelnau-le-Lez',
+        'referenceCadastrale': 'AB 12', 'surfaceTerrain': '600', 'surfacePlancher': '120',
+    },
+    'technique': {'zoneProtegee': True, 'demolition': False},
+}
+
+
+@pytest.fixture
+def sample_project():
+    """Projet type (copie modifiable)."""
+    import copy
+    return copy.deepcopy(SAMPLE_PROJECT)
+
+
+@pytest.fixture
+def isolated_stores(tmp_path, monkeypatch):
+    """Cache de sortie et modèles de base dans tmp_path : les tests n'écrivent rien dans le dépôt."""
+    import output_cache
+    import pdf_storage
+    monkeypatch.setattr(output_cache, '_output_cache', output_cache.OutputCache(tmp_path / 'output_cache'))
+    monkeypatch.setattr(pdf_storage, '_base_store', pdf_storage.PdfBaseStore(tmp_path / 'bases'))
+    return tmp_path
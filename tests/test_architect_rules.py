@@ -0,0 +1,194 @@
+"""
+Règles compilées (architect_rules.py) : vérification différentielle contre les chaînes if/elif d'origine
+
+Chaque projet, généré avec une graine fixe (valeurs aux seuils, NaN, infinis, chaînes
+numériques, données invalides), donne le même résultat, ou la même exception, avec
+ArchitectBusinessLogic.analyser_projet qu'avec l'implémentation d'origine conservée ici.
+Le débit des deux moteurs est mesuré par benchmarks/bench_rules.py.
+"""
+
+import itertools
+import random
+
+from architect_business_logic import CERFA_DATABASE, ArchitectBusinessLogic
+
+SEED = 2024
+CORPUS_SIZE = 3000
+
+PROJECT_TYPES = ('construction_neuve', 'extension', 'renovation', 'amenagement', 'modification',
+                 'appel_offres_public', '', 'inconnu', None, ['extension'])
+# Seuils des règles, leurs voisins immédiats et des valeurs particulières
+SURFACES = (0, 20, 20.5, 21, 40, 40.01, 50, 50.5, 150, 150.0001, 1000, 2500, 2501, -1, -0.0,
+            float('nan'), float('inf'), float('-inf'), '150', ' 42 ', '1e3', True)
+INVALID_SURFACES = ('', 'abc', None, [])
+TRUTH_VALUES = (True, False, None, 0, 1, '', 'oui', [], 'false')
+DESTINATIONS = ('habitation', 'erp', 'ERP', None, '')
+
+
+def legacy_analyser_projet(donnees_projet):
+    """Référence : analyser_projet d'origine (chaînes if/elif)."""
+    projet = donnees_projet.get('projet', {})
+    client = donnees_projet.get('client', {})
+    technique = donnees_projet.get('technique', {})
+
+    type_projet = projet.get('typeProjet', '')
+    surface = float(projet.get('surfacePlancher', 0.0))
+    surface_terrain = float(projet.get('surfaceTerrain', 0.0))
+    is_entreprise = bool(client.get('numeroSiret'))
+    zone_protegee = technique.get('zoneProtegee', False)
+    demolition = technique.get('demolition', False)
+    is_erp = projet.get('destination') == 'erp'
+
+    autorisations = []
+    alertes = []
+    delai_total = 0
+
+    if type_projet == 'construction_neuve':
+        if is_entreprise:
+            autorisations.append({"type": "13409-15", "obligatoire": True})
+        else:
+            if surface <= 150:
+                autorisations.append({"type": "13406-15", "obligatoire": True})
+            else:
+                autorisations.append({"type": "13409-15", "obligatoire": True})
+
+    elif type_projet == 'extension':
+        if 0 <= surface <= 20:
+            if zone_protegee:
+                autorisations.append({"type": "13703-12", "obligatoire": True})
+        elif 21 <= surface <= 40:
+            autorisations.append({"type": "13703-12", "obligatoire": True})
+        elif surface > 40:
+            if is_entreprise:
+                autorisations.append({"type": "13409-15", "obligatoire": True})
+            else:
+                autorisations.append({"type": "13406-15", "obligatoire": True})
+
+    elif type_projet == 'renovation':
+        if is_entreprise:
+            autorisations.append({"type": "13404-12", "obligatoire": True})
+        else:
+            autorisations.append({"type": "13703-12", "obligatoire": True})
+        if surface > 40:
+            autorisations.append({"type": "13409-15", "obligatoire": True})
+
+    elif type_projet == 'amenagement':
+        if surface_terrain <= 2500:
+            autorisations.append({"type": "13404-12", "obligatoire": True})
+        else:
+            autorisations.append({"type": "16297-03", "obligatoire": True})
+
+    elif type_projet == 'modification':
+        autorisations.append({"type": "16700-01", "obligatoire": True})
+
+    elif type_projet == 'appel_offres_public':
+        autorisations.append({"type": "DC1", "obligatoire": True})
+        autorisations.append({"type": "DC2", "obligatoire": True})
+        if technique.get('sousTraitance'):
+            autorisations.append({"type": "DC4", "obligatoire": True})
+
+    if demolition:
+        autorisations.append({"type": "13405-13", "obligatoire": True})
+    if is_erp:
+        autorisations.append({"type": "13824-04", "obligatoire": True})
+
+    if type_projet not in ['modification', 'appel_offres_public']:
+        autorisations.append({"type": "13407-10", "obligatoire": True})
+        autorisations.append({"type": "13408-12", "obligatoire": True})
+        autorisations.append({"type": "13410-12", "obligatoire": False})
+
+    if not is_entreprise and surface > 150:
+        alertes.append({"message": "Architecte obligatoire (surface > 150m² pour un particulier)."})
+    if is_entreprise and type_projet in ['construction_neuve', 'extension']:
+        alertes.append({"message": "Architecte obligatoire pour une personne morale."})
+
+    if surface > 50:
+        alertes.append({"message": "Étude thermique (RT2012/RE2020) probablement requise."})
+    if surface_terrain > 1000:
+        alertes.append({"message": "Étude de sol recommandée."})
+    if zone_protegee:
+        alertes.append({"message": "Avis de l'Architecte des Bâtiments de France (ABF) requis."})
+
+    delais = [CERFA_DATABASE[doc["type"]]["delai"] for doc in autorisations if doc["obligatoire"]]
+    if delais:
+        delai_total = max(delais)
+        if zone_protegee:
+            delai_total += 15
+            alertes.append({"message": f"Délais d'instruction rallongés de 15 jours (total: {delai_total} jours)."})
+
+    autorisations_formatees = []
+    for doc in autorisations:
+        cerfa_info = CERFA_DATABASE.get(doc["type"], {})
+        autorisations_formatees.append({
+            "type": f"CERFA {doc['type']}",
+            "nom": cerfa_info.get("nom", "Document inconnu"),
+            "delai_instruction": cerfa_info.get("delai", 0),
+            "obligatoire": doc["obligatoire"]
+        })
+
+    return {
+        "analyse_reglementaire": {
+            "autorisations_requises": autorisations_formatees,
+            "alertes_conformite": alertes,
+            "delai_instruction_estime_jours": delai_total
+        }
+    }
+
+
+def random_project(rng):
+    """Projet aléatoire ; certaines clés manquent, quelques valeurs sont invalides."""
+    def maybe(section, key, values):
+        if rng.random() < 0.85:
+            section[key] = rng.choice(values)
+
+    projet, client, technique = {}, {}, {}
+    maybe(projet, 'typeProjet', PROJECT_TYPES)
+    surfaces = SURFACES + INVALID_SURFACES if rng.random() < 0.02 else SURFACES
+    if rng.random() < 0.5:
+        surfaces = surfaces + tuple(round(rng.uniform(0, 3000), rng.choice((0, 1, 2))) for _ in range(4))
+    maybe(projet, 'surfacePlancher', surfaces)
+    maybe(projet, 'surfaceTerrain', surfaces)
+    maybe(projet, 'destination', DESTINATIONS)
+    maybe(client, 'numeroSiret', ('12345678900011', '', None))
+    maybe(technique, 'zoneProtegee', TRUTH_VALUES)
+    maybe(technique, 'demolition', TRUTH_VALUES)
+    maybe(technique, 'sousTraitance', TRUTH_VALUES)
+
+    project = {}
+    for key, section in (('projet', projet), ('client', client), ('technique', technique)):
+        if rng.random() < 0.95:
+            project[key] = section
+        elif rng.random() < 0.2:
+            project[key] = None  # Section invalide : AttributeError dans les deux moteurs
+    return project
+
+
+def outcome(analyse, project):
+    """Résultat ou (type, message) de l'exception levée."""
+    try:
+        return analyse(project)
+    except Exception as e:
+        return (type(e).__name__, str(e))
+
+
+def test_compiled_rules_match_legacy_on_random_corpus():
+    rng = random.Random(SEED)
+    logic = ArchitectBusinessLogic()
+    divergences = []
+    for _ in range(CORPUS_SIZE):
+        project = random_project(rng)
+        if outcome(logic.analyser_projet, project) != outcome(legacy_analyser_projet, project):
+            divergences.append(project)
+    assert not divergences, f"{len(divergences)} divergence(s), dont : {divergences[:3]!r}"
+
+
+def test_compiled_rules_match_legacy_at_thresholds():
+    logic = ArchitectBusinessLogic()
+    for type_projet, surface, siret, zone_protegee in itertools.product(
+            PROJECT_TYPES, SURFACES + INVALID_SURFACES, ('12345678900011', ''), (True, False)):
+        project = {
+            'projet': {'typeProjet': type_projet, 'surfacePlancher': surface, 'surfaceTerrain': surface},
+            'client': {'numeroSiret': siret},
+            'technique': {'zoneProtegee': zone_protegee},
+        }
+        assert outcome(logic.analyser_projet, project) == outcome(legacy_analyser_projet, project), project
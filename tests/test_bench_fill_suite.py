@@ -0,0 +1,39 @@
+"""
+Suite de benchmarks du remplissage (benchmarks/bench_fill_suite.py) : mesure d'un cas et comparaison à la référence
+"""
+
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+from config import Config
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / 'benchmarks'))
+from bench_fill_suite import compare, measure_in_subprocess, run_case  # noqa: E402
+
+CERFA_ID = '13407-10'
+
+
+def test_compare_reports_slowdowns_and_new_errors(monkeypatch):
+    monkeypatch.setattr(Config, 'USE_OUTPUT_CACHE', True)  # run_case le désactive : rétabli après le test
+    case = run_case(CERFA_ID, 'sparse', 1, 'fast', 'immediate')
+    baseline = {'cases': [case]}
+    assert case['output_bytes'] > 0 and case['wall_ms'] > 0
+
+    assert compare({'cases': [dict(case)]}, baseline, 0.2, 5.0) == []
+    slower = dict(case, wall_ms=case['wall_ms'] * 2 + 10)
+    assert compare({'cases': [slower]}, baseline, 0.2, 5.0) == [
+        (CERFA_ID, 'sparse', 'wall_ms', case['wall_ms'], slower['wall_ms'])]
+    noise = dict(case, wall_ms=case['wall_ms'] * 1.5)
+    assert compare({'cases': [noise]}, baseline, 0.2, case['wall_ms']) == []
+    failed = {'cerfa_id': CERFA_ID, 'density': 'sparse', 'returncode': 1, 'error': 'FileNotFoundError: x'}
+    assert compare({'cases': [failed]}, baseline, 0.2, 5.0) == [
+        (CERFA_ID, 'sparse', 'error', None, 'FileNotFoundError: x')]
+
+
+def test_failing_case_keeps_its_return_code():
+    args = SimpleNamespace(repeat=1, save_profile='fast', appearance_mode='immediate')
+    case = measure_in_subprocess('00000-00', 'sparse', args)
+
+    assert case['cerfa_id'] == '00000-00' and case['returncode'] != 0
+    assert isinstance(case['error'], str) and case['error']
@@ -0,0 +1,65 @@
+"""
+Génération en masse (bulk_generate.py) : lecture des fichiers d'entrée, reprise d'un lot
+"""
+
+import json
+
+from architect_business_logic import ArchitectBusinessLogic
+from bulk_generate import BulkRun, InvalidProject, iter_projects, parse_args
+from pdf_storage import DELTA_SUFFIX
+
+CSV_HEADER = "id,projet.typeProjet,projet.surfacePlancher,projet.surfaceTerrain," \
+             "technique.zoneProtegee,technique.demolition,technique.sousTraitance\n"
+
+
+def test_csv_false_cells_are_false(tmp_path):
+    path = tmp_path / 'projets.csv'
+    path.write_text(CSV_HEADER + "p1,construction_neuve,\"120,5\",600,false,non,0\n", encoding='utf-8')
+
+    [(project_id, project)] = list(iter_projects(path))
+
+    assert project_id == 'p1'
+    assert project['technique'] == {'zoneProtegee': False, 'demolition': False, 'sousTraitance': False}
+    assert project['projet']['surfacePlancher'] == 120.5 and project['projet']['surfaceTerrain'] == 600
+    analysis = ArchitectBusinessLogic().analyser_projet(project)['analyse_reglementaire']
+    assert 'CERFA 13405-13' not in [doc['type'] for doc in analysis['autorisations_requises']]
+    assert not any('ABF' in alert['message'] for alert in analysis['alertes_conformite'])
+
+
+def test_csv_true_cells_and_unparsable_cells(tmp_path):
+    path = tmp_path / 'projets.csv'
+    path.write_text(CSV_HEADER
+                    + "p1,extension,30,600,Oui,1,TRUE\n"
+                    + "p2,extension,30,600,peut-être,,\n"
+                    + "p3,extension,trente,600,,,\n", encoding='utf-8')
+
+    projects = list(iter_projects(path))
+
+    assert projects[0] == ('p1', {'projet': {'typeProjet': 'extension', 'surfacePlancher': 30, 'surfaceTerrain': 600},
+                                  'technique': {'zoneProtegee': True, 'demolition': True, 'sousTraitance': True}})
+    assert projects[1][0] == 'ligne-3' and isinstance(projects[1][1], InvalidProject)
+    assert 'technique.zoneProtegee' in projects[1][1].error
+    assert projects[2][0] == 'ligne-4' and 'projet.surfacePlancher' in projects[2][1].error
+
+
+def run_batch(tmp_path, *options):
+    args = parse_args([str(tmp_path / 'projets.jsonl'), '--output-dir', str(tmp_path / 'lot'),
+                       '--manifest', str(tmp_path / 'lot.jsonl'), '--workers', '0', '--storage', 'delta', *options])
+    return BulkRun(args).run()
+
+
+def test_resume_skips_finished_projects(tmp_path, isolated_stores, sample_project):
+    lines = [json.dumps({'id': f"p{n}", **sample_project}) for n in range(3)]
+    (tmp_path / 'projets.jsonl').write_text("\n".join(lines[:2] + ['{tronquée']) + "\n", encoding='utf-8')
+    first = run_batch(tmp_path)
+
+    (tmp_path / 'projets.jsonl').write_text("\n".join(lines) + "\n", encoding='utf-8')
+    resumed = run_batch(tmp_path, '--resume')
+
+    assert (first['projects'], first['projects_rejected'], first['forms_failed']) == (2, 1, 0)
+    assert (resumed['projects'], resumed['projects_resumed'], resumed['projects_rejected']) == (1, 2, 0)
+    records = [json.loads(line) for line in (tmp_path / 'lot.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert [record['project_id'] for record in records] == ['p0', 'p1', 'ligne-3', 'p2']
+    outputs = sorted((tmp_path / 'lot').rglob('cerfa_*'))
+    assert outputs and all(path.suffix == DELTA_SUFFIX for path in outputs)
+    assert len(outputs) == sum(len(record['results']) for record in records)
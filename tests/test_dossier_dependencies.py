@@ -0,0 +1,41 @@
+"""
+Régénération incrémentale (dossier_dependencies.py) : seuls les CERFA dont les entrées changent sont refaits
+"""
+
+import os
+
+from dossier_dependencies import DossierState, get_dependency_index, regenerate_dossier
+
+CERFA_IDS = ['13406-15', '13407-10']
+
+
+def generated(results):
+    return [result.cerfa_id for result in results if result.success and not result.unchanged]
+
+
+def test_plan_follows_the_keys_each_form_reads(tmp_path, isolated_stores, sample_project):
+    output_dir = tmp_path / 'dossier'
+    assert generated(regenerate_dossier(CERFA_IDS, sample_project, output_dir)) == CERFA_IDS
+
+    plan = DossierState(output_dir).plan(CERFA_IDS, sample_project)
+    assert plan.to_generate == [] and sorted(plan.unchanged) == CERFA_IDS
+    assert all(os.path.exists(path) for path in plan.unchanged.values())
+
+    index = get_dependency_index()
+    assert 'projet.nombreNiveaux' in index.get('13406-15').keys - index.get('13407-10').keys
+    sample_project['projet']['nombreNiveaux'] = '3'
+    results = regenerate_dossier(CERFA_IDS, sample_project, output_dir)
+    assert generated(results) == ['13406-15']
+    assert [result.cerfa_id for result in results if result.unchanged] == ['13407-10']
+
+
+def test_storage_mode_and_missing_files_force_regeneration(tmp_path, isolated_stores, sample_project):
+    output_dir = tmp_path / 'dossier'
+    first = regenerate_dossier(CERFA_IDS, sample_project, output_dir, storage_mode='full')
+
+    plan = DossierState(output_dir).plan(CERFA_IDS, sample_project, storage_mode='delta')
+    assert plan.to_generate == CERFA_IDS
+
+    os.remove(first[1].output_path)
+    plan = DossierState(output_dir).plan(CERFA_IDS, sample_project, storage_mode='full')
+    assert plan.to_generate == ['13407-10'] and list(plan.unchanged) == ['13406-15']
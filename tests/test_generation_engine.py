@@ -0,0 +1,54 @@
+"""
+Moteur de génération (generation_engine.py) : remplissage dans un pool de processus
+"""
+
+import fitz
+import pytest
+
+import pdf_filler
+from generation_engine import GenerationEngine
+from pdf_storage import get_pdf_base_store
+
+CERFA_IDS = ['13406-15', '13407-10']
+
+
+def field_values(pdf):
+    with (fitz.open(stream=pdf, filetype='pdf') if isinstance(pdf, bytes) else fitz.open(pdf)) as doc:
+        return {widget.field_name: widget.field_value for page in doc for widget in page.widgets()}
+
+
+@pytest.fixture(scope='module')
+def engine():
+    with GenerationEngine(max_workers=1) as engine:
+        yield engine
+
+
+def test_pool_matches_in_process_fill(engine, tmp_path, sample_project):
+    futures = engine.submit_dossier(CERFA_IDS, sample_project, tmp_path, dossier_id='d1')
+    results = {}
+    for dossier_id, result in engine.iter_results(futures):
+        assert dossier_id == 'd1'
+        results[result.cerfa_id] = result
+
+    for cerfa_id in CERFA_IDS:
+        result = results[cerfa_id]
+        assert result.success, result.error
+        assert result.output_path == str(pdf_filler.dossier_output_path(tmp_path, cerfa_id))
+        expected = pdf_filler.fill_pdf_to_bytes(cerfa_id, sample_project)
+        assert field_values(result.output_path) == field_values(expected)
+
+
+def test_dossier_names_follow_storage_mode(engine, tmp_path, sample_project):
+    futures = engine.submit_dossier(CERFA_IDS, sample_project, tmp_path, storage_mode='delta')
+    results = sorted((result for _, result in engine.iter_results(futures)), key=lambda result: result.cerfa_id)
+
+    assert [result.output_path for result in results] == [
+        str(pdf_filler.dossier_output_path(tmp_path, cerfa_id, 'delta')) for cerfa_id in CERFA_IDS]
+    assert field_values(get_pdf_base_store().reconstruct(results[0].output_path)) == \
+        field_values(pdf_filler.fill_pdf_to_bytes(CERFA_IDS[0], sample_project))
+
+
+def test_worker_errors_are_reported_in_results(engine, tmp_path, sample_project):
+    _, result = engine.collect(engine.submit_form('00000-00', sample_project, tmp_path / 'absent.pdf'))
+
+    assert not result.success and result.output_path is None
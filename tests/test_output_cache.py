@@ -0,0 +1,50 @@
+"""
+Cache de sortie (output_cache.py) : clé, éviction et reprise d'un PDF rempli
+"""
+
+import output_cache
+import pdf_filler
+from fill_metrics import FillMetrics
+from output_cache import OutputCache, make_output_key
+
+CERFA_ID = '13406-15'
+
+
+def test_key_depends_on_every_input():
+    key = make_output_key('a' * 64, {'nom': 'Durand', 'prenom': 'Paul'}, {'garbage': 1}, 'immediate')
+
+    assert key == make_output_key('a' * 64, {'prenom': 'Paul', 'nom': 'Durand'}, {'garbage': 1}, 'immediate')
+    assert len({key,
+                make_output_key('b' * 64, {'nom': 'Durand', 'prenom': 'Paul'}, {'garbage': 1}, 'immediate'),
+                make_output_key('a' * 64, {'nom': 'Dupont', 'prenom': 'Paul'}, {'garbage': 1}, 'immediate'),
+                make_output_key('a' * 64, {'nom': 'Durand', 'prenom': 'Paul'}, {'garbage': 3}, 'immediate'),
+                make_output_key('a' * 64, {'nom': 'Durand', 'prenom': 'Paul'}, {'garbage': 1}, 'batched')}) == 5
+
+
+def test_eviction_keeps_recently_used_entries(tmp_path):
+    cache = OutputCache(tmp_path, max_bytes=250)
+    for key in ('a1', 'b2', 'c3'):
+        cache.put(key * 32, bytes(100))
+        if key == 'b2':
+            assert cache.get_path('a1' * 32)  # 'a1' devient la plus récente
+
+    assert cache.get_bytes('b2' * 32) is None
+    assert cache.get_path('a1' * 32) and cache.get_bytes('c3' * 32) == bytes(100)
+    stats = cache.stats()
+    assert (stats['entries'], stats['bytes'], stats['evictions']) == (2, 200, 1)
+    assert sorted(path.stem for path in tmp_path.glob('*/*.pdf')) == ['a1' * 32, 'c3' * 32]
+
+
+def test_hit_copies_the_cached_file(tmp_path, isolated_stores, sample_project, monkeypatch):
+    metrics = FillMetrics()
+    monkeypatch.setattr(pdf_filler, 'get_fill_metrics', lambda: metrics)
+    first = pdf_filler.fill_pdf(CERFA_ID, sample_project, str(tmp_path / 'first.pdf'))
+    monkeypatch.setattr(OutputCache, 'get_bytes', lambda *args: 1 / 0)  # Un fichier ne repasse pas par la mémoire
+    second = pdf_filler.fill_pdf(CERFA_ID, sample_project, str(tmp_path / 'second.pdf'))
+
+    assert first.success and second.success
+    assert not first.from_cache and second.from_cache
+    assert sorted(second.fields_filled) == sorted(first.fields_filled) and second.output_size == first.output_size
+    assert (tmp_path / 'second.pdf').read_bytes() == (tmp_path / 'first.pdf').read_bytes()
+    assert output_cache.get_output_cache().stats()['hits'] == 1
+    assert metrics.cache_stats() == {'fills': 2, 'hits': 1, 'hit_rate': 0.5}
@@ -0,0 +1,42 @@
+"""
+Stockage delta (pdf_storage.py) : un .pdfdelta reconstitue le PDF rempli
+"""
+
+import fitz
+
+import pdf_filler
+from pdf_storage import DELTA_SUFFIX, get_pdf_base_store
+
+CERFA_ID = '13406-15'
+
+
+def field_values(pdf_path):
+    with fitz.open(pdf_path) as doc:
+        return {widget.field_name: widget.field_value for page in doc for widget in page.widgets()}
+
+
+def test_delta_round_trip(tmp_path, isolated_stores, sample_project, monkeypatch):
+    ensured = []
+    ensure_delta_base = pdf_filler._ensure_delta_base
+    monkeypatch.setattr(pdf_filler, '_ensure_delta_base',
+                        lambda *args: ensured.append(args[0]) or ensure_delta_base(*args))
+
+    full = pdf_filler.fill_pdf(CERFA_ID, sample_project, str(tmp_path / 'full.pdf'), storage_mode='full')
+    delta = pdf_filler.fill_pdf(CERFA_ID, sample_project, str(tmp_path / 'delta.pdf'), storage_mode='delta')
+
+    assert full.success and delta.success
+    assert delta.output_path.endswith(DELTA_SUFFIX)
+    assert ensured == [CERFA_ID]  # Le modèle de base n'est vérifié et haché qu'une fois par remplissage
+    materialized = get_pdf_base_store().materialize(delta.output_path, tmp_path / 'materialized.pdf')
+    assert delta.fields_filled == full.fields_filled
+    assert field_values(materialized) == field_values(full.output_path)
+    assert field_values(full.output_path)[full.fields_filled[0]]
+
+
+def test_delta_bytes_register_their_base(isolated_stores, sample_project):
+    data = pdf_filler.fill_pdf_to_bytes(CERFA_ID, sample_project, storage_mode='delta')
+
+    delta_file = isolated_stores / f"cerfa{DELTA_SUFFIX}"
+    delta_file.write_bytes(data)
+    with fitz.open(stream=get_pdf_base_store().reconstruct(delta_file), filetype='pdf') as doc:
+        assert doc.is_form_pdf
@@ -2,9 +2,11 @@
 Utilitaires pour la validation des données et la gestion des ressources
 """
 
+import math
 import re
 import logging
 from contextlib import contextmanager
+from types import MappingProxyType
 from config import Config
 
 logger = logging.getLogger('ArchiBot.utils')
@@ -146,4 +148,31 @@ def sanitize_filename(filename):
     # Limite la longueur
     if len(sanitized) > 200:
         sanitized = sanitized[:200]
-    return sanitized
\ No newline at end of file
+    return sanitized
+
+
+def percentile(values, fraction):
+    """Percentile (rang le plus proche) d'une série de valeurs ; fraction entre 0 et 1."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, math.ceil(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+def freeze(value):
+    """Copie en lecture seule : dictionnaires en MappingProxyType, listes en tuples."""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def thaw(value):
+    """Copie modifiable d'une structure figée par freeze (dictionnaires et listes)."""
+    if isinstance(value, (dict, MappingProxyType)):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
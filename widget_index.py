@@ -0,0 +1,146 @@
+"""
+Index persistant des champs de formulaire (widgets) de chaque modèle CERFA
+"""
+
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import Config
+
+logger = logging.getLogger('ArchiBot.widget_index')
+
+# Format d'une entrée : (numéro de page, xref du widget, type de champ, valeur "cochée")
+WidgetEntry = Tuple[int, int, int, Optional[str]]
+
+INDEX_FORMAT_VERSION = 1
+
+
+def extract_widget_index(doc) -> Dict[str, List[WidgetEntry]]:
+    """Parcourt une fois toutes les pages et construit l'index nom de champ -> widgets."""
+    import fitz
+    checkable = (fitz.PDF_WIDGET_TYPE_CHECKBOX, fitz.PDF_WIDGET_TYPE_RADIOBUTTON)
+
+    index: Dict[str, List[WidgetEntry]] = {}
+    for page in doc:
+        for widget in page.widgets():
+            on_state = None
+            if widget.field_type in checkable:
+                state = widget.on_state()
+                on_state = state if isinstance(state, str) else "Yes"
+            index.setdefault(widget.field_name, []).append(
+                (page.number, widget.xref, widget.field_type, on_state)
+            )
+    return index
+
+
+class WidgetIndexStore:
+    """Index des widgets par empreinte de modèle, en mémoire et sur disque."""
+
+    def __init__(self, index_dir: Optional[Path] = None):
+        self.index_dir = Path(index_dir) if index_dir else Config.WIDGET_INDEX_DIR
+        self._indexes: Dict[str, Dict[str, List[WidgetEntry]]] = {}
+        self._lock = threading.Lock()
+
+    def index_path(self, cerfa_id: str, sha256: str) -> Path:
+        """Chemin du fichier d'index pour une version donnée du modèle."""
+        return self.index_dir / f"cerfa_{cerfa_id}.{sha256[:16]}.json"
+
+    def get(self, cerfa_id: str, sha256: str, doc=None,
+            source_sha256: Optional[str] = None) -> Dict[str, List[WidgetEntry]]:
+        """
+        Retourne l'index du modèle identifié par son empreinte.
+
+        L'index est lu depuis le disque s'il existe, sinon construit à partir de `doc`
+        (ou du cache de modèles) puis enregistré à côté des modèles. `source_sha256` est
+        l'empreinte de l'original quand `sha256` est celle de sa version allégée : les
+        index de l'original et de sa version allégée sont conservés tous les deux.
+        """
+        with self._lock:
+            index = self._indexes.get(sha256)
+        if index is not None:
+            return index
+
+        path = self.index_path(cerfa_id, sha256)
+        index = self._read(path, sha256)
+        if index is None:
+            index = self._build(cerfa_id, doc)
+            self._write(path, cerfa_id, sha256, index, self._related_sha256s(cerfa_id, sha256, source_sha256))
+
+        with self._lock:
+            self._indexes[sha256] = index
+        return index
+
+    def _build(self, cerfa_id: str, doc) -> Dict[str, List[WidgetEntry]]:
+        """Construit l'index en ouvrant le modèle si nécessaire."""
+        if doc is not None:
+            return extract_widget_index(doc)
+        from template_cache import get_template_cache
+        template_doc = get_template_cache().open_document(cerfa_id)
+        try:
+            return extract_widget_index(template_doc)
+        finally:
+            template_doc.close()
+
+    def _read(self, path: Path, sha256: str) -> Optional[Dict[str, List[WidgetEntry]]]:
+        """Lit un index sur disque ; retourne None s'il est absent ou invalide."""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Index illisible, reconstruction : {path.name} ({e})")
+            return None
+
+        if payload.get('version') != INDEX_FORMAT_VERSION or payload.get('sha256') != sha256:
+            return None
+        return {name: [tuple(entry) for entry in entries] for name, entries in payload['fields'].items()}
+
+    @staticmethod
+    def _related_sha256s(cerfa_id: str, sha256: str, source_sha256: Optional[str]) -> set:
+        """Empreintes à conserver : le modèle, son original et la version allégée de cet original."""
+        related = {sha256, source_sha256 or sha256}
+        from template_cache import get_template_cache
+        lite_sha256 = get_template_cache().lite_sha256(cerfa_id, source_sha256 or sha256)
+        if lite_sha256:
+            related.add(lite_sha256)
+        return related
+
+    def _write(self, path: Path, cerfa_id: str, sha256: str, index: Dict[str, List[WidgetEntry]],
+               keep_sha256s: Iterable[str] = ()):
+        """Enregistre l'index et supprime ceux des versions précédentes du modèle (hors keep_sha256s)."""
+        keep = {sha[:16] for sha in keep_sha256s} | {sha256[:16]}
+        try:
+            self.index_dir.mkdir(parents=True, exist_ok=True)
+            prefix = f"cerfa_{cerfa_id}."
+            for stale in self.index_dir.glob(f"{prefix}*.json"):
+                if stale.name[len(prefix):-len('.json')] not in keep:
+                    stale.unlink(missing_ok=True)
+            tmp_path = path.with_suffix(f'.{os.getpid()}.tmp')
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'version': INDEX_FORMAT_VERSION,
+                    'cerfa_id': cerfa_id,
+                    'sha256': sha256,
+                    'fields': index,
+                }, f, ensure_ascii=False)
+            tmp_path.replace(path)
+            logger.info(f"Index des widgets créé : {path.name} ({len(index)} champs)")
+        except OSError as e:
+            # L'index reste utilisable en mémoire même si le disque est en lecture seule
+            logger.warning(f"Impossible d'enregistrer l'index {path.name}: {e}")
+
+
+_widget_index_store: Optional[WidgetIndexStore] = None
+
+
+def get_widget_index_store() -> WidgetIndexStore:
+    """Retourne le magasin d'index partagé par le processus."""
+    global _widget_index_store
+    if _widget_index_store is None:
+        _widget_index_store = WidgetIndexStore()
+    return _widget_index_store